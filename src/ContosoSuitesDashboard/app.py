@@ -1,4 +1,5 @@
 import streamlit as st
+from services.startup import load_config, prewarm
 
 st.set_page_config(layout="wide")
 
@@ -20,3 +21,7 @@ def main():
 if __name__ == "__main__": 
     
     main()
+    # Load the SDKs the other pages need in the background while this page is shown.
+    startup = load_config().get("Startup", {})
+    if startup.get("Prewarm", True):
+        prewarm(startup.get("PrewarmModules"))
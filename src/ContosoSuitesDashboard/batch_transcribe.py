@@ -0,0 +1,365 @@
+"""Transcribe and compliance-check a backlog of call recordings without the UI.
+
+Takes a directory of WAV files (or a manifest listing one path per line), fans the
+calls out over a process or thread pool, and appends one result per call to a JSONL
+file or a directory of Parquet part files as soon as it finishes. Calls that already
+have a successful result in the output are skipped, so an interrupted run can simply
+be started again. Speech and OpenAI each get their own concurrency limit, shared by
+all workers. Each worker loads the Call Center page as a module and checks calls with
+its is_call_in_compliance, so transcripts and compliance results go through the same
+content-addressed cache as the page, and recordings seen before are not sent again.
+
+    python batch_transcribe.py ../data/audio results.jsonl --workers 4
+    python batch_transcribe.py ../data/audio results.jsonl --offline
+
+With --offline the calls are sent to the local stand-ins in benchmarks/stubs.py
+instead of Azure, which is useful for measuring throughput. Offline runs never touch
+the cache, since their "transcripts" are made up.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from services.analysis_cache import content_key, get_analysis_cache, hash_audio
+from services.audio import WavReader
+from services.audio_preprocessing import preprocess_options
+from services.call_center import create_file_transcriber, transcribe_file
+from services.openai_clients import configure_pool
+from services.startup import load_page
+
+# Per-service semaphores and the loaded Call Center page, installed in every worker
+# by _init_worker.
+_limits = {}
+_pages = {}
+
+
+def _init_worker(limits, pool_settings, page_overrides):
+    _limits.update(limits)
+    configure_pool(**pool_settings)
+    _pages["call_center"] = load_page("pages/2_Call_Center.py", "call_center_page", page_overrides)
+
+
+def _limit(service):
+    semaphore = _limits.get(service)
+    return semaphore if semaphore is not None else nullcontext()
+
+
+def process_call(path, options):
+    # Transcribe one call and check it for compliance. Runs in a worker; returns a
+    # JSON-serializable result row and never raises.
+    row = {
+        "file": path,
+        "duration": None,
+        "transcript": [],
+        "timings": None,
+        "compliance": None,
+        "error": None,
+        "transcribe_seconds": None,
+        "compliance_seconds": None,
+    }
+    try:
+        with WavReader(path) as reader:
+            info = reader.info
+        row["duration"] = round(info.duration, 3)
+
+        cache = None
+        if options["cache"] is not None:
+            cache_settings = dict(options["cache"])
+            cache = get_analysis_cache(cache_settings.pop("directory"), **cache_settings)
+            transcript_key = content_key("transcript", hash_audio(path), language=options["language"],
+                                         preprocess=options["preprocess"])
+            results = cache.get(transcript_key)
+            if results is not None:
+                row["transcript"] = results
+                row["transcribe_seconds"] = 0.0
+        if not row["transcript"]:
+            transcribe_call(path, options, row)
+            if row["error"]:
+                return row
+            if cache is not None:
+                cache.put(transcript_key, row["transcript"])
+
+        with _limit("openai"):
+            started = time.perf_counter()
+            # The page's check, with its client pool, chunking and analysis cache.
+            row["compliance"] = _pages["call_center"].is_call_in_compliance(
+                row["transcript"], options["include_recording_message"], options["is_relevant_to_topic"])
+            row["compliance_seconds"] = round(time.perf_counter() - started, 3)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def transcribe_call(path, options, row):
+    # Transcribe one call into row["transcript"] (with phrase start and end times, in
+    # seconds of the recording, in row["timings"]), recording any error in row["error"].
+    # transcribe_file converts every recording to the stream's 16 kHz, 16-bit mono format.
+    with _limit("speech"):
+        started = time.perf_counter()
+        if options["offline"]:
+            from benchmarks.stubs import create_fake_file_transcriber
+            transcriber, stream = create_fake_file_transcriber(real_time_factor=options["offline_real_time_factor"])
+        else:
+            transcriber, stream = create_file_transcriber(options["speech_key"], options["speech_region"], options["language"])
+        timings = []
+        results, error = transcribe_file(
+            path, transcriber, stream,
+            timeout=options["transcription_timeout"],
+            lead_seconds=options["lead_seconds"],
+            preprocess=options["preprocess"],
+            timings=timings,
+        )
+        row["transcribe_seconds"] = round(time.perf_counter() - started, 3)
+    row["transcript"] = results
+    row["timings"] = timings
+    if error:
+        row["error"] = f"Transcription failed: {error}"
+    elif not results:
+        row["error"] = "Transcription returned no text."
+
+
+def find_calls(source):
+    # A directory is searched (non-recursively) for .wav files; any other file is a
+    # manifest with one path per line, relative to the manifest. # starts a comment.
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(".wav"))
+        return [os.path.abspath(os.path.join(source, n)) for n in names]
+    base = os.path.dirname(os.path.abspath(source))
+    calls = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                calls.append(os.path.abspath(os.path.join(base, line)))
+    return calls
+
+
+class JsonlWriter:
+    """Appends one JSON object per line and flushes after every row."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def completed(self):
+        # Files with a successful result. A torn last line (from a crash) is ignored.
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not row.get("error"):
+                    done.add(row["file"])
+        return done
+
+    def __enter__(self):
+        # Make sure a torn last line does not swallow the first new row.
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        else:
+            torn = False
+        self.file = open(self.path, "a", encoding="utf-8")
+        if torn:
+            self.file.write("\n")
+        return self
+
+    def write(self, row):
+        self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes rows to a directory of Parquet part files, `batch_size` rows per part.
+
+    Parquet files cannot be appended to, so rows are buffered and each batch becomes a
+    new part file. Rows still buffered when a run is killed are simply redone on resume.
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = []
+
+    def _parts(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(n for n in os.listdir(self.path) if n.startswith("part-") and n.endswith(".parquet"))
+
+    def completed(self):
+        import pyarrow.parquet as pq
+
+        done = set()
+        for name in self._parts():
+            table = pq.read_table(os.path.join(self.path, name), columns=["file", "error"])
+            for file, error in zip(table.column("file").to_pylist(), table.column("error").to_pylist()):
+                if not error:
+                    done.add(file)
+        return done
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        return self
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Write to a temporary name first so a half-written part is never read back.
+        name = f"part-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.parquet"
+        tmp = os.path.join(self.path, "." + name)
+        pq.write_table(pa.Table.from_pylist(self.rows), tmp)
+        os.replace(tmp, os.path.join(self.path, name))
+        self.rows = []
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def open_writer(path, parquet_batch_size):
+    if path.endswith(".jsonl"):
+        return JsonlWriter(path)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        sys.exit("Writing Parquet output requires pyarrow (pip install pyarrow), or use a .jsonl output file.")
+    return ParquetWriter(path, parquet_batch_size)
+
+
+def run(calls, writer, options, workers, executor_kind, speech_concurrency, openai_concurrency, pool_settings,
+        page_overrides):
+    if executor_kind == "process":
+        # spawn gives every worker a clean interpreter on all platforms.
+        context = multiprocessing.get_context("spawn")
+        limits = {"speech": context.BoundedSemaphore(speech_concurrency),
+                  "openai": context.BoundedSemaphore(openai_concurrency)}
+        executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                       initargs=(limits, pool_settings, page_overrides))
+    else:
+        limits = {"speech": threading.BoundedSemaphore(speech_concurrency),
+                  "openai": threading.BoundedSemaphore(openai_concurrency)}
+        _init_worker(limits, pool_settings, page_overrides)
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="batch")
+
+    started = time.perf_counter()
+    audio_seconds, failed = 0.0, 0
+    futures = [executor.submit(process_call, path, options) for path in calls]
+    try:
+        for i, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            row["finished_at"] = datetime.now(timezone.utc).isoformat()
+            writer.write(row)
+            audio_seconds += row["duration"] or 0.0
+            failed += bool(row["error"])
+            status = f"ERROR {row['error']}" if row["error"] else f"{row['transcribe_seconds']}s + {row['compliance_seconds']}s"
+            print(f"[{i}/{len(calls)}] {os.path.basename(row['file'])}: {status}")
+    except KeyboardInterrupt:
+        print("Interrupted; finished calls are saved and will be skipped when the run is resumed.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {len(calls)} calls ({failed} failed, {audio_seconds / 60:.1f} min of audio) in {elapsed:.1f}s: "
+          f"{len(calls) / elapsed * 60:.1f} calls/min, {audio_seconds / elapsed:.1f}x real time.")
+
+
+def main():
+    with open("config.json") as f:
+        config = json.load(f)
+    batch_config = config.get("BatchTranscription", {})
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="A directory of .wav files or a manifest with one path per line.")
+    parser.add_argument("output", help="A .jsonl file, or a directory for Parquet part files.")
+    parser.add_argument("--workers", type=int, default=batch_config.get("Workers", 4))
+    parser.add_argument("--executor", choices=["process", "thread"], default=batch_config.get("Executor", "process"))
+    parser.add_argument("--speech-concurrency", type=int, default=batch_config.get("SpeechConcurrency", 4))
+    parser.add_argument("--openai-concurrency", type=int, default=batch_config.get("OpenAIConcurrency", 8))
+    parser.add_argument("--parquet-batch-size", type=int, default=batch_config.get("ParquetBatchSize", 50))
+    parser.add_argument("--language", default="en-US")
+    parser.add_argument("--no-recording-message", action="store_true",
+                        help="Do not ask whether the caller was told the call was recorded.")
+    parser.add_argument("--no-relevance", action="store_true",
+                        help="Do not ask whether the call was relevant to the hotel and resort industry.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the shared transcript and analysis cache.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use local stand-ins for the Speech and OpenAI services.")
+    parser.add_argument("--offline-real-time-factor", type=float, default=0.05,
+                        help="Seconds the stand-in transcriber spends per second of audio.")
+    args = parser.parse_args()
+
+    calls = find_calls(args.source)
+    writer = open_writer(args.output, args.parquet_batch_size)
+    done = writer.completed()
+    pending = [path for path in calls if path not in done]
+    print(f"{len(calls)} calls found, {len(calls) - len(pending)} already done, {len(pending)} to process.")
+    if not pending:
+        return
+
+    options = {
+        "offline": args.offline,
+        "offline_real_time_factor": args.offline_real_time_factor,
+        "speech_key": config["SpeechKey"],
+        "speech_region": config["SpeechRegion"],
+        "language": args.language,
+        "include_recording_message": not args.no_recording_message,
+        "is_relevant_to_topic": not args.no_relevance,
+        "transcription_timeout": config.get("TranscriptionTimeoutSeconds", 600),
+        "lead_seconds": config.get("SpeechPushLeadSeconds", 30),
+        "preprocess": preprocess_options(config.get("AudioPreprocessing", {})),
+        "cache": None,
+    }
+    # Settings that differ from config.json for the Call Center page the workers load.
+    page_overrides = {}
+    cache_config = config.get("AnalysisCache", {})
+    if not args.offline and not args.no_cache:
+        options["cache"] = {
+            "directory": cache_config.get("Directory", ".cache/analysis"),
+            "max_memory_entries": cache_config.get("MaxMemoryEntries", 128),
+            "max_disk_bytes": cache_config.get("MaxDiskBytes", 256 * 1024 * 1024),
+        }
+    else:
+        page_overrides["AnalysisCache"] = {"Directory": None, "MaxMemoryEntries": 0}
+    stub = None
+    if args.offline:
+        from benchmarks.stubs import StubOpenAI
+        stub = StubOpenAI().__enter__()
+        page_overrides.update(AOAIEndpoint=stub.url, AOAIKey="offline")
+
+    try:
+        with writer:
+            run(pending, writer, options, args.workers, args.executor,
+                args.speech_concurrency, args.openai_concurrency, config.get("AOAIConnectionPool", {}),
+                page_overrides)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        if stub is not None:
+            stub.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
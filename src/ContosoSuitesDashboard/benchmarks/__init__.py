@@ -0,0 +1,5 @@
+"""Offline benchmarks for the dashboard's hot paths.
+
+Run from the ContosoSuitesDashboard directory, e.g. `python -m benchmarks.customer_api`.
+The benchmarks only talk to local stand-ins in benchmarks/stubs.py, never to Azure.
+"""
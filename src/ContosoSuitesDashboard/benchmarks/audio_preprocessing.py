@@ -0,0 +1,86 @@
+"""Benchmark audio preprocessing on the bundled sample calls.
+
+For each recording it reports the format, how long preprocessing takes, and how
+much audio is pushed to the Speech service three ways:
+
+- raw: the file's bytes as they are, read as 16 kHz mono (the old behaviour, which
+  turns any other format into noise and, for 44.1 kHz audio, into 2.76x as much of it)
+- convert: downmixed and resampled to 16 kHz mono only
+- trim: converted, with long silences compressed as configured in
+  "AudioPreprocessing"
+
+Each variant is then transcribed with the local stand-in transcriber from
+benchmarks/stubs.py, which spends --real-time-factor seconds per second of audio,
+to show the wall time saved.
+
+    python -m benchmarks.audio_preprocessing --real-time-factor 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import services.call_center as call_center
+from benchmarks.stubs import create_fake_file_transcriber
+from services.audio import WavReader
+from services.audio_preprocessing import prepare_audio, preprocess_options
+
+
+def transcribe(path, mode, options, real_time_factor):
+    transcriber, stream = create_fake_file_transcriber(real_time_factor=real_time_factor)
+    original = call_center.open_audio
+    if mode == "raw":
+        call_center.open_audio = lambda source, **_: WavReader(source)
+    try:
+        started = time.perf_counter()
+        call_center.transcribe_file(path, transcriber, stream, lead_seconds=5,
+                                    preprocess=dict(options, trim_silence=mode == "trim"))
+        return time.perf_counter() - started, stream.bytes_written / stream.bytes_per_second
+    finally:
+        call_center.open_audio = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", default="../data/audio")
+    parser.add_argument("--real-time-factor", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5, help="Preprocessing runs per file.")
+    args = parser.parse_args()
+
+    with open("config.json") as f:
+        options = preprocess_options(json.load(f).get("AudioPreprocessing", {}))
+    # The first resample imports scipy.signal; keep that out of the timings.
+    prepare_audio(os.path.join(args.audio, sorted(os.listdir(args.audio))[0]))
+
+    totals = {"raw": [0.0, 0.0], "convert": [0.0, 0.0], "trim": [0.0, 0.0]}
+    print(f"{'file':<44} {'format':<14} {'prep ms':>8} {'seconds pushed raw/convert/trim':>32} {'wall s raw/convert/trim':>24}")
+    for name in sorted(os.listdir(args.audio)):
+        if not name.lower().endswith(".wav"):
+            continue
+        path = os.path.join(args.audio, name)
+        with WavReader(path) as reader:
+            info = reader.info
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            prepare_audio(path, **dict(options, trim_silence=True))
+            times.append((time.perf_counter() - started) * 1000)
+        pushed, wall = [], []
+        for mode in ("raw", "convert", "trim"):
+            seconds, audio = transcribe(path, mode, options, args.real_time_factor)
+            totals[mode][0] += audio
+            totals[mode][1] += seconds
+            pushed.append(audio)
+            wall.append(seconds)
+        fmt = f"{info.sample_rate / 1000:g}k/{info.bits_per_sample}b/{info.channels}ch"
+        print(f"{name:<44} {fmt:<14} {statistics.median(times):8.1f} "
+              f"{' / '.join(f'{s:.1f}' for s in pushed):>32} {' / '.join(f'{s:.2f}' for s in wall):>24}")
+    raw, convert, trim = (totals[mode] for mode in ("raw", "convert", "trim"))
+    print(f"\nAudio pushed: {raw[0]:.1f}s raw, {convert[0]:.1f}s converted, {trim[0]:.1f}s trimmed "
+          f"({convert[0] - trim[0]:.1f}s of silence removed, {1 - trim[0] / convert[0]:.0%}).")
+    print(f"Transcription wall time: {raw[1]:.2f}s raw, {convert[1]:.2f}s converted, {trim[1]:.2f}s trimmed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark bulk compliance checking against a throttling OpenAI stand-in.
+
+Checks the same synthetic transcripts twice against a stub that enforces a
+requests-per-minute quota and rejects a share of the remaining requests with 429s:
+once one call at a time with check_compliance (what is_call_in_compliance does), and
+once with BulkComplianceChecker. Reports wall time, 429s served and failed calls.
+
+    python -m benchmarks.bulk_compliance --calls 200 --quota-rpm 600 --rate-limit-ratio 0.1
+"""
+import argparse
+import time
+
+import openai
+
+from benchmarks.stubs import StubOpenAI
+from services.bulk_compliance import BulkComplianceChecker
+from services.call_center import check_compliance
+from services.openai_clients import get_openai_client
+
+
+def synthetic_transcripts(count, phrases=12):
+    return [
+        (f"call-{i:05d}", [f"Phrase {j} of synthetic call {i} about a resort booking." for j in range(phrases)])
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--sequential-calls", type=int, default=20,
+                        help="How many of the calls to time sequentially (it is slow).")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--quota-rpm", type=int, default=600, help="Requests per minute the stub accepts.")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.1, help="Share of requests the stub rejects at random.")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    args = parser.parse_args()
+
+    calls = synthetic_transcripts(args.calls)
+    stub = StubOpenAI(latency=args.latency, tokens_per_second=args.tokens_per_second, completion_tokens=40,
+                      requests_per_minute=args.quota_rpm, rate_limit_ratio=args.rate_limit_ratio,
+                      retry_after=args.retry_after, seed=1)
+    with stub:
+        client = get_openai_client(stub.url, "benchmark", "gpt-4")
+        sequential = calls[:args.sequential_calls]
+        failed = 0
+        started = time.perf_counter()
+        for _, call_contents in sequential:
+            try:
+                check_compliance(client, "gpt-4", call_contents, True, True)
+            except openai.RateLimitError:
+                failed += 1
+        elapsed = time.perf_counter() - started
+        print(f"sequential  {len(sequential):5d} calls in {elapsed:7.2f}s ({len(sequential) / elapsed:6.1f} calls/s), "
+              f"{failed} failed, {stub.rate_limited} 429s served")
+
+        stub.rate_limited = 0
+        # The limiter gets 90% of the stub's quota, as you would configure it for a real deployment.
+        checker = BulkComplianceChecker(stub.url, "benchmark", "gpt-4", concurrency=args.concurrency,
+                                        requests_per_minute=int(args.quota_rpm * 0.9), base_delay=0.25)
+        started = time.perf_counter()
+        first = None
+        retries = failed = 0
+        for result in checker.iter_results(calls):
+            first = first or time.perf_counter() - started
+            retries += result.attempts - result.requests
+            failed += not result.ok
+        elapsed = time.perf_counter() - started
+        print(f"bulk        {len(calls):5d} calls in {elapsed:7.2f}s ({len(calls) / elapsed:6.1f} calls/s), "
+              f"{failed} failed, {stub.rate_limited} 429s served, {retries} retries, first result after {first:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Measure the dashboard's cold start: import time and per-rerun script time.
+
+Each page is run in fresh Python processes with Streamlit's AppTest harness and a
+config.json pointed at unreachable placeholder endpoints, since drawing a page must
+not need any Azure service. For each page it reports:
+
+- streamlit: importing Streamlit itself, which the server has done before any page runs
+- first run: the page's first execution in the process (its imports, config and
+  client setup, and drawing it); this is what stands between a new server process
+  and the first paint
+- rerun: a later execution, which is what every click costs
+- heavy SDKs the first run imported, and with --profile the slowest imports of the
+  first run
+
+    python -m benchmarks.cold_start --processes 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from services.startup import merge_config
+
+PAGES = ["app.py", "pages/1_Chat_with_Data.py", "pages/2_Call_Center.py"]
+HEAVY_MODULES = ["openai", "httpx", "requests", "azure.cognitiveservices.speech", "azure.ai.textanalytics", "scipy"]
+
+OVERRIDES = {
+    "AOAIEndpoint": "http://127.0.0.1:9",
+    "AOAIKey": "cold-start",
+    "SearchEndpoint": "http://127.0.0.1:9",
+    "SearchKey": "cold-start",
+    "SpeechKey": "cold-start",
+    "KeyVaultUrl": None,
+    "AnalysisCache": {"Directory": None},
+    "Startup": {"Prewarm": False},
+}
+
+# Runs in the child process: argv is the page path, the number of reruns and the
+# heavy module names.
+CHILD = """
+import json, sys, time
+page, reruns, heavy = sys.argv[1], int(sys.argv[2]), sys.argv[3].split(",")
+started = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+streamlit_seconds = time.perf_counter() - started
+before = set(sys.modules)
+app = AppTest.from_file(page, default_timeout=120)
+started = time.perf_counter()
+app.run()
+first_run = time.perf_counter() - started
+errors = [str(e.value) for e in app.exception]
+loaded = [name for name in heavy if name in sys.modules and name not in before]
+rerun_times = []
+for _ in range(reruns):
+    started = time.perf_counter()
+    app.run()
+    rerun_times.append(time.perf_counter() - started)
+print(json.dumps({"streamlit": streamlit_seconds, "first_run": first_run, "reruns": rerun_times,
+                  "loaded": loaded, "errors": errors, "new_modules": sorted(set(sys.modules) - before)}))
+"""
+
+
+def parse_import_profile(stderr, modules):
+    # Self and cumulative microseconds from -X importtime output, for the given modules.
+    profile = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+        name = parts[2].strip()
+        if name in modules:
+            profile[name] = (self_us, cumulative_us)
+    return profile
+
+
+def run_page(page, workdir, reruns, profile):
+    env = dict(os.environ, PYTHONPATH=os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    command = [sys.executable] + (["-X", "importtime"] if profile else []) + [
+        "-c", CHILD, os.path.abspath(page), str(reruns), ",".join(HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode or not lines:
+        raise RuntimeError(f"{page} failed:\n{result.stderr[-2000:]}")
+    measurement = json.loads(lines[-1])
+    if profile:
+        measurement["profile"] = parse_import_profile(result.stderr, set(measurement["new_modules"]))
+    return measurement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--processes", type=int, default=3, help="Fresh processes per page.")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns per process after the first run.")
+    parser.add_argument("--profile", action="store_true", help="Show the slowest imports of each page's first run.")
+    args = parser.parse_args()
+
+    with open("config.json") as f:
+        config = merge_config(json.load(f), OVERRIDES)
+    workdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(workdir, "config.json"), "w") as f:
+            json.dump(config, f)
+
+        print(f"{'page':<28} {'streamlit ms':>12} {'first run ms':>12} {'rerun ms':>9}  heavy SDKs loaded")
+        for page in args.pages:
+            runs = [run_page(page, workdir, args.reruns, args.profile) for _ in range(args.processes)]
+            errors = {error for run in runs for error in run["errors"]}
+            streamlit_ms = statistics.median(run["streamlit"] for run in runs) * 1000
+            first_ms = statistics.median(run["first_run"] for run in runs) * 1000
+            rerun_ms = statistics.median(t for run in runs for t in run["reruns"]) * 1000 if args.reruns else 0.0
+            loaded = ", ".join(runs[0]["loaded"]) or "none"
+            print(f"{page:<28} {streamlit_ms:12.1f} {first_ms:12.1f} {rerun_ms:9.1f}  {loaded}")
+            for error in errors:
+                print(f"    page raised: {error}")
+            if args.profile:
+                slowest = sorted(runs[0]["profile"].items(), key=lambda item: -item[1][1])[:8]
+                for name, (_, cumulative_us) in slowest:
+                    print(f"    {name:<40} {cumulative_us / 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
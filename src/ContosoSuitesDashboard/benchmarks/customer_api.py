@@ -0,0 +1,61 @@
+"""Benchmark the customer lookup transport against a local stub API.
+
+Compares the original `requests.get` + decode + `pd.read_json` path with the pooled
+CustomerApiClient, for a full fetch in one page and a paged fetch.
+
+    python -m benchmarks.customer_api --customers 20000 --iterations 20
+"""
+import argparse
+import io
+import statistics
+import time
+
+import pandas as pd
+import requests
+
+from benchmarks.stubs import StubCustomerApi, synthetic_customers
+from services.customer_api import CustomerApiClient
+
+
+def naive_get_customers(base_url, search_criterion, search_value):
+    # The transport get_customers used originally: no session, no timeout, decoded copy.
+    r = requests.get(
+        f"{base_url}/Customer/?searchCriterion={search_criterion}&searchValue={search_value}",
+        headers={"Content-Type": "application/json"}
+    )
+    return pd.read_json(io.StringIO(r.content.decode("utf-8")))
+
+
+def measure(name, fn, iterations):
+    timings = []
+    rows = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = len(fn())
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<32} rows={rows:<7} p50={statistics.median(timings):8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with StubCustomerApi(synthetic_customers(args.customers)) as api:
+        criterion, value = "DateOfMostRecentStay", "2023-01-15"
+        paged = CustomerApiClient(api.url, page_size=args.page_size)
+        single = CustomerApiClient(api.url, page_size=args.customers)
+
+        measure("naive requests.get", lambda: naive_get_customers(api.url, criterion, value), args.iterations)
+        measure("pooled, single page", lambda: single.get_customers(criterion, value), args.iterations)
+        measure(f"pooled, pages of {args.page_size}", lambda: paged.get_customers(criterion, value), args.iterations)
+        measure("pooled, first page only", lambda: next(paged.iter_customer_pages(criterion, value)), args.iterations)
+        print(f"stub requests served: {api.requests}")
+
+
+if __name__ == "__main__":
+    main()
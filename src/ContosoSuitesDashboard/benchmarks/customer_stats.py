@@ -0,0 +1,104 @@
+"""Benchmark the customer_stats views against grouping raw customer rows.
+
+Generates synthetic customers shaped like Customers.json and, for each size,
+reports how long the views take to build, the number of cube cells, query latency
+for a set of customer_stats questions compared with a pandas groupby over the raw
+rows, the cost of one incremental update, and the JSON payload the model would
+receive: the aggregates versus the matching customer rows.
+
+    python -m benchmarks.customer_stats --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from services.customer_stats import CustomerStatsViews
+
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+
+# (group_by, filters) for CustomerStatsViews.query
+QUERIES = [
+    (["LoyaltyTier"], {}),
+    ([], {"min_years": 20, "stayed_before": "2023-06-01"}),
+    (["LoyaltyTier", "YearsAsMember"], {}),
+    (["StayMonth"], {"loyalty_tier": "Gold"}),
+]
+
+
+def synthetic_customers(count, seed=1):
+    rng = random.Random(seed)
+    start = date(2022, 1, 1)
+    return [
+        {
+            "FirstName": f"First{i}", "LastName": f"Last{i}", "FullName": f"First{i} Last{i}",
+            "LoyaltyTier": rng.choice(TIERS), "YearsAsMember": rng.randint(1, 40),
+            "DateOfMostRecentStay": (start + timedelta(days=rng.randint(0, 700))).isoformat(),
+            "AverageRating": round(rng.uniform(3.0, 5.0), 1),
+        }
+        for i in range(count)
+    ]
+
+
+def pandas_query(frame, group_by, filters):
+    mask = pd.Series(True, index=frame.index)
+    if "loyalty_tier" in filters:
+        mask &= frame["LoyaltyTier"].str.lower() == filters["loyalty_tier"].lower()
+    if "min_years" in filters:
+        mask &= frame["YearsAsMember"] >= filters["min_years"]
+    if "stayed_before" in filters:
+        mask &= frame["DateOfMostRecentStay"] < filters["stayed_before"]
+    rows = frame[mask]
+    keys = {
+        "LoyaltyTier": rows["LoyaltyTier"],
+        "YearsAsMember": rows["YearsAsMember"] // 5 * 5,
+        "StayMonth": rows["DateOfMostRecentStay"].str[:7],
+    }
+    grouped = rows.groupby([keys[d] for d in group_by]) if group_by else rows.groupby(lambda _: 0)
+    return grouped.agg(Customers=("AverageRating", "size"), AverageRating=("AverageRating", "mean"),
+                       MinRating=("AverageRating", "min"), MedianRating=("AverageRating", "median"),
+                       MaxRating=("AverageRating", "max"), EarliestStay=("DateOfMostRecentStay", "min"),
+                       LatestStay=("DateOfMostRecentStay", "max")), rows
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        customers = synthetic_customers(size)
+        frame = pd.DataFrame(customers)
+        views = CustomerStatsViews()
+        started = time.perf_counter()
+        for customer in customers:
+            views.apply(None, customer)
+        build = time.perf_counter() - started
+        update_ms, _ = timed(lambda: views.apply(customers[0], dict(customers[0], AverageRating=4.0)), 1000)
+        views.apply(dict(customers[0], AverageRating=4.0), customers[0])
+        print(f"\n{size} customers: views built in {build:.2f}s, {views.cells} cells, "
+              f"{update_ms * 1000:.1f} us per update")
+        print(f"{'query':<6} {'groups':>7} {'views ms':>9} {'pandas ms':>10} {'stats bytes':>12} {'row bytes':>12}")
+        for number, (group_by, filters) in enumerate(QUERIES, start=1):
+            views_ms, stats = timed(lambda: views.query(group_by, **filters), args.repeat)
+            pandas_ms, (expected, rows) = timed(lambda: pandas_query(frame, group_by, filters), args.repeat)
+            assert stats["Customers"].sum() == expected["Customers"].sum() == len(rows), f"query {number} counts differ"
+            print(f"{number:<6} {len(stats):7d} {views_ms:9.2f} {pandas_ms:10.2f} "
+                  f"{len(stats.to_json(orient='records')):12d} {len(rows.to_json(orient='records')):12d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark the hotel facet index on a synthetically scaled property list.
+
+Scales Hotels.txt up to --hotels properties spread over the real resorts plus
+synthetic ones, then times a set of multi-predicate search_hotels queries three
+ways: with HotelFacetIndex (bitmaps and sorted columns), with boolean masks over
+the equivalent pandas DataFrame, and with a plain Python scan of the records.
+
+    python -m benchmarks.hotel_search --hotels 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import pandas as pd
+
+from services.hotel_index import HotelFacetIndex
+
+# (features, amenities, categories, ranges)
+QUERIES = [
+    (["ev_charging_available", "covered_parking"], [], {"nation": "Aruba"}, {"meeting_rooms": (2, None)}),
+    (["free_breakfast"], ["Spa"], {}, {"number_of_rooms": (100, 200)}),
+    (["business_center", "digital_key", "self_parking"], ["Pool", "Casino"], {}, {"ballrooms_for_receptions": (1, None)}),
+    (["beachfront", "restaurant"], [], {"city": "San Juan"}, {}),
+]
+
+
+def synthetic_data(count, resorts_per_nation=20, seed=1):
+    rng = random.Random(seed)
+    with open("../data/Hotels.txt") as f:
+        hotels = json.load(f)
+    with open("../data/Resorts.txt") as f:
+        resorts = json.load(f)
+    amenities = sorted({amenity for resort in resorts for amenity in resort["amenities"]})
+    nations = sorted({resort["nation"] for resort in resorts})
+    for nation in nations:
+        for i in range(resorts_per_nation):
+            resorts.append({
+                "resort name": f"{nation} Resort {i}", "nation": nation, "city": f"{nation} City {i % 5}",
+                "beachfront": rng.random() < 0.5, "restaurant": rng.random() < 0.8,
+                "amenities": rng.sample(amenities, rng.randint(2, 6)),
+            })
+    resort_names = [resort["resort name"] for resort in resorts]
+    scaled = []
+    for i in range(count):
+        template = hotels[i % len(hotels)]
+        hotel = {key: (rng.random() < 0.5 if isinstance(value, bool) else value) for key, value in template.items()}
+        hotel["hotel name"] = f"{template['hotel name']} {i}"
+        hotel["resort name"] = rng.choice(resort_names)
+        hotel["meeting rooms"] = rng.randint(0, 10)
+        hotel["ballrooms for receptions"] = rng.randint(0, 3)
+        hotel["number of rooms"] = rng.randint(20, 400)
+        scaled.append(hotel)
+    return scaled, resorts
+
+
+def pandas_filter(frame, features, amenities, categories, ranges):
+    mask = pd.Series(True, index=frame.index)
+    for feature in features:
+        mask &= frame[feature]
+    for amenity in amenities:
+        mask &= frame["amenities"].map(lambda values: amenity in values)
+    for column, value in categories.items():
+        mask &= frame[column].str.lower() == value.lower()
+    for column, (minimum, maximum) in ranges.items():
+        if minimum is not None:
+            mask &= frame[column] >= minimum
+        if maximum is not None:
+            mask &= frame[column] <= maximum
+    return mask.to_numpy().nonzero()[0]
+
+
+def scan_filter(records, features, amenities, categories, ranges):
+    return [
+        i for i, record in enumerate(records)
+        if all(record[feature] for feature in features)
+        and all(amenity in record["amenities"] for amenity in amenities)
+        and all(str(record[column]).lower() == value.lower() for column, value in categories.items())
+        and all((minimum is None or record[column] >= minimum) and (maximum is None or record[column] <= maximum)
+                for column, (minimum, maximum) in ranges.items())
+    ]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hotels", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    hotels, resorts = synthetic_data(args.hotels)
+    started = time.perf_counter()
+    index = HotelFacetIndex(hotels, resorts)
+    print(f"Built the index over {len(index)} hotels and {len(resorts)} resorts in {time.perf_counter() - started:.2f}s.")
+    frame = index.frame
+    records = frame.to_dict("records")
+
+    print(f"{'query':<6} {'matches':>8} {'index ms':>9} {'pandas ms':>10} {'scan ms':>9}")
+    for number, (features, amenities, categories, ranges) in enumerate(QUERIES, start=1):
+        index_ms, rows = timed(lambda: index.filter(features, amenities, categories, ranges), args.repeat)
+        pandas_ms, expected = timed(lambda: pandas_filter(frame, features, amenities, categories, ranges), max(1, args.repeat // 4))
+        scan_ms, scanned = timed(lambda: scan_filter(records, features, amenities, categories, ranges), max(1, args.repeat // 4))
+        assert list(rows) == list(expected) == scanned, f"query {number} results differ"
+        print(f"{number:<6} {len(rows):8d} {index_ms:9.2f} {pandas_ms:10.2f} {scan_ms:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark the local hybrid retriever as the corpus grows.
+
+Builds LocalSearchIndex over synthetic hotel-like passages of increasing size and
+reports build, save and load times, index size on disk and query latency
+percentiles for a fixed set of queries. The real Hotels.txt/Resorts.txt index is
+measured first for reference.
+
+    python -m benchmarks.local_search --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from services.local_search import LocalSearchIndex, Passage, load_passages
+
+QUERIES = [
+    "Which resorts have a spa?",
+    "hotels with free breakfast and EV charging",
+    "meeting rooms and a ballroom for a wedding reception",
+    "beachfront resort with a casino in Aruba",
+    "covered parking near San Juan",
+    "Is there a dive center in Bonaire?",
+]
+
+WORDS = ("spa pool casino gym deck massage beachfront restaurant breakfast parking charging ballroom meeting "
+         "business center digital key suite ocean view airport downtown marina golf tennis kids club dive "
+         "bike rental sauna yoga shuttle wifi bar lounge terrace garden").split()
+PLACES = ["Aruba", "Bonaire", "Curacao", "Puerto Rico", "Virgin Islands", "Jamaica", "Bahamas", "Barbados"]
+
+
+def synthetic_passages(count, seed=1):
+    rng = random.Random(seed)
+    passages = []
+    for i in range(count):
+        place = rng.choice(PLACES)
+        words = " ".join(rng.choices(WORDS, k=rng.randint(15, 40)))
+        passages.append(Passage(title=f"Hotel {i} {place}", text=f"Resort name: {place} {i % 97}. Amenities: {words}.",
+                                source="synthetic"))
+    return passages
+
+
+def measure(name, passages):
+    started = time.perf_counter()
+    index = LocalSearchIndex(passages)
+    build = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(), "index.pkl")
+    started = time.perf_counter()
+    index.save(path)
+    save = time.perf_counter() - started
+    started = time.perf_counter()
+    index = LocalSearchIndex.load(path)
+    load = time.perf_counter() - started
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    os.remove(path)
+
+    latencies = []
+    for _ in range(20):
+        for query in QUERIES:
+            started = time.perf_counter()
+            index.search(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:<12} {len(index):>9} {build:9.2f} {save * 1000:8.1f} {load * 1000:8.1f} {size_mb:8.1f} "
+          f"{statistics.median(latencies):9.2f} {p95:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--sources", nargs="+", default=["../data/Hotels.txt", "../data/Resorts.txt"])
+    args = parser.parse_args()
+
+    print(f"{'corpus':<12} {'passages':>9} {'build s':>9} {'save ms':>8} {'load ms':>8} {'MB':>8} {'query p50':>9} {'query p95':>9}")
+    measure("data", load_passages(args.sources))
+    for size in args.sizes:
+        measure("synthetic", synthetic_passages(size))
+
+
+if __name__ == "__main__":
+    main()
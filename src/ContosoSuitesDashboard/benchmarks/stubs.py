@@ -0,0 +1,369 @@
+"""Local stand-ins for the services the dashboard talks to."""
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import date, timedelta
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIRST_NAMES = ["Amber", "Ana", "Dakota", "Amari", "Briana", "Aaron", "Eric", "Jordan", "Kai", "Maria", "Noah", "Priya"]
+LAST_NAMES = ["Rodriguez", "Bowman", "Sanchez", "Rivera", "Hernandez", "Gonzales", "Solomon", "Lee", "Patel", "Nguyen"]
+LOYALTY_TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+
+
+def synthetic_customers(count, seed=42):
+    # Generate customers in the same shape as src/data/Customers.json.
+    rng = random.Random(seed)
+    customers = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        customers.append({
+            "FirstName": first,
+            "LastName": f"{last}{i}",
+            "FullName": f"{first} {last}{i}",
+            "LoyaltyTier": rng.choice(LOYALTY_TIERS),
+            "YearsAsMember": rng.randint(1, 40),
+            "DateOfMostRecentStay": (date(2023, 1, 1) + timedelta(days=rng.randint(0, 364))).isoformat(),
+            "AverageRating": round(rng.uniform(3.0, 5.0), 1),
+        })
+    return customers
+
+
+class _Server:
+    # Runs a ThreadingHTTPServer on a free localhost port in a background thread.
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubCustomerApi(_Server):
+    """Stand-in for the ContosoSuitesWebAPI /Customer endpoint, with paging."""
+
+    def __init__(self, customers):
+        self.customers = customers
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small SSE writes must not wait on Nagle/delayed-ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                body = stub.query(query)
+                if body is None:
+                    self.send_response(400)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        super().__init__(Handler)
+
+    def query(self, query):
+        criterion, value = query.get("searchCriterion"), query.get("searchValue", "")
+        if criterion == "CustomerName":
+            rows = [c for c in self.customers if c["FullName"] == value]
+        elif criterion == "LoyaltyTier":
+            rows = [c for c in self.customers if c["LoyaltyTier"] == value]
+        elif criterion == "DateOfMostRecentStay":
+            rows = [c for c in self.customers if c["DateOfMostRecentStay"] > value]
+        else:
+            return None
+        if "skip" in query or "take" in query:
+            skip = int(query.get("skip", 0))
+            take = int(query.get("take", len(rows)))
+            rows = sorted(rows, key=lambda c: c["FullName"])[skip:skip + take]
+        return json.dumps(rows).encode("utf-8")
+
+
+class StubOpenAI(_Server):
+    """Stand-in for the Azure OpenAI chat completions endpoint.
+
+    Answers every POST to .../chat/completions after `latency` seconds with
+    `completion_tokens` tokens, either as one JSON response or, for stream=true,
+    as server-sent events paced at `tokens_per_second`. With `tool_calls` (a list of
+    {"name": ..., "arguments": {...}}), requests that offer tools and do not yet
+    contain tool results are answered with those tool calls instead. Requests in
+    JSON response mode get the tokens as a JSON object: a five-token "title" field
+    followed by a "body" field with the rest, like the query-based summary.
+
+    Throttling can be simulated like Azure OpenAI does it: with `requests_per_minute`
+    set, requests over that quota (in a sliding 60 second window) get a 429 with a
+    Retry-After header, and `rate_limit_ratio` rejects that fraction of the remaining
+    requests at random.
+    """
+
+    def __init__(self, latency=0.05, tokens_per_second=200.0, completion_tokens=60, content=None, tool_calls=None,
+                 requests_per_minute=None, rate_limit_ratio=0.0, retry_after=1.0, seed=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.content = content
+        self.tool_calls = tool_calls
+        self.requests_per_minute = requests_per_minute
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self._accepted = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small SSE writes must not wait on Nagle/delayed-ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                stub.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not urlparse(self.path).path.endswith("/chat/completions"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                retry_after = stub.throttle()
+                if retry_after is not None:
+                    stub.reject(self, retry_after)
+                    return
+                time.sleep(stub.latency)
+                if stub.wants_tool_calls(body):
+                    stub.call_tools(self, body)
+                elif body.get("stream"):
+                    stub.stream_completion(self, body)
+                else:
+                    stub.complete(self, body)
+
+        super().__init__(Handler)
+
+    def tokens(self, body):
+        if self.content is not None:
+            return [word + " " for word in self.content.split()]
+        tokens = [f"token{i} " for i in range(self.completion_tokens)]
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            return ['{"title": "', *tokens[:5], '", "body": "', *tokens[5:], '"}']
+        return tokens
+
+    def throttle(self):
+        # Return the Retry-After delay if this request should be rejected, else None.
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            if self.requests_per_minute and len(self._accepted) >= self.requests_per_minute:
+                self.rate_limited += 1
+                return max(0.1, 60 - (now - self._accepted[0]))
+            if self.rate_limit_ratio and self._random.random() < self.rate_limit_ratio:
+                self.rate_limited += 1
+                return self.retry_after
+            self._accepted.append(now)
+            return None
+
+    def reject(self, handler, retry_after):
+        payload = json.dumps({"error": {
+            "code": "429",
+            "message": f"Requests to the ChatCompletions_Create Operation have exceeded the rate limit. "
+                       f"Please retry after {retry_after:.0f} seconds.",
+        }}).encode("utf-8")
+        handler.send_response(429)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Retry-After", str(max(1, round(retry_after))))
+        handler.send_header("retry-after-ms", str(int(retry_after * 1000)))
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def wants_tool_calls(self, body):
+        messages = body.get("messages") or [{}]
+        return bool(self.tool_calls and body.get("tools") and body.get("tool_choice") != "none"
+                    and messages[-1].get("role") != "tool")
+
+    def call_tools(self, handler, body):
+        self.send_json(handler, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {"id": f"call_{i}", "type": "function",
+                         "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}}
+                        for i, call in enumerate(self.tool_calls)
+                    ],
+                },
+            }],
+        })
+
+    def send_json(self, handler, body):
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def complete(self, handler, body):
+        tokens = self.tokens(body)
+        time.sleep(len(tokens) / self.tokens_per_second)
+        self.send_json(handler, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+        })
+
+    def stream_completion(self, handler, body):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def send(data):
+            event = f"data: {data}\n\n".encode("utf-8")
+            handler.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            handler.wfile.flush()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        for token in self.tokens(body):
+            time.sleep(1 / self.tokens_per_second)
+            send(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": None, "delta": {"content": token}}],
+            }))
+        send("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+
+
+class _Signal:
+    # Mimics the SDK's EventSignal: callbacks are registered with connect().
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def fire(self, evt):
+        for callback in list(self._callbacks):
+            callback(evt)
+
+
+class FakePushStream:
+    """Stand-in for speechsdk.audio.PushAudioInputStream that feeds a FakeTranscriber."""
+
+    def __init__(self, bytes_per_second=32000):
+        self.bytes_per_second = bytes_per_second
+        self.bytes_written = 0
+        self._frames = queue.Queue()
+
+    def write(self, buffer):
+        self.bytes_written += len(buffer)
+        self._frames.put(len(buffer))
+
+    def close(self):
+        self._frames.put(None)
+
+
+class FakeTranscriber:
+    """Stand-in for speechsdk.transcription.ConversationTranscriber.
+
+    "Recognizes" one phrase for every `phrase_seconds` of pushed audio, spending
+    `real_time_factor` seconds of processing per second of audio, and fires the same
+    events (with result.text/offset/duration) as the real transcriber.
+    """
+
+    def __init__(self, stream, phrase_seconds=5.0, real_time_factor=0.05):
+        self.stream = stream
+        self.phrase_seconds = phrase_seconds
+        self.real_time_factor = real_time_factor
+        self.transcribing = _Signal()
+        self.transcribed = _Signal()
+        self.session_started = _Signal()
+        self.session_stopped = _Signal()
+        self.canceled = _Signal()
+        self._stopped = threading.Event()
+
+    def _result(self, index, start, end):
+        return SimpleNamespace(result=SimpleNamespace(
+            text=f"Phrase {index} of the recorded call.",
+            offset=int(start * 10_000_000),
+            duration=int((end - start) * 10_000_000),
+        ))
+
+    def _run(self):
+        self.session_started.fire("SessionEventArgs(session_id=fake)")
+        position, phrase_start, phrases = 0.0, 0.0, 0
+        while not self._stopped.is_set():
+            size = self.stream._frames.get()
+            if size is None:
+                break
+            seconds = size / self.stream.bytes_per_second
+            time.sleep(seconds * self.real_time_factor)
+            position += seconds
+            self.transcribing.fire(self._result(phrases, phrase_start, position))
+            if position - phrase_start >= self.phrase_seconds:
+                self.transcribed.fire(self._result(phrases, phrase_start, position))
+                phrases, phrase_start = phrases + 1, position
+        if position > phrase_start:
+            self.transcribed.fire(self._result(phrases, phrase_start, position))
+        self.session_stopped.fire("SessionEventArgs(session_id=fake)")
+
+    def start_transcribing_async(self):
+        threading.Thread(target=self._run, name="fake-transcriber", daemon=True).start()
+
+    def stop_transcribing_async(self):
+        self._stopped.set()
+        self.stream._frames.put(None)
+
+
+def create_fake_file_transcriber(phrase_seconds=5.0, real_time_factor=0.05, bytes_per_second=32000):
+    # Same shape as services.call_center.create_file_transcriber: (transcriber, stream).
+    stream = FakePushStream(bytes_per_second)
+    return FakeTranscriber(stream, phrase_seconds, real_time_factor), stream
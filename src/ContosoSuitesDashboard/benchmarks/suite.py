@@ -0,0 +1,302 @@
+"""Benchmark the dashboard's hot paths against local stand-ins for Azure.
+
+Loads the real Streamlit pages (without running main()) with config.json pointed at
+the stubs in benchmarks/stubs.py, then times:
+
+- chat_streaming: create_chat_completion, consumed through completion_deltas
+- chat_local: create_local_chat_completion (local retrieval plus the streamed answer)
+- function_calls: create_chat_completion_with_functions, the tool calls and the
+  streamed follow-up answer
+- get_customers: the get_customers tool against the stub customer API
+- transcription: create_transcription_request with a fake Speech push stream
+- compliance: is_call_in_compliance (bypassing the analysis cache)
+- compliance_long: the same for a transcript several chunks long (map-reduce)
+- compliance_streaming: stream_call_compliance, answers parsed from JSON mode as
+  they stream; time to first token is the time to the first complete answer
+- query_summary: generate_query_based_summary, the blocking completion; its time
+  to first token is the whole call, as nothing can be shown before it returns
+- query_summary_streaming: stream_query_based_summary; time to first token is the
+  time to the complete call title
+
+For each it reports end-to-end latency percentiles, time to first token where there
+is one, throughput (calls per second, and tokens, rows or phrases per second) and
+the process's peak RSS. Results can be saved as a baseline and later runs compared
+against it; the exit status is 1 if a benchmark in --gate regressed by more than
+--tolerance. benchmarks/baseline.json is the committed baseline, taken with the
+default stub settings. Only the benchmarks whose timings are dominated by the
+stubs' simulated latencies (GATED) carry over between machines, so only those are
+gated by default. get_customers (parsing thousands of rows with pandas) and
+chat_local (local retrieval) measure this machine's CPU; their regressions are
+reported but do not fail the run. Regenerate and commit the baseline when a change
+is meant to move the numbers.
+
+    python -m benchmarks.suite --iterations 20 --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --iterations 20 --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import StubCustomerApi, StubOpenAI, create_fake_file_transcriber, synthetic_customers
+from services.startup import load_page
+from services.streaming import completion_deltas
+from services.tool_engine import assistant_tool_call_message, tool_result_messages
+
+BENCHMARKS = ["chat_streaming", "chat_local", "function_calls", "get_customers", "transcription", "compliance", "compliance_long",
+              "compliance_streaming", "query_summary", "query_summary_streaming"]
+
+# Timed mostly by the stubs' latencies, so comparable with a baseline from another machine.
+GATED = ["chat_streaming", "function_calls", "transcription", "compliance", "compliance_long", "compliance_streaming",
+         "query_summary", "query_summary_streaming"]
+
+# Lower is better for latencies, higher for throughput.
+HIGHER_IS_BETTER = {"throughput", "units_per_second"}
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far, or None where unsupported.
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Sample:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.units = 0
+
+    def token(self, count=1):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        self.units += count
+
+
+def run_benchmark(fn, iterations, concurrency, warmup):
+    # Call fn(sample) iterations times on `concurrency` threads; returns the metrics.
+    for _ in range(warmup):
+        fn(Sample())
+
+    def timed(_):
+        sample = Sample()
+        fn(sample)
+        return time.perf_counter() - sample.started, sample
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for latency, _ in results]
+    ttfts = [sample.first_token * 1000 for _, sample in results if sample.first_token is not None]
+    metrics = {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput": iterations / elapsed,
+        "units_per_second": sum(sample.units for _, sample in results) / elapsed,
+    }
+    if ttfts:
+        metrics["ttft_p50"] = statistics.median(ttfts)
+        metrics["ttft_p95"] = percentile(ttfts, 95)
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return metrics
+
+
+def build_benchmarks(chat_page, call_center_page, args):
+    messages = [{"role": "user", "content": "Which of your resorts have a spa?"}]
+    config = chat_page.config
+
+    def chat_streaming(sample):
+        stream = chat_page.create_chat_completion(
+            chat_page.deployment_name, messages, chat_page.SearchEndpoint, chat_page.SearchKey, config["SearchIndex"])
+        for delta in completion_deltas(stream):
+            if delta:
+                sample.token()
+
+    def chat_local(sample):
+        stream = chat_page.create_local_chat_completion(chat_page.deployment_name, messages)
+        for delta in completion_deltas(stream):
+            if delta:
+                sample.token()
+
+    def function_calls(sample):
+        prompt = [{"role": "user", "content": "Which customers are in the Gold loyalty tier?"}]
+        response = chat_page.create_chat_completion_with_functions(chat_page.deployment_name, prompt)
+        response_message = response.choices[0].message
+        results = chat_page.get_tool_executor().run(response_message.tool_calls)
+        follow_up = prompt + [assistant_tool_call_message(response_message)] + tool_result_messages(results)
+        stream = chat_page.create_chat_completion_with_functions(
+            chat_page.deployment_name, follow_up, stream=True, tool_choice="none")
+        for delta in completion_deltas(stream):
+            if delta:
+                sample.token()
+
+    def get_customers(sample):
+        customers = chat_page.get_customers("LoyaltyTier", "Gold")
+        sample.units += len(customers)
+
+    def transcription(sample):
+        results = call_center_page.create_transcription_request(
+            args.audio, call_center_page.speech_key, call_center_page.speech_region)
+        sample.units += len(results)
+
+    transcript = ["Phrase {} of the recorded call.".format(i) for i in range(10)]
+
+    def compliance(sample):
+        # __wrapped__ skips the analysis cache so every call reaches the model.
+        answer = call_center_page.is_call_in_compliance.__wrapped__(transcript, True, True)
+        sample.units += len(answer.split())
+
+    long_transcript = ["Phrase {} of a long recorded call about a resort booking.".format(i) for i in range(2000)]
+
+    def compliance_long(sample):
+        answer = call_center_page.is_call_in_compliance.__wrapped__(long_transcript, True, True)
+        sample.units += len(answer.split())
+
+    def compliance_streaming(sample):
+        # __wrapped__ skips the analysis cache so every call reaches the model.
+        for _ in call_center_page.stream_call_compliance.__wrapped__(transcript, True, True):
+            sample.token()
+
+    def query_summary(sample):
+        answer = call_center_page.generate_query_based_summary.__wrapped__(transcript)
+        sample.token(len(answer.split()))
+
+    def query_summary_streaming(sample):
+        for _ in call_center_page.stream_query_based_summary.__wrapped__(transcript):
+            sample.token()
+
+    return {
+        "chat_streaming": chat_streaming,
+        "chat_local": chat_local,
+        "function_calls": function_calls,
+        "get_customers": get_customers,
+        "transcription": transcription,
+        "compliance": compliance,
+        "compliance_long": compliance_long,
+        "compliance_streaming": compliance_streaming,
+        "query_summary": query_summary,
+        "query_summary_streaming": query_summary_streaming,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Return a list of human-readable regressions against the baseline.
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if value is None or not base or metric == "peak_rss_mb":
+                continue
+            change = (value - base) / base
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name}.{metric}: {base:.2f} -> {value:.2f} ({change:+.0%} worse)")
+    return regressions
+
+
+def format_row(name, metrics):
+    ttft = f"{metrics['ttft_p50']:8.1f} {metrics['ttft_p95']:8.1f}" if "ttft_p50" in metrics else f"{'-':>8} {'-':>8}"
+    rss = f"{metrics['peak_rss_mb']:8.1f}" if metrics["peak_rss_mb"] is not None else f"{'-':>8}"
+    return (f"{name:<24} {metrics['p50']:8.1f} {metrics['p95']:8.1f} {metrics['p99']:8.1f} {ttft} "
+            f"{metrics['throughput']:8.2f} {metrics['units_per_second']:10.1f} {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub OpenAI latency before the first token, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--speech-real-time-factor", type=float, default=0.02)
+    parser.add_argument("--audio", default="../data/audio/02_Customer_Call_Bad.wav")
+    parser.add_argument("--baseline", help="Compare against this baseline file.")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression, e.g. 0.25 for 25%%.")
+    parser.add_argument("--gate", nargs="+", choices=BENCHMARKS, default=GATED,
+                        help="Benchmarks whose regressions fail the run; the others are only reported.")
+    args = parser.parse_args()
+
+    openai_stub = StubOpenAI(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        tool_calls=[{"name": "get_customers", "arguments": {"search_criterion": "LoyaltyTier", "search_value": "Gold"}}],
+    )
+    customer_stub = StubCustomerApi(synthetic_customers(args.customers))
+    with openai_stub, customer_stub:
+        overrides = {
+            "AOAIEndpoint": openai_stub.url,
+            "AOAIKey": "benchmark",
+            "SearchEndpoint": "https://search.invalid",
+            "SearchKey": "benchmark",
+            "SpeechKey": "benchmark",
+            "KeyVaultUrl": None,
+            "CustomerBackend": "api",
+            "CustomerBackendFallback": False,
+            "CustomerApi": {"BaseUrl": customer_stub.url},
+            "ToolExecution": {"CustomerCacheSeconds": 0, "HotelCacheSeconds": 0},
+            "ResponseCache": {"EmbeddingDeploymentName": None},
+            "AnalysisCache": {"Directory": None, "MaxMemoryEntries": 0},
+            "LocalSearch": {"IndexPath": None},
+        }
+        # The pages print to stdout from Speech callbacks; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            chat_page = load_page("pages/1_Chat_with_Data.py", "chat_with_data_page", overrides)
+            call_center_page = load_page("pages/2_Call_Center.py", "call_center_page", overrides)
+        call_center_page.create_file_transcriber = lambda *a, **k: create_fake_file_transcriber(
+            real_time_factor=args.speech_real_time_factor)
+        benchmarks = build_benchmarks(chat_page, call_center_page, args)
+
+        print(f"{'benchmark':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttft p50':>8} {'ttft p95':>8} "
+              f"{'ops/s':>8} {'units/s':>10} {'rss MB':>8}")
+        results = {}
+        for name in args.only:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = run_benchmark(benchmarks[name], args.iterations, args.concurrency, args.warmup)
+            print(format_row(name, results[name]))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.save_baseline}.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare({n: m for n, m in results.items() if n in args.gate}, baseline, args.tolerance)
+        reported = compare({n: m for n, m in results.items() if n not in args.gate}, baseline, args.tolerance)
+        if reported:
+            print(f"Not gated, machine-dependent changes beyond {args.tolerance:.0%}:")
+            for regression in reported:
+                print(f"  {regression}")
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
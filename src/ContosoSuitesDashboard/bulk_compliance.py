@@ -0,0 +1,92 @@
+"""Compliance-check a day's worth of call transcripts at once.
+
+Reads transcripts from a JSONL file written by batch_transcribe.py (one object per
+line with "file" and "transcript"), checks them concurrently within the deployment's
+rate limits and appends one result per call to the output JSONL file as soon as it
+completes. Calls that already have a result in the output are skipped.
+
+    python bulk_compliance.py results.jsonl compliance.jsonl --rpm 300 --tpm 50000
+"""
+import argparse
+import json
+import os
+
+from services.bulk_compliance import BulkComplianceChecker
+
+
+def read_transcripts(path, skip):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("transcript") and row["file"] not in skip:
+                yield row["file"], row["transcript"]
+
+
+def completed(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not row.get("error"):
+                    done.add(row["file"])
+    return done
+
+
+def main():
+    with open("config.json") as f:
+        config = json.load(f)
+    bulk_config = config.get("BulkCompliance", {})
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("transcripts", help="JSONL output of batch_transcribe.py.")
+    parser.add_argument("output", help="JSONL file to append compliance results to.")
+    parser.add_argument("--concurrency", type=int, default=bulk_config.get("Concurrency", 8))
+    parser.add_argument("--rpm", type=int, default=bulk_config.get("RequestsPerMinute"),
+                        help="The deployment's requests-per-minute quota.")
+    parser.add_argument("--tpm", type=int, default=bulk_config.get("TokensPerMinute"),
+                        help="The deployment's tokens-per-minute quota.")
+    parser.add_argument("--max-retries", type=int, default=bulk_config.get("MaxRetries", 6))
+    parser.add_argument("--no-recording-message", action="store_true",
+                        help="Do not ask whether the caller was told the call was recorded.")
+    parser.add_argument("--no-relevance", action="store_true",
+                        help="Do not ask whether the call was relevant to the hotel and resort industry.")
+    args = parser.parse_args()
+
+    calls = list(read_transcripts(args.transcripts, completed(args.output)))
+    print(f"{len(calls)} calls to check.")
+    checker = BulkComplianceChecker(
+        config["AOAIEndpoint"], config["AOAIKey"], config["AOAIDeploymentName"],
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_retries=args.max_retries,
+        max_chunk_tokens=config.get("LongTranscripts", {}).get("MaxChunkTokens", 3000),
+    )
+    failed = 0
+    with open(args.output, "a", encoding="utf-8") as out:
+        results = checker.iter_results(calls, not args.no_recording_message, not args.no_relevance)
+        for i, result in enumerate(results, start=1):
+            out.write(json.dumps({
+                "file": result.call_id,
+                "compliance": result.compliance,
+                "error": result.error,
+                "attempts": result.attempts,
+                "rate_limited": result.rate_limited,
+                "seconds": round(result.elapsed, 3),
+            }) + "\n")
+            out.flush()
+            failed += not result.ok
+            status = f"ERROR {result.error}" if result.error else f"{result.elapsed:.1f}s, {result.attempts} attempt(s)"
+            print(f"[{i}/{len(calls)}] {os.path.basename(result.call_id)}: {status}")
+    print(f"Done: {len(calls) - failed} checked, {failed} failed.")
+
+
+if __name__ == "__main__":
+    main()
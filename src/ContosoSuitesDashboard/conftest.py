@@ -0,0 +1,2 @@
+# Lets the tests import the dashboard's modules (services, benchmarks, ...) the same
+# way the pages do, with this directory on sys.path.
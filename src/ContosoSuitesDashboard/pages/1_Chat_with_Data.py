@@ -1,44 +1,106 @@
+import time
+script_started = time.perf_counter()
+
 import streamlit as st
-import requests
-import pandas as pd
 import json
-import openai
-import inspect
-import azure.cognitiveservices.speech as speechsdk
+from typing import Literal
 import os
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+from services.openai_clients import configure_pool, get_openai_client
+from services.secrets_provider import get_secrets_provider
+from services.streaming import StreamingRenderer, completion_deltas, text_deltas
+from services.response_cache import get_response_cache
+from services.history import ConversationWindow, count_tokens
+from services.customer_store import get_customer_store
+from services.customer_stats import get_customer_stats
+from services.customer_api import get_customer_api_client
+from services.tool_engine import ToolExecutor, assistant_tool_call_message, tool_result_messages
+from services.tool_registry import get_tool_registry
+from services.metrics import configure_metrics
+from services.startup import load_config, prewarm
+from services.local_search import format_passages, get_local_search_index
+from services.hotel_index import get_hotel_index
 
 st.set_page_config(layout="wide")
 
-with open('config.json') as f:
-    config = json.load(f)
+# Parsed once per process rather than on every rerun. The OpenAI, Speech and HTTP
+# SDKs are imported where they are used (and pre-warmed in the background, see the
+# end of this script) so they do not delay the first paint.
+config = load_config()
+
+metrics_settings = config.get("Metrics", {})
+metrics = configure_metrics(
+    enabled=metrics_settings.get("Enabled", False),
+    export_port=metrics_settings.get("ExportPort"),
+    window=metrics_settings.get("Window", 1024),
+)
+
+# Retrieve the API keys from the Key Vault. The provider fetches all secrets at once,
+# caches them for the life of the process and falls back to config.json when needed.
+secrets = get_secrets_provider(
+    config.get("KeyVaultUrl", "https://akv-contoso-suites.vault.azure.net/"),
+    ["AOAIEndpoint", "AOAIKey", "SearchEndpoint", "SearchKey", "SpeechKey"],
+    fallback=config,
+    ttl=config.get("SecretsCacheSeconds", 3600),
+).get_all()
+
+aoai_endpoint = secrets["AOAIEndpoint"]
+aoai_api_key = secrets["AOAIKey"]
+SearchEndpoint = secrets["SearchEndpoint"]
+SearchKey = secrets["SearchKey"]
+speech_key = secrets["SpeechKey"]
 
-# Set up the Key Vault client
-credential = DefaultAzureCredential()
-client = SecretClient(vault_url="https://akv-contoso-suites.vault.azure.net/", credential=credential)
+deployment_name = config['AOAIDeploymentName']
+speech_region = config['SpeechRegion']
+configure_pool(**config.get('AOAIConnectionPool', {}))
+
+response_cache_settings = config.get('ResponseCache', {})
+embedding_deployment_name = response_cache_settings.get('EmbeddingDeploymentName')
+
+def embed_text(text):
+    # Embed text with the configured Azure OpenAI embedding deployment.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, embedding_deployment_name)
+    return client.embeddings.create(model=embedding_deployment_name, input=text).data[0].embedding
+
+response_cache = get_response_cache(
+    max_entries=response_cache_settings.get('MaxEntries', 256),
+    max_bytes=response_cache_settings.get('MaxBytes', 4 * 1024 * 1024),
+    ttl=response_cache_settings.get('TTLSeconds', 3600),
+    tail_messages=response_cache_settings.get('TailMessages', 3),
+    similarity_threshold=response_cache_settings.get('SimilarityThreshold', 0.95),
+    embed_fn=embed_text if embedding_deployment_name else None,
+)
+
+def summarize_conversation(previous_summary, messages):
+    # Used by the conversation window to compact older turns in the background.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = client.chat.completions.create(
+        model=deployment_name,
+        messages=[
+            {"role": "system", "content": "Summarize this conversation between a Contoso Suites employee and an assistant in at most five sentences. Keep customer names, hotels, resorts, dates and any open questions."},
+            {"role": "user", "content": f"Summary so far: {previous_summary or 'None'}\n\nNew messages:\n{transcript}"}
+        ],
+    )
+    return response.choices[0].message.content
 
-# Retrieve the API key from the Key Vault
 
-aoai_endpoint = client.get_secret("AOAIEndpoint").value
-aoai_api_key = client.get_secret("AOAIKey").value
-SearchEndpoint = client.get_secret("SearchEndpoint").value
-SearchKey = client.get_secret("SearchKey").value
-speech_key = client.get_secret("SpeechKey").value
+def get_conversation_window():
+    # Each browser session gets its own window over its own chat history.
+    if "conversation_window" not in st.session_state:
+        window_settings = config.get("ConversationWindow", {})
+        st.session_state.conversation_window = ConversationWindow(
+            token_budget=window_settings.get("TokenBudget", 3000),
+            summarize_fn=summarize_conversation if window_settings.get("Summarize", True) else None,
+            summarize_after_tokens=window_settings.get("SummarizeAfterTokens", 1500),
+        )
+    return st.session_state.conversation_window
 
-deployment_name = config['AOAIDeploymentName']
-speech_region = config['SpeechRegion']
 
 ### Exercise 02: Chat with customer data
 def create_chat_completion(deployment_name, messages, endpoint, key, index_name):
-    # Create an Azure OpenAI client. We create it in here because each exercise will
-    # require at a minimum different base URLs.
-    #
-    client = openai.AzureOpenAI(
-        base_url=f"{aoai_endpoint}/openai/deployments/{deployment_name}/extensions/",
-        api_key=aoai_api_key,
-        api_version="2023-12-01-preview"
-    )
+    # Get the pooled Azure OpenAI client. Each exercise requires at a minimum different
+    # base URLs, so the registry keeps a separate client per base URL flavor.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name, flavor="extensions")
     
     # Create and return a new chat completion request
     # Be sure to include the "extra_body" parameter to use Azure AI Search as the data source
@@ -65,6 +127,47 @@ def create_chat_completion(deployment_name, messages, endpoint, key, index_name)
     )
     
 
+# "Chat with Data" can ground its answers in Azure AI Search (the "search" source) or
+# in an in-process index over the hotel, resort and FAQ documents ("local"), which
+# avoids the search round trip. "Grounding" in config.json picks the default.
+GROUNDING_SOURCES = {"search": "Azure AI Search", "local": "Local index"}
+local_search_settings = config.get("LocalSearch", {})
+
+def get_local_index():
+    # Loaded (or built) on first use and shared by every session.
+    return get_local_search_index(
+        local_search_settings.get("Sources", ["../data/Hotels.txt", "../data/Resorts.txt", "../data/faq"]),
+        local_search_settings.get("IndexPath", ".cache/local_search.pkl"),
+    )
+
+def create_local_chat_completion(deployment_name, messages):
+    # Ground the answer in passages retrieved from the local index for the latest
+    # user turns, sent in the system message instead of through a data source.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    query = " ".join([m["content"] for m in messages if m["role"] == "user"][-2:])
+    with metrics.span("local_retrieval"):
+        results = get_local_index().search(query, top_k=local_search_settings.get("TopK", 5))
+
+    system = f"""
+        You are an assistant for Contoso Suites employees. Contoso Suites is a luxury hotel and resort chain with locations
+        in a variety of Caribbean nations and territories.
+
+        Answer using only the sources below and cite the ones you use, for example [doc1].
+        If the sources do not contain the answer, say that you do not know.
+
+        Sources:
+        {format_passages(results)}
+    """
+    return client.chat.completions.create(
+        model=deployment_name,
+        messages=[{"role": "system", "content": system}] + [
+            {"role": m["role"], "content": m["content"]}
+            for m in messages
+        ],
+        stream=True,
+    )
+
+
 def handle_chat_prompt(prompt):
 
     # Echo the user's prompt to the chat window
@@ -78,67 +181,196 @@ def handle_chat_prompt(prompt):
     # This function loops through the responses and displays them as they come in.
     # It also appends the full response to the chat history.
         
+    # The renderer batches the streamed deltas so the placeholder is only updated
+    # a few times per second, and writes the final response exactly once.
+    # Answers to questions we have already seen are replayed from the response cache
+    # through the same renderer, so a cache hit looks just like a live response.
     with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-        full_response = ""
-        for response in create_chat_completion(deployment_name, st.session_state.messages, SearchEndpoint, SearchKey, config["SearchIndex"]):
-        # for response in create_chat_completion(deployment_name, st.session_state.messages, config["SearchEndpoint"], config["SearchKey"], config["SearchIndex"]):
-            full_response += (response.choices[0].delta.content or "")
-            message_placeholder.markdown(full_response + "|")
-        message_placeholder.markdown(full_response)
+        renderer = StreamingRenderer(st.empty(), max_updates_per_second=config.get("StreamingUpdatesPerSecond", 10))
+        grounding = st.session_state.get("grounding", config.get("Grounding", "search"))
+        if grounding == "local":
+            index_name, index_version = "local", get_local_index().version
+        else:
+            index_name, index_version = config["SearchIndex"], config.get("SearchIndexVersion")
+        cached_response = response_cache.get(st.session_state.messages, index_name, index_version)
+        try:
+            if cached_response is not None:
+                deltas = text_deltas(cached_response)
+            elif grounding == "local":
+                messages = get_conversation_window().context(st.session_state.messages)
+                deltas = completion_deltas(create_local_chat_completion(deployment_name, messages))
+            else:
+                messages = get_conversation_window().context(st.session_state.messages)
+                deltas = completion_deltas(create_chat_completion(deployment_name, messages, SearchEndpoint, SearchKey, config["SearchIndex"]))
+                # deltas = completion_deltas(create_chat_completion(deployment_name, messages, config["SearchEndpoint"], config["SearchKey"], config["SearchIndex"]))
+            for delta in deltas:
+                renderer.write(delta)
+        finally:
+            full_response = renderer.finish()
+        if cached_response is None:
+            response_cache.put(st.session_state.messages, index_name, full_response, index_version)
+        metrics.record_stream("chat_completion", renderer.stats, source="cache" if cached_response is not None else grounding)
+        if config.get("ShowPerformanceStats", False):
+            st.caption(renderer.stats.summary())
     st.session_state.messages.append({"role": "assistant", "content": full_response})
 
 
 ### Exercise 03: Function calls
-def get_customers(search_criterion, search_value):
-    full_server_url = f"http://localhost:5292/Customer/?searchCriterion={search_criterion}&searchValue={search_value}"
-    r = requests.get(
-        full_server_url,
-        headers={"Content-Type": "application/json"}
+# Tools are declared once with the registry decorator. The schema sent to the model and
+# the argument validation are both generated from the function signature.
+tools = get_tool_registry("chat_with_data")
+SearchCriterion = Literal["CustomerName", "LoyaltyTier", "DateOfMostRecentStay"]
+
+def get_customers_from_store(search_criterion, search_value):
+    # Look customers up in the in-process customer store instead of the Web API.
+    import pandas as pd
+
+    store = get_customer_store(config.get("CustomerDataPath", "../data/Customers.json"))
+    try:
+        customers = store.search(search_criterion, search_value)
+    except ValueError:
+        return f"Failure to find any customers with {search_criterion} {search_value}."
+    return pd.DataFrame(customers, columns=["FirstName", "LastName", "FullName", "LoyaltyTier", "YearsAsMember", "DateOfMostRecentStay", "AverageRating"])
+
+
+@tools.tool(
+    description="Get a list of customers based on some search criterion.",
+    cache_ttl=config.get("ToolExecution", {}).get("CustomerCacheSeconds", 60),
+    cache_if=lambda result: not isinstance(result, str),
+)
+def get_customers(search_criterion: SearchCriterion, search_value: str):
+    # The customer backend is chosen with "CustomerBackend" in config.json: "api" calls
+    # the ContosoSuitesWebAPI, "local" uses the in-process customer store. With the API
+    # backend, the local store is used as a fallback if the API cannot be reached.
+    if config.get("CustomerBackend", "api") == "local":
+        return get_customers_from_store(search_criterion, search_value)
+
+    api_settings = config.get("CustomerApi", {})
+    api_client = get_customer_api_client(
+        api_settings.get("BaseUrl", "http://localhost:5292"),
+        connect_timeout=api_settings.get("ConnectTimeoutSeconds", 3.05),
+        read_timeout=api_settings.get("ReadTimeoutSeconds", 10),
+        max_retries=api_settings.get("MaxRetries", 3),
+        page_size=api_settings.get("PageSize", 500),
     )
-    if r.status_code == 200:
-        return st.write(pd.read_json(r.content.decode("utf-8")))
-    else:
+    import requests
+
+    try:
+        customers = api_client.get_customers(search_criterion, search_value, max_rows=api_settings.get("MaxRows", 5000))
+    except requests.exceptions.ConnectionError:
+        if config.get("CustomerBackendFallback", True):
+            return get_customers_from_store(search_criterion, search_value)
+        raise
+    except requests.exceptions.RequestException:
         return f"Failure to find any customers with {search_criterion} {search_value}."
-
-functions = [
-    {
-        "name": "get_customers",
-        "description": "Get a list of customers based on some search criterion.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "search_criterion": {"type": "string", "enum": ["CustomerName", "LoyaltyTier", "DateOfMostRecentStay"]},
-                "search_value": {"type": "string"},
-            },
-            "required": ["search_criterion", "search_value"],
-        },
+    return customers
+
+HotelFeature = Literal["free_breakfast", "non_smoking_rooms", "digital_key", "business_center", "ev_charging_available",
+                       "covered_parking", "self_parking", "beachfront", "restaurant"]
+
+def get_hotels():
+    # Hotels joined with their resorts, as a columnar index shared by every session.
+    return get_hotel_index(config.get("HotelDataPath", "../data/Hotels.txt"), config.get("ResortDataPath", "../data/Resorts.txt"))
+
+@tools.tool(
+    description="Find Contoso Suites hotels by resort location, features, resort amenities and capacity. Every condition given must hold.",
+    descriptions={
+        "nation": "Nation or territory of the resort, for example Aruba.",
+        "city": "City of the resort.",
+        "resort_name": "Full resort name, for example Puerto Rico San Juan.",
+        "features": "Features the hotel must have.",
+        "amenities": "Resort amenities the hotel must have, for example Spa, Pool, Casino, Golf Course or Dive Center.",
+        "min_meeting_rooms": "Minimum number of meeting rooms.",
+        "min_ballrooms": "Minimum number of ballrooms for receptions.",
+        "min_rooms": "Minimum number of guest rooms.",
+        "max_rooms": "Maximum number of guest rooms.",
+    },
+    # The hotel data files are loaded once per process, so their answers can be kept much
+    # longer than the customer lookups.
+    cache_ttl=config.get("ToolExecution", {}).get("HotelCacheSeconds", 3600),
+)
+def search_hotels(nation: str = "", city: str = "", resort_name: str = "", features: list[HotelFeature] = None,
+                  amenities: list[str] = None, min_meeting_rooms: int = 0, min_ballrooms: int = 0, min_rooms: int = 0,
+                  max_rooms: int = 0):
+    categories = {column: value for column, value in [("nation", nation), ("city", city), ("resort_name", resort_name)] if value}
+    ranges = {
+        column: (minimum or None, maximum or None)
+        for column, minimum, maximum in [
+            ("meeting_rooms", min_meeting_rooms, 0),
+            ("ballrooms_for_receptions", min_ballrooms, 0),
+            ("number_of_rooms", min_rooms, max_rooms),
+        ]
+        if minimum or maximum
     }
-]
-
-
-available_functions = {
-    "get_customers": get_customers,
-}
-
-def create_chat_completion_with_functions(deployment_name, messages):
-    # Create an Azure OpenAI client. We create it in here because each exercise will
-    # require at a minimum different base URLs.
-    client = openai.AzureOpenAI(
-        base_url=f"{aoai_endpoint}/openai/deployments/{deployment_name}/",
-        api_key=aoai_api_key,
-        api_version="2023-12-01-preview"
-    )
+    hotels = get_hotels().search(features or (), amenities or (), categories, ranges)
+    if hotels.empty:
+        return "No hotels match all of those conditions."
+    return hotels
+
+CustomerDimension = Literal["LoyaltyTier", "YearsAsMember", "StayYear", "StayMonth"]
+
+@tools.tool(
+    description="Get aggregate customer statistics: the number of customers and their average, minimum, median and "
+                "maximum rating, optionally grouped and filtered. Use this for counts, averages and distributions "
+                "instead of listing customers.",
+    descriptions={
+        "group_by": "Fields to group by. YearsAsMember is grouped in bands of years_band years. Empty for one overall row.",
+        "loyalty_tier": "Only customers in this loyalty tier.",
+        "min_years_as_member": "Only customers who have been members for at least this many years.",
+        "max_years_as_member": "Only customers who have been members for at most this many years.",
+        "stayed_after": "Only customers whose most recent stay is after this date (YYYY-MM-DD).",
+        "stayed_before": "Only customers whose most recent stay is before this date (YYYY-MM-DD), "
+                         "i.e. who have not stayed since then.",
+        "years_band": "Width in years of the YearsAsMember groups.",
+    },
+)
+def customer_stats(group_by: list[CustomerDimension] = None, loyalty_tier: str = "", min_years_as_member: int = 0,
+                   max_years_as_member: int = 0, stayed_after: str = "", stayed_before: str = "", years_band: int = 5):
+    # Answered from views kept current with the in-process customer store, so the
+    # result is a few aggregate rows however many customers there are.
+    views = get_customer_stats(config.get("CustomerDataPath", "../data/Customers.json"))
+    try:
+        stats = views.query(
+            group_by or (),
+            loyalty_tier=loyalty_tier or None,
+            min_years=min_years_as_member or None,
+            max_years=max_years_as_member or None,
+            stayed_after=stayed_after or None,
+            stayed_before=stayed_before or None,
+            years_band=max(years_band, 1),
+        )
+    except ValueError as e:
+        return f"Failure to compute customer statistics: {e}"
+    if stats.empty:
+        return "No customers match all of those conditions."
+    return stats
+
+functions = tools.schemas()
+available_functions = tools.functions
+
+def create_chat_completion_with_functions(deployment_name, messages, stream=False, tool_choice="auto"):
+    # Get the pooled Azure OpenAI client. Each exercise requires at a minimum different
+    # base URLs, so the registry keeps a separate client per base URL flavor.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name, flavor="chat")
     # Create and return a new chat completion request
-    # Be sure to include the "functions" parameter and set "function_call"
+    # The "tools" parameter lets the model request several function calls in one response.
     return client.chat.completions.create(
         model=deployment_name,
-        messages=[
-            {"role": m["role"], "content": m["content"]}
-            for m in messages
-        ],
-        functions=functions,
-        function_call="auto",
+        messages=messages,
+        tools=[{"type": "function", "function": f} for f in functions],
+        tool_choice=tool_choice,
+        stream=stream,
+    )
+
+
+def get_tool_executor():
+    tool_settings = config.get("ToolExecution", {})
+    return ToolExecutor(
+        available_functions,
+        validate=tools.validate,
+        max_workers=tool_settings.get("MaxWorkers", 8),
+        timeout=tool_settings.get("TimeoutSeconds", 15),
+        timeouts=tool_settings.get("TimeoutsByTool", {}),
     )
 
 
@@ -149,53 +381,52 @@ def handle_chat_prompt_with_functions(prompt):
         st.markdown(prompt)
 
     # Send the user's prompt to Azure OpenAI and display the response
-    # The call to Azure OpenAI is handled in create_chat_completion()
-    # This function loops through the responses and displays them as they come in.
-    # It also appends the full response to the chat history.
+    # The call to Azure OpenAI is handled in create_chat_completion_with_functions().
+    # Every tool call the model asks for is run concurrently, the tables are shown as they
+    # are, and all of the results go back to the model in one follow-up request whose
+    # answer is streamed into the chat window.
     with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-        full_response = ""
-        response = create_chat_completion_with_functions(deployment_name, st.session_state.messages)
+        messages = get_conversation_window().context(st.session_state.messages)
+        started = time.perf_counter()
+        response = create_chat_completion_with_functions(deployment_name, messages)
         response_message = response.choices[0].message
 
-        # Check if GPT returned a function call
-        if response_message.function_call:
-            # Get the function name and arguments
-            function_name = response_message.function_call.name
-            # Verify the function
-            if function_name not in available_functions:
-                full_response = f"Sorry, I don't know how to call the function `{function_name}`."
+        # Check if GPT returned any tool calls
+        if not response_message.tool_calls:
+            full_response = response_message.content or ""
+            st.markdown(full_response)
+            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            return
+
+        metrics.observe("function_call_first_response_seconds", time.perf_counter() - started)
+        results = get_tool_executor().run(response_message.tool_calls)
+        import pandas as pd
+
+        for result in results:
+            if result.ok and isinstance(result.output, pd.DataFrame):
+                st.write(result.output)
+            elif result.ok:
+                st.markdown(result.output)
             else:
-                function_to_call = available_functions[function_name]
-                # Verify the function has the correct number of arguments
-                function_args = json.loads(response_message.function_call.arguments)
-                if check_args(function_to_call, function_args) is False:
-                    full_response = f"Sorry, I don't know how to call the function `{function_name}` with those arguments."
-                else:
-                    # Call the function
-                    function_to_call(**function_args)
-    st.session_state.messages.append({"role": "assistant", "content": "Table response removed for brevity."})
-
-
-# helper method used to check if the correct arguments are provided to a function
-def check_args(function, args):
-    sig = inspect.signature(function)
-    params = sig.parameters
-
-    # Check if there are extra arguments
-    for name in args:
-        if name not in params:
-            return False
-    # Check if the required arguments are provided 
-    for name, param in params.items():
-        if param.default is param.empty and name not in args:
-            return False
-
-    return True
+                st.markdown(result.error)
+
+        follow_up = messages + [assistant_tool_call_message(response_message)] + tool_result_messages(results, config.get("ToolExecution", {}).get("MaxRowsToModel", 50))
+        renderer = StreamingRenderer(st.empty(), max_updates_per_second=config.get("StreamingUpdatesPerSecond", 10))
+        try:
+            for delta in completion_deltas(create_chat_completion_with_functions(deployment_name, follow_up, stream=True, tool_choice="none")):
+                renderer.write(delta)
+        finally:
+            full_response = renderer.finish()
+        metrics.record_stream("function_call_answer", renderer.stats)
+    # The placeholder is only for the chat display, so keep it out of the model's context.
+    st.session_state.messages.append({"role": "assistant", "content": "Table response removed for brevity.", "context": False})
+    st.session_state.messages.append({"role": "assistant", "content": full_response})
 
 
 ### Exercise 04
 def recognize_from_microphone(speech_key, speech_region, speech_recognition_language="en-US"):
+    import azure.cognitiveservices.speech as speechsdk
+
     # Create an instance of a speech config with specified subscription key and service region.
     # Then set the speech recognition language to speech_recognition_language.
 
@@ -246,6 +477,21 @@ def main():
     )
 
     chat_option = st.radio(label="Choose the chat option you want to try:", options=["Chat with Data", "Function Calls"])
+    if chat_option == "Chat with Data":
+        grounding_options = list(GROUNDING_SOURCES)
+        st.radio(label="Ground answers in:", options=grounding_options, format_func=GROUNDING_SOURCES.get,
+                 index=grounding_options.index(config.get("Grounding", "search")), key="grounding", horizontal=True)
+
+    if config.get("ShowPerformanceStats", False):
+        cache_stats = response_cache.stats()
+        st.sidebar.caption(f"Response cache: {cache_stats['entries']} entries, {cache_stats['hit_rate']:.0%} hit rate "
+                           f"({cache_stats['exact_hits']} exact, {cache_stats['semantic_hits']} semantic, {cache_stats['misses']} misses)")
+
+    if metrics.enabled and metrics_settings.get("ShowSidebar", False):
+        import pandas as pd
+
+        st.sidebar.write("Latency by stage (recent p50/p95)")
+        st.sidebar.dataframe(pd.DataFrame(metrics.summary(), columns=["metric", "count", "p50", "p95"]), hide_index=True)
 
     # Initialize chat history
     if "messages" not in st.session_state:
@@ -272,3 +518,7 @@ def main():
 
 if __name__ == "__main__":
     main()
+    metrics.observe("page_script_seconds", time.perf_counter() - script_started, {"page": "chat_with_data"})
+    if config.get("Startup", {}).get("Prewarm", True):
+        # Also load the tokenizer the conversation window counts tokens with.
+        prewarm(config.get("Startup", {}).get("PrewarmModules"), tasks={"tokenizer": lambda: count_tokens("")})
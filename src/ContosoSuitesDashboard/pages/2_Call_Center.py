@@ -1,25 +1,43 @@
+import time
+script_started = time.perf_counter()
+
 import streamlit as st
 import streamlit_extras.stateful_button as stx
 from streamlit_js_eval import streamlit_js_eval
-import requests
-import pandas as pd
 import json
-import openai
 import inspect
-import time
-from scipy.io import wavfile
-import azure.cognitiveservices.speech as speechsdk
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.textanalytics import (
-        TextAnalyticsClient,
-        ExtractiveSummaryAction,
-        AbstractiveSummaryAction
-    )
+from services.openai_clients import configure_pool, get_openai_client
+from services.transcription import get_session_manager
+from services.call_center import (
+    check_compliance,
+    check_live_compliance,
+    complete_over_transcript,
+    compliance_questions,
+    create_file_transcriber,
+    stream_compliance,
+    stream_json_over_transcript,
+    transcribe_file,
+)
+from services.analysis_cache import content_key, get_analysis_cache, hash_audio
+from services.audio_preprocessing import preprocess_options
+from services.json_stream import json_fields
+from services.metrics import configure_metrics
+from services.call_analytics import get_text_analytics_client, run_call_analysis
+from services.live_analysis import LiveCallMonitor
+from services.startup import load_config, prewarm
 
 st.set_page_config(layout="wide")
 
-with open('config.json') as f:
-    config = json.load(f)
+# Parsed once per process rather than on every rerun. The Speech and Language SDKs
+# are imported where they are used and pre-warmed in the background.
+config = load_config()
+
+metrics_settings = config.get("Metrics", {})
+metrics = configure_metrics(
+    enabled=metrics_settings.get("Enabled", False),
+    export_port=metrics_settings.get("ExportPort"),
+    window=metrics_settings.get("Window", 1024),
+)
 
 aoai_endpoint = config['AOAIEndpoint']
 aoai_api_key = config['AOAIKey']
@@ -28,113 +46,125 @@ speech_key = config['SpeechKey']
 speech_region = config['SpeechRegion']
 language_endpoint = config['LanguageEndpoint']
 language_key = config['LanguageKey']
+configure_pool(**config.get('AOAIConnectionPool', {}))
+
+# Transcripts and analyses are cached by content, so the same recording is only
+# transcribed and analyzed once no matter which session (or batch run) sees it.
+analysis_cache_config = config.get('AnalysisCache', {})
+analysis_cache = get_analysis_cache(
+    analysis_cache_config.get('Directory', '.cache/analysis'),
+    max_memory_entries=analysis_cache_config.get('MaxMemoryEntries', 128),
+    max_disk_bytes=analysis_cache_config.get('MaxDiskBytes', 256 * 1024 * 1024),
+)
+# Transcripts longer than this many tokens are summarized and checked in chunks.
+max_chunk_tokens = config.get('LongTranscripts', {}).get('MaxChunkTokens', 3000)
 
 ### Exercise 05: Provide live audio transcription
 def create_transcription_request(audio_file, speech_key, speech_region, speech_recognition_language="en-US"):
-    # Create an instance of a speech config with specified subscription key and service region.
-
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-    speech_config.speech_recognition_language=speech_recognition_language
-
-    # Prepare audio settings for the wave stream
-    channels = 1
-    bits_per_sample = 16
-    samples_per_second = 16000
-
-    # Create audio configuration using the push stream
-    wave_format = speechsdk.audio.AudioStreamFormat(samples_per_second, bits_per_sample, channels)
-    stream = speechsdk.audio.PushAudioInputStream(stream_format=wave_format)
-    audio_config = speechsdk.audio.AudioConfig(stream=stream)
-
-    transcriber = speechsdk.transcription.ConversationTranscriber(speech_config, audio_config)
-    all_results = []
-
-    def handle_final_result(evt):
-        all_results.append(evt.result.text)
-
-    done = False
-
-    def stop_cb(evt):
-        print('CLOSING on {}'.format(evt))
-        nonlocal done
-        done= True
+    # Return the cached transcript if this exact recording has been transcribed before.
+    preprocess = preprocess_options(config.get('AudioPreprocessing', {}))
+    cache_key = content_key("transcript", hash_audio(audio_file), language=speech_recognition_language, preprocess=preprocess)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Create a transcriber that reads a 16 kHz, 16-bit, mono push stream, then stream
+    # the wave file through it. Recordings in any other format are converted first,
+    # and long silences are trimmed when "AudioPreprocessing" asks for it. See
+    # services/call_center.py and services/audio_preprocessing.py for the details.
+    transcriber, stream = create_file_transcriber(speech_key, speech_region, speech_recognition_language)
+    all_results, error = transcribe_file(
+        audio_file,
+        transcriber,
+        stream,
+        timeout=config.get('TranscriptionTimeoutSeconds', 600),
+        lead_seconds=config.get('SpeechPushLeadSeconds', 30),
+        preprocess=preprocess,
+    )
+    if error:
+        print('Transcription ended early: {}'.format(error))
+    elif all_results:
+        analysis_cache.put(cache_key, all_results)
+    return all_results
 
-    # Subscribe to the events fired by the conversation transcriber
-    transcriber.transcribed.connect(handle_final_result)
-    transcriber.session_started.connect(lambda evt: print('SESSION STARTED: {}'.format(evt)))
-    transcriber.session_stopped.connect(lambda evt: print('SESSION STOPPED {}'.format(evt)))
-    transcriber.canceled.connect(lambda evt: print('CANCELED {}'.format(evt)))
-    # stop continuous transcription on either session stopped or canceled events
-    transcriber.session_stopped.connect(stop_cb)
-    transcriber.canceled.connect(stop_cb)
 
-    transcriber.start_transcribing_async()
+def create_live_call_monitor(include_recording_message, is_relevant_to_topic):
+    # Check the call for compliance while it is in progress. Only newly transcribed
+    # utterances (plus a few earlier ones for context) are sent to the model, in
+    # debounced batches, so each check costs the same however long the call runs.
+    settings = config.get('LiveAnalysis', {})
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+
+    def analyze(context, new_utterances, start_index, state):
+        return check_live_compliance(
+            client, deployment_name, context, new_utterances, start_index, state,
+            include_recording_message=include_recording_message,
+            is_relevant_to_topic=is_relevant_to_topic,
+            recording_notice_within=settings.get('RecordingNoticeWithinUtterances', 6),
+        )
+
+    return LiveCallMonitor(
+        analyze,
+        context_utterances=settings.get('ContextUtterances', 6),
+        max_batch=settings.get('MaxBatchUtterances', 8),
+        debounce_seconds=settings.get('DebounceSeconds', 3),
+        max_wait_seconds=settings.get('MaxWaitSeconds', 15),
+    )
 
-    # Read the whole wave files at once and stream it to sdk
-    _, wav_data = wavfile.read(audio_file)
-    stream.write(wav_data.tobytes())
-    stream.close()
-    while not done:
-        time.sleep(.5)
 
-    transcriber.stop_transcribing_async()
-    return all_results
+def show_live_alerts(monitor, container, cursor=0):
+    # Show the alerts raised since cursor and return the new cursor.
+    alerts, cursor = monitor.alerts_since(cursor)
+    for alert in alerts:
+        if alert["text"]:
+            container.warning(f"{alert['message']} (utterance {alert['utterance']}: \"{alert['text']}\")")
+        else:
+            container.warning(alert["message"])
+    return cursor
 
 
-def create_live_transcription_request(speech_key, speech_region, speech_recognition_language="en-US"):
+def create_live_transcription_request(speech_key, speech_region, speech_recognition_language="en-US", monitor=None):
+    import azure.cognitiveservices.speech as speechsdk
 
     # Creates speech configuration with subscription information
     speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
     speech_config.speech_recognition_language=speech_recognition_language
     transcriber = speechsdk.transcription.ConversationTranscriber(speech_config)
+    transcriber.transcribed.connect(lambda evt: print(evt.result.text))
+    if monitor is not None:
+        transcriber.transcribed.connect(monitor.handle_transcribed)
+        st.session_state.live_call_monitor = monitor.start()
 
-    done = False
-
-    def handle_final_result(evt):
-        all_results.append(evt.result.text)
-        print(evt.result.text)
-
-    all_results = []
-
-    def stop_cb(evt: speechsdk.SessionEventArgs):
-        """callback that signals to stop continuous transcription upon receiving an event `evt`"""
-        print('CLOSING {}'.format(evt))
-        nonlocal done
-        done = True
-
-    # Subscribe to the events fired by the conversation transcriber
-    transcriber.transcribed.connect(handle_final_result)
-    transcriber.session_started.connect(lambda evt: print('SESSION STARTED: {}'.format(evt)))
-    transcriber.session_stopped.connect(lambda evt: print('SESSION STOPPED {}'.format(evt)))
-    transcriber.canceled.connect(lambda evt: print('CANCELLED {}'.format(evt)))
-    # stop continuous transcription on either session stopped or canceled events
-    transcriber.session_stopped.connect(stop_cb)
-    transcriber.canceled.connect(stop_cb)
-
-    transcriber.start_transcribing_async()
+    session = get_session_manager().start(transcriber, deadline=config.get('LiveTranscriptionMaxSeconds', 3600))
+    st.session_state.live_transcription_session = session.id
 
     # Streamlit refreshes the page on each interaction,
     # so a clean start and stop isn't really possible with button presses.
-    # Instead, we're constantly updating transcription results, so that way,
-    # when the user clicks the button to stop, we can just stop updating the results.
-    # This might not capture the final message, however, if the user stops before
-    # we receive the message--we won't be able to call the stop event.
-    while not done:
-        st.session_state.transcription_results = all_results
-        time.sleep(1)
-
+    # Instead, we show each phrase as soon as it is transcribed, along with any
+    # compliance alerts. When the user clicks the button to stop, the rerun
+    # interrupts this loop and main() cancels the session.
+    # session.results only ever grows, so it is shared rather than copied on each update.
+    st.session_state.transcription_results = session.results
+    alerts = st.container()
+    transcript = st.container()
+    shown = alert_cursor = 0
+    for _ in session.stream(heartbeat=1):
+        for phrase in session.results[shown:]:
+            transcript.write(phrase)
+        shown = len(session.results)
+        if monitor is not None:
+            alert_cursor = show_live_alerts(monitor, alerts, alert_cursor)
+
+    # The session ended on its own (deadline or cancellation): check the last batch.
+    if monitor is not None:
+        monitor.stop()
+        show_live_alerts(monitor, alerts, alert_cursor)
     return
 
 
 def make_azure_openai_chat_request(system, call_contents):
-    # Create an Azure OpenAI client.
-    client = openai.AzureOpenAI(
-        base_url=f"{aoai_endpoint}/openai/deployments/{deployment_name}/",
-        api_key=aoai_api_key,
-        api_version="2023-12-01-preview"
-    )
-
-    # Create and return a new chat completion request
+    # Send one chat request on the pooled client for this deployment.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
     return client.chat.completions.create(
         model=deployment_name,
         messages=[
@@ -144,228 +174,91 @@ def make_azure_openai_chat_request(system, call_contents):
     )
 
 
+@analysis_cache.memoize("compliance", model=deployment_name)
 def is_call_in_compliance(call_contents, include_recording_message, is_relevant_to_topic):
-    joined_call_contents = ' '.join(call_contents)
-    if include_recording_message:
-        include_recording_message_text = "2. Was the caller aware that the call was being recorded?"
-    else:
-        include_recording_message_text = ""
+    # The compliance check as a single block of text, used by batch_transcribe.py and
+    # the benchmarks. Long calls are checked in chunks, and each chunk's answers are
+    # cached, so toggling an option only asks the model what it has not been asked yet.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    return check_compliance(client, deployment_name, call_contents, include_recording_message, is_relevant_to_topic,
+                            max_chunk_tokens=max_chunk_tokens, cache=analysis_cache)
 
-    if is_relevant_to_topic:
-        is_relevant_to_topic_text = "3. Was the call relevant to the hotel and resort industry?"
-    else:
-        is_relevant_to_topic_text = ""
-
-    system = f"""
-        You are an automated analysis system for Contoso Suites. Contoso Suites is a luxury hotel and resort chain with locations
-        in a variety of Caribbean nations and territories.
-            
-        You are analyzing a call for relevance and compliance.
-
-        You will only answer the following questions based on the call contents:
-        1. Was there vulgarity on the call?
-        {include_recording_message_text}
-        {is_relevant_to_topic_text}
-    """
-
-    response = make_azure_openai_chat_request(system, joined_call_contents)
-    return response.choices[0].message.content
+@analysis_cache.memoize_fields("compliance-fields", model=deployment_name)
+def stream_call_compliance(call_contents, include_recording_message, is_relevant_to_topic):
+    # The same check as a JSON object, one field per question, so each answer is
+    # shown as soon as the model has written it.
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    yield from stream_compliance(client, deployment_name, call_contents, include_recording_message,
+                                 is_relevant_to_topic, max_chunk_tokens=max_chunk_tokens, cache=analysis_cache)
 
 
 
 ### Exercise 06: Generate call summaries
-def generate_extractive_summary(call_contents):
-    # TODO:
-    # 1. The call_contents parameter is formatted as a list of strings. Join them together with spaces to pass in as a single document.
-    
-    # 2. Create a TextAnalyticsClient, connecting it to your Language Service endpoint.
-    # client = ...
-
-    # 3. Complete the call the begin_analyze_actions method on your client, passing in the joined call_contents as an array
-    #    and an ExtractiveSummaryAction with a max_sentence_count of 2.
-    # poller = client.begin_analyze_actions(
-    #   ...
-    #)
+# All of the Language service analyses of a call (both summaries, sentiment and named
+# entities) are requested together in one analyze job on a pooled client, while the
+# OpenAI query-based summary runs at the same time. Each function below reads its part
+# of that shared, cached result, so analyzing a call costs about one round trip.
+def has_language_errors(results):
+    return any(isinstance(result, dict) and "error" in result for result in results.values())
+
+@analysis_cache.memoize("call-analysis", cache_if=lambda results: not has_language_errors(results), model=deployment_name)
+def analyze_call_contents(call_contents):
+    return run_call_analysis(
+        get_text_analytics_client(language_endpoint, language_key),
+        call_contents,
+        query_summary_fn=generate_query_based_summary,
+        polling_interval=config.get('LanguagePollingSeconds', 1),
+    )
 
-    #   4. Extract the summary result sentences and merge them into a single summary string.
-    # for result in poller.result():
-    #   ...
+def get_call_analysis(call_contents, name):
+    result = analyze_call_contents(call_contents)[name]
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"The Language service could not complete the {name} analysis: {result['error']}")
+    return result
 
-    #   5. Return the summary as a JSON object in the shape '{"call-summary": extractive_summary}'.
-    raise NotImplementedError
+def generate_extractive_summary(call_contents):
+    return get_call_analysis(call_contents, "extractive-summary")
 
 def generate_abstractive_summary(call_contents):
-    # TODO:
-    # 1. The call_contents parameter is formatted as a list of strings. Join them together with spaces to pass in as a single document.
-
-    # 2. Create a TextAnalyticsClient, connecting it to your Language Service endpoint.
-    # client = ...
-    
-    # 3. Call the begin_analyze_actions method on your client, passing in the joined call_contents as an array
-    #    and an AbstractiveSummaryAction with a sentence_count of 2.
-    # poller = client.begin_analyze_actions(
-    #   ...
-    #)
-    
-    # 4. Extract the summary result summaries and merge them into a single summary string.
-    # for result in poller.result():
-    #   ...
-    
-    # 5. Return the summary as a JSON object in the shape '{"call-summary": abstractive_summary}'.
-    raise NotImplementedError
-
-def generate_query_based_summary(call_contents):
-    # TODO:
-    # 1. The call_contents parameter is formatted as a list of strings. Join them together with spaces to pass in as a single document.
-
-    # 2. Write a system prompt that instructs the large language model to:
-    #    - Generate a short (5 word) summary from the call transcript.
-    #    - Create a two-sentence summary of the call transcript.
-    #    - Output the response in JSON format, with the short summary labeled 'call-title' and the longer summary labeled 'call-summary.'
-    system = f"""
-    """
+    return get_call_analysis(call_contents, "abstractive-summary")
 
-    # 3. Call make_azure_openai_chat_request().
-    # response = ...
+# The title comes first so that, streamed, it can be shown while the summary is
+# still being written.
+query_summary_prompt = """
+    Write a five-word summary and label it as call-title.
+    Write a two-sentence summary and label it as call-summary.
 
-    # 4. Return the message content for the response's first choice.
+    Output the results as a JSON object with call-title first and call-summary second.
+"""
 
-    # 5. Return the summary.
-    raise NotImplementedError
+@analysis_cache.memoize("query-based-summary", model=deployment_name)
+def generate_query_based_summary(call_contents):
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    return complete_over_transcript(client, deployment_name, query_summary_prompt, call_contents,
+                                    max_chunk_tokens=max_chunk_tokens, cache=analysis_cache)
+
+@analysis_cache.memoize_fields("query-based-summary-fields", model=deployment_name)
+def stream_query_based_summary(call_contents):
+    # Yields ("call-title", ...) and then ("call-summary", ...) as each is written.
+    # A summary already produced by "Analyze this call" is replayed instead.
+    cached = generate_query_based_summary.cached(call_contents)
+    if cached is not None:
+        try:
+            fields = list(json_fields([cached]))
+        except ValueError:
+            fields = None
+        if fields:
+            yield from fields
+            return
+    client = get_openai_client(aoai_endpoint, aoai_api_key, deployment_name)
+    yield from stream_json_over_transcript(client, deployment_name, query_summary_prompt, call_contents,
+                                           max_chunk_tokens=max_chunk_tokens, cache=analysis_cache)
 
 def create_sentiment_analysis_and_opinion_mining_request(call_contents):
-    # TODO:
-    # 1. The call_contents parameter is formatted as a list of strings. Join them together with spaces to pass in as a single document.
-
-    # 2. Create a Text Analytics Client
-    #client = ...
-
-    # 3. Analyze sentiment of call transcript, enabling opinion mining.
-    #result = client...
-
-    # 4. Retrieve all document results that are not an error.
-    doc_result = None #...
-
-    # The output format is a JSON document with the shape:
-    # {
-    #     "sentiment": document_sentiment,
-    #     "sentiment-scores": {
-    #         "positive": document_positive_score_as_two_decimal_float,
-    #         "neutral": document_neutral_score_as_two_decimal_float,
-    #         "negative": document_negative_score_as_two_decimal_float
-    #     },
-    #     "sentences": [
-    #         {
-    #             "text": sentence_text,
-    #             "sentiment": document_sentiment,
-    #             "sentiment-scores": {
-    #                 "positive": document_positive_score_as_two_decimal_float,
-    #                 "neutral": document_neutral_score_as_two_decimal_float,
-    #                 "negative": document_negative_score_as_two_decimal_float
-    #             },
-    #             "mined_opinions": [
-    #                 {
-    #                     "target-sentiment": opinion_sentiment,
-    #                     "target-text": opinion_target,
-    #                     "target-scores": {
-    #                         "positive": document_positive_score_as_two_decimal_float,
-    #                         "neutral": document_neutral_score_as_two_decimal_float,
-    #                         "negative": document_negative_score_as_two_decimal_float
-    #                     },
-    #                     "assessments": [
-    #                       {
-    #                         "assessment-sentiment": assessment_sentiment,
-    #                         "assessment-text": assessment_text,
-    #                         "assessment-scores": {
-    #                             "positive": document_positive_score_as_two_decimal_float,
-    #                             "negative": document_negative_score_as_two_decimal_float
-    #                         }
-    #                       }
-    #                     ]
-    #                 }
-    #             ]
-    #         }
-    #     ]
-    # }
-    sentiment = {}
-
-    # 5. Assign the correct values to the JSON object.
-    for document in doc_result:
-        #sentiment["sentiment"] = document...
-        sentiment["sentiment-scores"] = {
-            #"positive": document...,
-            #"neutral": document...,
-            #"negative": document...
-        }
-        
-        sentences = []
-        for s in document.sentences:
-            sentence = {}
-            #sentence["text"] = s...
-            #sentence["sentiment"] = s...
-            sentence["sentiment-scores"] = {
-                #"positive": s...,
-                #"neutral": s..,
-                #"negative": s..
-            }
-
-            mined_opinions = []
-            for mined_opinion in s.mined_opinions:
-                opinion = {}
-                #opinion["target-text"] = mined_opinion...
-                #opinion["target-sentiment"] = mined_opinion...
-                opinion["sentiment-scores"] = {
-                    #"positive": mined_opinion...,
-                    #"negative": mined_opinion...,
-                }
-                
-                opinion_assessments = []
-                for assessment in mined_opinion.assessments:
-                    opinion_assessment = {}
-                    #opinion_assessment["text"] = assessment...
-                    #opinion_assessment["sentiment"] = assessment...
-                    opinion_assessment["sentiment-scores"] = {
-                        #"positive": assessment...,
-                        #"negative": assessment...
-                    }
-                    opinion_assessments.append(opinion_assessment)
-
-                opinion["assessments"] = opinion_assessments
-                mined_opinions.append(opinion)
-
-            sentence["mined_opinions"] = mined_opinions
-            sentences.append(sentence)
-
-        sentiment["sentences"] = sentences
-    
-    #return sentiment
-    raise NotImplementedError
+    return get_call_analysis(call_contents, "sentiment")
 
 def create_named_entity_extraction_request(call_contents):
-    # TODO:
-    # 1. The call_contents parameter is formatted as a list of strings. Join them together with spaces to pass in as a single document.
-
-    # 2. Create a TextAnalyticsClient, connecting it to your Language Service endpoint.
-    #client = ...
-
-    # 3. Recognize entities within the call transcript.
-    #result = client...
-    # Create named_entity list as a JSON array
-    named_entities = []
-
-    # 4. Add each extracted named entity to the named_entity array.
-    #for entity in result.entities:
-    #    named_entities.append({
-    #        "text": ...,
-    #        "category": ...,
-    #        "subcategory": ...,
-    #        "length": ...,
-    #        "offset": ...,
-    #        "confidence-score": ...
-    #    })
-
-    #return named entities
-    raise NotImplementedError
+    return get_call_analysis(call_contents, "named-entities")
 
 
 def main():
@@ -378,6 +271,12 @@ def main():
     """
     )
 
+    if metrics.enabled and metrics_settings.get("ShowSidebar", False):
+        import pandas as pd
+
+        st.sidebar.write("Latency by stage (recent p50/p95)")
+        st.sidebar.dataframe(pd.DataFrame(metrics.summary(), columns=["metric", "count", "p50", "p95"]), hide_index=True)
+
     st.write("## Simulate a call")
 
     uploaded_file = st.file_uploader("Upload an audio file", type="wav")
@@ -395,20 +294,35 @@ def main():
         
     st.write("## Perform a Live Call")
 
+    live_analysis = st.checkbox("Check compliance during the call", value=config.get('LiveAnalysis', {}).get('Enabled', True))
     start_recording = stx.button("Record", key="recording_in_progress")
     if start_recording:
+        monitor = None
+        if live_analysis:
+            # Uses the compliance options below, as set before recording started.
+            monitor = create_live_call_monitor(st.session_state.get('include_recording_message', False),
+                                               st.session_state.get('is_relevant_to_topic', False))
         with st.spinner("Transcribing your conversation..."):
-            create_live_transcription_request(speech_key, speech_region)
+            create_live_transcription_request(speech_key, speech_region, monitor=monitor)
+    elif 'live_transcription_session' in st.session_state:
+        # Recording was switched off: stop the live session that belongs to this browser session.
+        get_session_manager().cancel(st.session_state.live_transcription_session)
+        del st.session_state.live_transcription_session
+        if 'live_call_monitor' in st.session_state:
+            # Check whatever was said since the last batch before showing the alerts.
+            st.session_state.live_call_monitor.stop()
+
+    if not start_recording and 'live_call_monitor' in st.session_state:
+        monitor = st.session_state.live_call_monitor
+        show_live_alerts(monitor, st)
+        for error in monitor.errors:
+            st.error(error)
 
     if 'transcription_results' in st.session_state:
         st.write(st.session_state.transcription_results)
     else:
         print("Nothing in transcription results!")
 
-
-    if 'transcription_results' in st.session_state:
-        st.write(st.session_state.transcription_results)
-
     st.write("""## Clear Messages between Calls
         Select this button to clear out session state and refresh the page.
         Do this before loading a new audio file or recording a new call.
@@ -420,12 +334,26 @@ def main():
             del st.session_state.file_transcription_results
         if 'transcription_results' in st.session_state:
             del st.session_state.transcription_results
+        if 'live_call_monitor' in st.session_state:
+            st.session_state.live_call_monitor.stop(wait=False)
+            del st.session_state.live_call_monitor
         streamlit_js_eval(js_expressions="parent.window.location.reload()")
 
     st.write("## Is Your Call in Compliance?")
 
-    include_recording_message = st.checkbox("Call needs an indicator we are recording it")
-    is_relevant_to_topic = st.checkbox("Call is relevant to the hotel and resort industry")
+    include_recording_message = st.checkbox("Call needs an indicator we are recording it", key="include_recording_message")
+    is_relevant_to_topic = st.checkbox("Call is relevant to the hotel and resort industry", key="is_relevant_to_topic")
+
+    questions = compliance_questions(include_recording_message, is_relevant_to_topic)
+
+    def show_compliance_answer(key, answer):
+        st.markdown(f"**{questions.get(key, key)}** {answer}")
+
+    # Show the result straight away if this call was already checked with these options.
+    cached_contents = st.session_state.get('file_transcription_results') or st.session_state.get('transcription_results')
+    cached_compliance = None
+    if cached_contents:
+        cached_compliance = stream_call_compliance.cached(cached_contents, include_recording_message, is_relevant_to_topic)
 
     if st.button("Check for Compliance"):
         with st.spinner("Checking for compliance..."):
@@ -436,62 +364,78 @@ def main():
             else:
                 st.write("Please upload an audio file or record a call before checking for compliance.")
             if call_contents is not None and len(call_contents) > 0:
-                compliance_results = is_call_in_compliance(call_contents, include_recording_message, is_relevant_to_topic)
-                st.write(compliance_results)
+                # Each answer is shown as soon as the model has finished it.
+                for question, answer in stream_call_compliance(call_contents, include_recording_message,
+                                                               is_relevant_to_topic):
+                    show_compliance_answer(question, answer)
         st.success("Compliance check complete!")
+    elif cached_compliance is not None:
+        for question, answer in cached_compliance.items():
+            show_compliance_answer(question, answer)
 
     # Exercise 6: Generate call summaries
     st.write("## Generate call summaries")
 
+    def show_analysis(label, fn, state_key):
+        # Run one analysis of the current call (served from the shared analysis when
+        # it is available), save it to session state and show it.
+        call_contents = st.session_state.get('file_transcription_results') or st.session_state.get('transcription_results')
+        if not call_contents:
+            st.write("Please upload an audio file or record a call before analyzing it.")
+            return
+        with st.spinner(f"{label}..."):
+            result = fn(call_contents)
+        st.success(f"{label} complete!")
+        st.session_state[state_key] = result
+        st.write(result)
+
+    def show_streamed_analysis(label, fields_fn, state_key, render_field):
+        # Like show_analysis, for a structured answer that arrives field by field:
+        # each field is rendered as soon as it is complete.
+        call_contents = st.session_state.get('file_transcription_results') or st.session_state.get('transcription_results')
+        if not call_contents:
+            st.write("Please upload an audio file or record a call before analyzing it.")
+            return
+        result = {}
+        with st.spinner(f"{label}..."):
+            for field, value in fields_fn(call_contents):
+                result[field] = value
+                render_field(field, value)
+        st.success(f"{label} complete!")
+        st.session_state[state_key] = result
+
+    def show_summary_field(field, value):
+        if field == "call-title":
+            st.subheader(value)
+        else:
+            st.write(value)
+
+    if st.button("Analyze this call"):
+        # Everything at once: one Language job plus the OpenAI summary, in parallel.
+        show_analysis("Analyzing the call", analyze_call_contents, "call_analysis")
+
     if st.button("Generate extractive summary"):
-        # TODO: Complete the logic for this button click by doing the following:
-        # 1. Set call_contents to file_transcription_results. If it is empty, write out an error message for the user.
-        # 2. Use st.spinner() to wrap the summarization process.
-        # 3. Call the generate_extractive_summary function and set its results to a variable named extractive_summary.
-        # 4. Call st.success() to indicate that the extractive summarization process is complete.
-        # 5. Save the extractive_summary value to session state.
-        # 6. Write the extractive_summary value to the Streamlit dashboard.
-        raise NotImplementedError
-    
+        show_analysis("Generating the extractive summary", generate_extractive_summary, "extractive_summary")
+
     if st.button("Generate abstractive summary"):
-        # TODO: Complete the logic for this button click by doing the following:
-        # 1. Set call_contents to file_transcription_results. If it is empty, write out an error message for the user.
-        # 2. Use st.spinner() to wrap the summarization process.
-        # 3. Call the generate_abstractive_summary function and set its results to a variable named abstractive_summary.
-        # 4. Call st.success() to indicate that the extractive summarization process is complete.
-        # 5. Save the abstractive_summary value to session state.
-        # 6. Write the abstractive_summary value to the Streamlit dashboard.
-        raise NotImplementedError
-    
+        show_analysis("Generating the abstractive summary", generate_abstractive_summary, "abstractive_summary")
+
     if st.button("Generate query-based summary"):
-        # TODO: Complete the logic for this button click by doing the following:
-        # 1. Set call_contents to file_transcription_results. If it is empty, write out an error message for the user.
-        # 2. Use st.spinner() to wrap the summarization process.
-        # 3. Call generate_query_based_summary function and set its results to a variable named openai_summary.
-        # 4. Call st.success() to indicate that the query-based summarization process is complete.
-        # 5. Save openai_summary value to session state.
-        # 6. Write the openai_summary value to the Streamlit dashboard.
-        raise NotImplementedError
-    
+        show_streamed_analysis("Generating the query-based summary", stream_query_based_summary, "openai_summary",
+                               show_summary_field)
+
     st.write("## Analyze call sentiment and perform opinion mining")
 
-    # TODO: Add a Streamlit button to labeled "Analyze sentiment and mine opinions". If the button is clicked:
-        # 1. Set call_contents to file_transcription_results. If it is empty, write out an error message for the user.
-        # 2. Use st.spinner() to wrap the sentiment analysis process.
-        # 3. Call create_sentiment_analysis_and_opinion_mining_request function and set its results to a variable named sentiment_and_mined_opinions.
-        # 4. Call st.success() to indicate that the sentiment analysis process process is complete.
-        # 5. Save sentiment_and_mined_opinions value to session state.
-        # 6. Write the sentiment_and_mined_opinions value to the Streamlit dashboard.
+    if st.button("Analyze sentiment and mine opinions"):
+        show_analysis("Analyzing sentiment", create_sentiment_analysis_and_opinion_mining_request, "sentiment_and_mined_opinions")
 
     st.write("## Extract named entities")
 
-    # TODO: Add a Streamlit button to labeled "Extract named entities". If the button is clicked:
-        # 1. Set call_contents to file_transcription_results. If it is empty, write out an error message for the user.
-        # 2. Use st.spinner() to wrap the named entity extraction process process.
-        # 3. Call create_named_entity_extraction_request function and set its results to a variable named named_entities.
-        # 4. Call st.success() to indicate that the entity extraction process process is complete.
-        # 5. Save named_entities value to session state.
-        # 6. Write the named_entities value to the Streamlit dashboard.
-    
+    if st.button("Extract named entities"):
+        show_analysis("Extracting named entities", create_named_entity_extraction_request, "named_entities")
+
 if __name__ == "__main__":
     main()
+    metrics.observe("page_script_seconds", time.perf_counter() - script_started, {"page": "call_center"})
+    if config.get("Startup", {}).get("Prewarm", True):
+        prewarm(config.get("Startup", {}).get("PrewarmModules"))
@@ -0,0 +1,6 @@
+"""Shared helpers used by the Contoso Suites dashboard pages.
+
+Streamlit re-executes each page script on every interaction, so anything that
+should outlive a single rerun (clients, caches, indexes) lives in these modules
+instead of at the top of the page scripts.
+"""
@@ -0,0 +1,250 @@
+"""Content-addressed cache for call transcripts and analyses.
+
+Transcripts are keyed by a SHA-256 of the audio bytes (plus the recognition
+language), and analyses such as compliance checks and summaries by a hash of the
+transcript, the kind of analysis and its options. The same recording therefore maps
+to the same entries no matter which browser session, page reload or batch run sees
+it.
+
+Entries live in a small in-memory LRU in front of a directory of JSON files shared
+by every process that points at it. The directory is bounded by `max_disk_bytes`:
+when it grows past that, the least recently used files (by modification time, which
+is refreshed on every hit) are removed.
+"""
+import functools
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+_lock = threading.Lock()
+_caches = {}
+
+
+def hash_audio(source):
+    # SHA-256 of a WAV file: a path, a BytesIO-like upload or any binary file object.
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    elif isinstance(source, io.BytesIO):
+        with source.getbuffer() as view:
+            digest.update(view)
+    else:
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+        source.seek(position)
+    return digest.hexdigest()
+
+
+def content_key(kind, content, **options):
+    # Key for an entry derived from `content` (an audio hash, a transcript, ...).
+    payload = json.dumps({"kind": kind, "content": content, "options": options}, sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class AnalysisCache:
+    def __init__(self, directory, max_memory_entries=128, max_disk_bytes=256 * 1024 * 1024):
+        # directory may be None for a memory-only cache.
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._disk_bytes = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Fan out over subdirectories so no single directory gets huge.
+        return os.path.join(self.directory, key[-2:], key + ".json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            # Missing, or removed/replaced underneath us by another process.
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        if self.directory:
+            value = self._read(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        # value must be JSON-serializable.
+        self._remember(key, value)
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value).encode("utf-8")
+        # Write then rename, so readers in other processes never see a partial file.
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict()
+
+    def get_or_compute(self, key, compute, cache_if=None):
+        # Return the cached value for key, or compute, store and return it. Concurrent
+        # callers in this process wait for a single computation. With cache_if, only
+        # values for which cache_if(value) is true are stored.
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                value = self._memory.get(key)
+            if value is None:
+                value = compute()
+                if value is not None and (cache_if is None or cache_if(value)):
+                    self.put(key, value)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
+
+    def memoize(self, kind, cache_if=None, **options):
+        # Decorator for analyses of a transcript: fn(call_contents, *args). The key
+        # covers kind, options (e.g. the model deployment), the transcript and args.
+        # The wrapper's .cached(call_contents, *args) returns a stored result or None
+        # without computing anything. cache_if works as in get_or_compute.
+        def decorator(fn):
+            def key(call_contents, *args):
+                return content_key(kind, call_contents, args=args, **options)
+
+            @functools.wraps(fn)
+            def wrapper(call_contents, *args):
+                return self.get_or_compute(key(call_contents, *args), lambda: fn(call_contents, *args), cache_if)
+
+            wrapper.cached = lambda call_contents, *args: self.get(key(call_contents, *args))
+            return wrapper
+        return decorator
+
+    def memoize_fields(self, kind, **options):
+        # Like memoize, for generator functions that yield (field, value) pairs as a
+        # structured answer streams in. A cached answer is replayed field by field; a
+        # new one is stored as a dict once the generator has run to completion, so an
+        # answer that was cut off is never cached. .cached() returns that dict or None.
+        def decorator(fn):
+            def key(call_contents, *args):
+                return content_key(kind, call_contents, args=args, **options)
+
+            @functools.wraps(fn)
+            def wrapper(call_contents, *args):
+                entry_key = key(call_contents, *args)
+                cached = self.get(entry_key)
+                if cached is not None:
+                    yield from cached.items()
+                    return
+                fields = {}
+                for field, value in fn(call_contents, *args):
+                    fields[field] = value
+                    yield field, value
+                self.put(entry_key, fields)
+
+            wrapper.cached = lambda call_contents, *args: self.get(key(call_contents, *args))
+            return wrapper
+        return decorator
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _evict(self):
+        # Other processes write to the same directory, so re-scan rather than trust
+        # our running total, then drop the least recently used files.
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            key = os.path.basename(path)[:-len(".json")]
+            with self._lock:
+                self._memory.pop(key, None)
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            for _, _, path in list(self._files()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+def get_analysis_cache(directory=".cache/analysis", **settings):
+    # Return the process-wide cache for a directory, creating it on first use.
+    with _lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = AnalysisCache(directory, **settings)
+            _caches[directory] = cache
+        return cache
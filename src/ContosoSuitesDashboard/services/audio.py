@@ -0,0 +1,182 @@
+"""Chunked WAV reading for the Speech SDK push stream.
+
+`wavfile.read(...).tobytes()` keeps two full copies of a recording in memory and
+hands everything to the push stream in one write. The helpers below parse the WAV
+header, then walk the PCM data in fixed-size frames from a memory map (files on
+disk) or the upload's own buffer (Streamlit uploads), so only one frame is copied
+at a time. `push_audio` throttles writes against recognition progress so the SDK's
+internal buffer stays bounded as well, however long the call is.
+"""
+import io
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class WavInfo:
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def block_align(self):
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def bytes_per_second(self):
+        return self.sample_rate * self.block_align
+
+    @property
+    def duration(self):
+        return self.data_size / self.bytes_per_second if self.bytes_per_second else 0.0
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of file while reading the WAV header.")
+    return data
+
+
+def read_wav_info(f):
+    # Parse the RIFF header of an open binary file and return its WavInfo. The file
+    # position is left at the start of the PCM data.
+    riff, _, wave = struct.unpack("<4sI4s", _read_exact(f, 12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file.")
+
+    fmt = None
+    while True:
+        chunk_id, chunk_size = struct.unpack("<4sI", _read_exact(f, 8))
+        if chunk_id == b"fmt ":
+            body = _read_exact(f, chunk_size + (chunk_size & 1))
+            format_tag, channels, sample_rate, _, _, bits_per_sample = struct.unpack("<HHIIHH", body[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The real format tag is the first two bytes of the sub-format GUID.
+                format_tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (format_tag, channels, sample_rate, bits_per_sample)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk found before the fmt chunk.")
+            data_offset = f.tell()
+            # Streamed WAVs may leave the size unset; treat that as "until end of file".
+            end = f.seek(0, os.SEEK_END)
+            f.seek(data_offset)
+            if chunk_size in (0, 0xFFFFFFFF) or data_offset + chunk_size > end:
+                chunk_size = end - data_offset
+            return WavInfo(*fmt, data_offset=data_offset, data_size=chunk_size)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+class WavReader:
+    """Iterate over the PCM data of a WAV file in fixed-duration frames.
+
+    `source` may be a path, a BytesIO-like object (e.g. a Streamlit upload) or any
+    seekable binary file object.
+    """
+
+    def __init__(self, source):
+        self._owned = None
+        if isinstance(source, (str, os.PathLike)):
+            source = self._owned = open(source, "rb")
+        self.file = source
+        self.file.seek(0)
+        self.info = read_wav_info(self.file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._owned is not None:
+            self._owned.close()
+            self._owned = None
+
+    def _buffer(self):
+        # A zero-copy (view, mmap or None) of the whole file, when one is available.
+        if isinstance(self.file, io.BytesIO):
+            return self.file.getbuffer(), None
+        try:
+            mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            return None, None
+        return memoryview(mapped), mapped
+
+    def frames(self, frame_ms=100):
+        # Yield bytes objects of frame_ms of audio each (the last frame may be shorter).
+        info = self.info
+        frame_bytes = max(info.block_align, info.bytes_per_second * frame_ms // 1000 // info.block_align * info.block_align)
+        end = info.data_offset + info.data_size
+
+        view, mapped = self._buffer()
+        if view is not None:
+            try:
+                for start in range(info.data_offset, end, frame_bytes):
+                    yield bytes(view[start:min(start + frame_bytes, end)])
+            finally:
+                view.release()
+                if mapped is not None:
+                    mapped.close()
+            return
+
+        self.file.seek(info.data_offset)
+        remaining = info.data_size
+        while remaining > 0:
+            frame = self.file.read(min(frame_bytes, remaining))
+            if not frame:
+                break
+            remaining -= len(frame)
+            yield frame
+
+
+class RecognitionProgress:
+    """Tracks how far into the audio the recognizer has got, in seconds.
+
+    Connect `update` to the transcriber's `transcribing` and `transcribed` events.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._condition = threading.Condition()
+
+    def update(self, evt):
+        # Offsets and durations are reported in 100-nanosecond ticks.
+        end = (evt.result.offset + evt.result.duration) / 10_000_000
+        with self._condition:
+            if end > self.seconds:
+                self.seconds = end
+                self._condition.notify_all()
+
+    def wait_for(self, seconds, timeout):
+        with self._condition:
+            return self._condition.wait_for(lambda: self.seconds >= seconds, timeout)
+
+
+def push_audio(stream, reader, frame_ms=100, progress=None, max_lead_seconds=30.0):
+    # Write the reader's frames to a PushAudioInputStream. With a RecognitionProgress,
+    # writing pauses once it is max_lead_seconds ahead of the recognizer. The allowed
+    # lead also grows with wall-clock time, so silence (which produces no recognition
+    # events) is pushed at real-time speed rather than blocking forever.
+    started = time.monotonic()
+    frame_seconds = frame_ms / 1000
+    pushed = 0.0
+    for frame in reader.frames(frame_ms):
+        if progress is not None:
+            while pushed > max(progress.seconds, time.monotonic() - started) + max_lead_seconds:
+                progress.wait_for(pushed - max_lead_seconds, timeout=frame_seconds)
+        stream.write(frame)
+        pushed += len(frame) / reader.info.bytes_per_second
+    return pushed
@@ -0,0 +1,235 @@
+"""Format normalization and silence trimming for file transcription.
+
+The push stream is opened as 16 kHz, 16-bit mono PCM (see create_file_transcriber),
+but recordings arrive in whatever format they were made in:
+02b_Customer_Call_Bad_Wrong_Sample_Rate.wav is 44.1 kHz, and stereo, 8/24/32-bit
+and floating-point WAVs are common. Pushed unchanged, those bytes are transcribed
+as noise. prepare_audio converts a WAV file to the stream format and can also
+compress long silences, which would otherwise be paid for and waited on:
+
+- The PCM data is viewed in place with NumPy (a memory map for files on disk, the
+  upload's own buffer for Streamlit uploads). It is downmixed and converted to
+  float32 in a single pass, then scaled in place.
+- Resampling uses SciPy's polyphase filter (resample_poly) with the exact up/down
+  ratio between the two rates.
+- An energy VAD marks 30 ms frames as speech when they are louder than the noise
+  floor plus a margin. Speech is padded on both sides, and any silence longer than
+  max_silence_ms is cut down to keep_silence_ms, so the recognizer still hears the
+  pauses between phrases.
+- A TimeMap records where each kept span came from, so offsets reported by the
+  recognizer (in seconds of processed audio) map back to the original recording.
+
+Recordings already in the stream format are streamed straight from the file with
+WavReader, in constant memory, unless silence trimming is on. Conversion and
+trimming work on the whole recording at once (the VAD's noise floor is a percentile
+over every frame), so they hold several full-length copies of it: float32 samples,
+the resampled signal and the int16 output. That is hundreds of MB for an hour of
+audio, which is why TrimSilence is off by default.
+"""
+import os
+from dataclasses import dataclass
+from math import gcd
+
+import numpy as np
+
+from services.audio import WAVE_FORMAT_PCM, WavInfo, WavReader
+
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+STREAM_SAMPLE_RATE = 16000
+
+_PCM_DTYPES = {8: np.uint8, 16: np.dtype("<i2"), 32: np.dtype("<i4")}
+_FLOAT_DTYPES = {32: np.dtype("<f4"), 64: np.dtype("<f8")}
+
+
+def _sample_bytes(source, info):
+    # The PCM data as a uint8 array, without copying it when the source allows.
+    size = info.data_size // info.block_align * info.block_align
+    if size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    if isinstance(source, (str, os.PathLike)):
+        return np.memmap(source, dtype=np.uint8, mode="r", offset=info.data_offset, shape=(size,))
+    if hasattr(source, "getbuffer"):
+        return np.frombuffer(source.getbuffer(), dtype=np.uint8, count=size, offset=info.data_offset)
+    source.seek(info.data_offset)
+    return np.frombuffer(source.read(size), dtype=np.uint8)
+
+
+def read_samples(source, info):
+    # Mono float32 samples in [-1, 1). Multi-channel audio is averaged while it is
+    # converted, so the only full-length copy made is the float32 output.
+    raw = _sample_bytes(source, info)
+    bits = info.bits_per_sample
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in _FLOAT_DTYPES:
+        samples, scale, offset = raw.view(_FLOAT_DTYPES[bits]), 1.0, 0.0
+    elif info.format_tag == WAVE_FORMAT_PCM and bits == 24:
+        # No 24-bit dtype: place each 3-byte sample in the top of an int32.
+        triples = raw.reshape(-1, 3)
+        samples = (triples[:, 0].astype(np.int32) << 8) | (triples[:, 1].astype(np.int32) << 16) \
+            | (triples[:, 2].astype(np.int32) << 24)
+        scale, offset = 1.0 / 2 ** 31, 0.0
+    elif info.format_tag == WAVE_FORMAT_PCM and bits in _PCM_DTYPES:
+        samples = raw.view(_PCM_DTYPES[bits])
+        scale = 1.0 / 128 if bits == 8 else 1.0 / 2 ** (bits - 1)
+        offset = -128.0 if bits == 8 else 0.0
+    else:
+        raise ValueError(f"Unsupported WAV encoding: format {info.format_tag:#06x}, {bits} bits per sample.")
+    samples = samples.reshape(-1, info.channels)
+    if info.channels == 1:
+        mono = samples[:, 0].astype(np.float32)
+    else:
+        mono = samples.mean(axis=1, dtype=np.float32)
+    if offset:
+        mono += offset
+    if scale != 1.0:
+        mono *= scale
+    return mono
+
+
+def resample(samples, sample_rate, target_rate):
+    # Polyphase resampling by the reduced ratio target_rate / sample_rate.
+    if sample_rate == target_rate:
+        return samples
+    from scipy.signal import resample_poly
+
+    divisor = gcd(sample_rate, target_rate)
+    return resample_poly(samples, target_rate // divisor, sample_rate // divisor).astype(np.float32, copy=False)
+
+
+def speech_frames(samples, sample_rate, frame_ms=30, margin_db=12.0, min_threshold_db=-50.0, pad_ms=200):
+    # One bool per frame_ms frame (the last, partial frame included): True where the
+    # frame is louder than max(noise floor + margin_db, min_threshold_db), widened by
+    # pad_ms on both sides. The noise floor is the 10th percentile of frame energy.
+    frame = max(1, sample_rate * frame_ms // 1000)
+    count = -(-len(samples) // frame)
+    if count == 0:
+        return np.zeros(0, dtype=bool), frame
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(count, frame)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame
+    level = 10 * np.log10(energy + 1e-12)
+    threshold = max(np.percentile(level, 10) + margin_db, min_threshold_db)
+    speech = level > threshold
+    pad = pad_ms // frame_ms
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+    return speech, frame
+
+
+def kept_spans(speech, max_silence_frames, keep_silence_frames):
+    # (start, end) frame ranges to keep: everything except the middle of silent runs
+    # longer than max_silence_frames, of which keep_silence_frames survive, split
+    # between the two ends of the run.
+    edges = np.diff(np.concatenate(([0], (~speech).astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    long = (ends - starts) > max_silence_frames
+    cut_starts = starts[long] + keep_silence_frames // 2
+    cut_ends = ends[long] - (keep_silence_frames - keep_silence_frames // 2)
+    span_starts = np.concatenate(([0], cut_ends))
+    span_ends = np.concatenate((cut_starts, [len(speech)]))
+    nonempty = span_ends > span_starts
+    return span_starts[nonempty], span_ends[nonempty]
+
+
+@dataclass
+class TimeMap:
+    """Maps seconds of processed audio back to seconds of the original recording."""
+    processed_starts: np.ndarray
+    original_starts: np.ndarray
+
+    @classmethod
+    def identity(cls):
+        return cls(np.zeros(1), np.zeros(1))
+
+    def to_original(self, seconds, end=False):
+        # Works on scalars and arrays. With end=True, a time exactly on the boundary
+        # between two kept spans is placed at the end of the earlier one.
+        span = np.clip(np.searchsorted(self.processed_starts, seconds, side="left" if end else "right") - 1, 0, None)
+        return self.original_starts[span] + (np.asarray(seconds) - self.processed_starts[span])
+
+    def map_spans(self, spans):
+        # [(start, end), ...] in processed seconds -> the same in original seconds.
+        if not spans:
+            return []
+        starts, ends = np.asarray(spans, dtype=np.float64).T
+        starts, ends = self.to_original(starts).round(3), self.to_original(ends, end=True).round(3)
+        return list(zip(starts.tolist(), ends.tolist()))
+
+
+class PreparedAudio:
+    """16-bit mono PCM in the stream format, with WavReader's frames()/info interface."""
+
+    def __init__(self, pcm, sample_rate, source_info, time_map):
+        self.pcm = pcm
+        self.source_info = source_info
+        self.time_map = time_map
+        self.info = WavInfo(WAVE_FORMAT_PCM, 1, sample_rate, 16, data_offset=0, data_size=pcm.nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    @property
+    def removed_seconds(self):
+        return self.source_info.duration - self.info.duration
+
+    def frames(self, frame_ms=100):
+        frame_bytes = max(2, self.info.bytes_per_second * frame_ms // 1000 // 2 * 2)
+        view = memoryview(self.pcm).cast("B")
+        for start in range(0, len(view), frame_bytes):
+            yield bytes(view[start:start + frame_bytes])
+
+
+def prepare_audio(source, sample_rate=STREAM_SAMPLE_RATE, trim_silence=False, frame_ms=30, margin_db=12.0,
+                  min_threshold_db=-50.0, pad_ms=200, max_silence_ms=700, keep_silence_ms=300):
+    # Convert a WAV file (path or file-like object) to 16-bit mono PCM at sample_rate,
+    # optionally compressing silences longer than max_silence_ms to keep_silence_ms.
+    with WavReader(source) as reader:
+        info = reader.info
+        samples = read_samples(source if isinstance(source, (str, os.PathLike)) else reader.file, info)
+    samples = resample(samples, info.sample_rate, sample_rate)
+
+    time_map = TimeMap.identity()
+    if trim_silence and len(samples):
+        speech, frame = speech_frames(samples, sample_rate, frame_ms, margin_db, min_threshold_db, pad_ms)
+        starts, ends = kept_spans(speech, max_silence_ms // frame_ms, keep_silence_ms // frame_ms)
+        starts, ends = starts * frame, np.minimum(ends * frame, len(samples))
+        if len(starts) != 1 or starts[0] != 0 or ends[0] != len(samples):
+            samples = np.concatenate([samples[start:end] for start, end in zip(starts, ends)])
+            lengths = ends - starts
+            time_map = TimeMap(np.concatenate(([0], np.cumsum(lengths)[:-1])) / sample_rate, starts / sample_rate)
+
+    # Scale in place; the int16 conversion is the only other copy.
+    np.multiply(samples, 32768.0, out=samples)
+    np.clip(samples, -32768, 32767, out=samples)
+    return PreparedAudio(samples.astype("<i2"), sample_rate, info, time_map)
+
+
+def open_audio(source, sample_rate=STREAM_SAMPLE_RATE, trim_silence=False, **vad_options):
+    # A reader for push_audio that delivers 16-bit mono PCM at sample_rate: the
+    # recording itself when it is already in that format and no trimming is wanted,
+    # otherwise the prepared audio.
+    if not trim_silence:
+        reader = WavReader(source)
+        info = reader.info
+        if (info.format_tag, info.channels, info.sample_rate, info.bits_per_sample) == (WAVE_FORMAT_PCM, 1, sample_rate, 16):
+            return reader
+        reader.close()
+    return prepare_audio(source, sample_rate, trim_silence, **vad_options)
+
+
+def preprocess_options(settings):
+    # open_audio options from the "AudioPreprocessing" section of config.json.
+    return {
+        "trim_silence": settings.get("TrimSilence", False),
+        "max_silence_ms": settings.get("MaxSilenceMs", 700),
+        "keep_silence_ms": settings.get("KeepSilenceMs", 300),
+        "pad_ms": settings.get("PadMs", 200),
+        "margin_db": settings.get("MarginDb", 12.0),
+        "min_threshold_db": settings.get("MinThresholdDb", -50.0),
+    }
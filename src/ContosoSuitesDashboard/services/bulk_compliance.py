@@ -0,0 +1,282 @@
+"""Asynchronous, rate-limit-aware compliance checks for many calls at once.
+
+`is_call_in_compliance` sends one blocking request per transcript. Auditing a day's
+calls that way is slow, and once the deployment's quota is used up every request
+fails with 429 Too Many Requests. BulkComplianceChecker sends the same prompt for
+many transcripts concurrently:
+
+- a semaphore bounds the number of requests in flight;
+- token buckets sized to the deployment's requests-per-minute and tokens-per-minute
+  quota pace requests so most of them never get a 429;
+- 429s and transient failures are retried with exponential backoff and jitter,
+  honouring the service's Retry-After header. A 429 also pauses every other
+  request for that long, since the quota is shared;
+- transcripts longer than `max_chunk_tokens` would not fit in the context window.
+  They are split with long_transcripts.split_transcript and checked map-reduce
+  style like check_compliance does: every question for every chunk, then one
+  request that merges the findings. Each of those requests goes through the same
+  semaphore, rate limiter and retries.
+
+Results are yielded as each call completes, not in input order.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from services.call_center import (
+    compliance_chunk_prompt,
+    compliance_questions,
+    compliance_reduce_prompt,
+    compliance_system_prompt,
+)
+from services.history import count_tokens
+from services.long_transcripts import split_transcript
+from services.metrics import get_metrics
+from services.openai_clients import aclose_all, get_async_openai_client
+
+# Transient failures worth retrying; anything else (bad request, auth) fails at once.
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+@dataclass
+class ComplianceResult:
+    call_id: object
+    compliance: str = None
+    error: str = None
+    # requests counts the distinct requests (more than one for a chunked call) and
+    # attempts every try, so attempts - requests is the number of retries.
+    requests: int = 0
+    attempts: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class TokenBucket:
+    """Allows `per_minute` units per minute, in bursts of at most `capacity`.
+
+    Azure OpenAI enforces quotas over short windows, so the default burst is a tenth
+    of the per-minute quota rather than the whole minute's worth.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 10)
+        self.clock = clock
+        self.available = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # Requests larger than the burst size would wait forever, so cap them.
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.available >= amount:
+                self.available -= amount
+                return
+            await asyncio.sleep((amount - self.available) / self.rate)
+
+    def refund(self, amount):
+        # Return units that were reserved but not used.
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, clock=time.monotonic):
+        self.requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self.clock = clock
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens):
+        while True:
+            pause = self._paused_until - self.clock()
+            if pause <= 0:
+                break
+            await asyncio.sleep(pause)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(tokens)
+
+    def pause(self, seconds):
+        # Hold back every request for `seconds`, e.g. after a 429 with Retry-After.
+        self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+    def reconcile(self, estimated, actual):
+        # Give back tokens when a request used fewer than were reserved for it.
+        if self.tokens is not None and actual is not None and actual < estimated:
+            self.tokens.refund(estimated - actual)
+
+
+def retry_after_seconds(error):
+    # The delay a 429/503 asks for, from retry-after-ms or Retry-After, or None.
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class BulkComplianceChecker:
+    def __init__(self, endpoint, api_key, deployment_name, concurrency=8, requests_per_minute=None,
+                 tokens_per_minute=None, max_completion_tokens=400, max_retries=6, base_delay=1.0, max_delay=60.0,
+                 max_chunk_tokens=None):
+        # requests_per_minute/tokens_per_minute should match the deployment's quota;
+        # leave them unset to rely on the semaphore and backoff alone. With
+        # max_chunk_tokens, longer transcripts are checked chunk by chunk.
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.deployment_name = deployment_name
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_completion_tokens = max_completion_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_chunk_tokens = max_chunk_tokens
+
+    def _backoff(self, attempt, error):
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+    async def _request(self, client, semaphore, limiter, result, system, user):
+        # One rate-limited completion, retried on transient failures. Returns its text,
+        # or None with result.error set.
+        estimated = count_tokens(system) + count_tokens(user) + self.max_completion_tokens
+        metrics = get_metrics()
+        attempts = 0
+        result.requests += 1
+        async with semaphore:
+            while True:
+                attempts += 1
+                result.attempts += 1
+                await limiter.acquire(estimated)
+                try:
+                    response = await client.chat.completions.create(
+                        model=self.deployment_name,
+                        messages=[
+                            {"role": "system", "content": system},
+                            {"role": "user", "content": user}
+                        ],
+                        max_tokens=self.max_completion_tokens,
+                    )
+                except RETRYABLE_ERRORS as e:
+                    if isinstance(e, openai.RateLimitError):
+                        result.rate_limited += 1
+                        metrics.increment("aoai_rate_limited")
+                    if attempts > self.max_retries:
+                        result.error = f"Gave up after {attempts} attempts: {e}"
+                        return None
+                    delay = self._backoff(attempts, e)
+                    if isinstance(e, openai.RateLimitError):
+                        limiter.pause(delay)
+                    await asyncio.sleep(delay)
+                    continue
+                except openai.APIError as e:
+                    result.error = str(e)
+                    return None
+                usage = getattr(response, "usage", None)
+                limiter.reconcile(estimated, getattr(usage, "total_tokens", None))
+                return response.choices[0].message.content
+
+    async def _check(self, client, semaphore, limiter, call_id, call_contents, include_recording_message,
+                     is_relevant_to_topic):
+        result = ComplianceResult(call_id)
+        started = time.perf_counter()
+        chunks = split_transcript(call_contents, self.max_chunk_tokens) if self.max_chunk_tokens else [call_contents]
+        if len(chunks) <= 1:
+            system, user = compliance_system_prompt(include_recording_message, is_relevant_to_topic), ' '.join(call_contents)
+        else:
+            # Map: every question for every chunk, concurrently.
+            questions = compliance_questions(include_recording_message, is_relevant_to_topic)
+            asks = [(index, name) for index in range(len(chunks)) for name in questions]
+            replies = await asyncio.gather(*(
+                self._request(client, semaphore, limiter, result,
+                              compliance_chunk_prompt(questions[name], index, len(chunks)), ' '.join(chunks[index]))
+                for index, name in asks
+            ))
+            answers = [{} for _ in chunks]
+            for (index, name), reply in zip(asks, replies):
+                answers[index][name] = reply
+            system, user = compliance_reduce_prompt(include_recording_message, is_relevant_to_topic, answers)
+        if result.error is None:
+            result.compliance = await self._request(client, semaphore, limiter, result, system, user)
+        result.elapsed = time.perf_counter() - started
+        get_metrics().observe("bulk_compliance_seconds", result.elapsed)
+        return result
+
+    async def check_many(self, calls, include_recording_message=True, is_relevant_to_topic=True):
+        # calls is an iterable of (call_id, call_contents) where call_contents is a list
+        # of transcribed phrases. Yields a ComplianceResult as each call completes.
+        client = get_async_openai_client(self.endpoint, self.api_key, self.deployment_name).with_options(max_retries=0)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        tasks = [
+            asyncio.ensure_future(self._check(client, semaphore, limiter, call_id, call_contents,
+                                              include_recording_message, is_relevant_to_topic))
+            for call_id, call_contents in calls
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def iter_results(self, calls, include_recording_message=True, is_relevant_to_topic=True):
+        # Synchronous version of check_many for callers without an event loop (the
+        # Streamlit pages, command-line tools). The checks run on a private event loop
+        # in a background thread.
+        results = queue.Queue()
+        done = object()
+
+        async def run():
+            try:
+                async for result in self.check_many(calls, include_recording_message, is_relevant_to_topic):
+                    results.put(result)
+            except Exception as e:
+                results.put(e)
+            finally:
+                await aclose_all()
+                results.put(done)
+
+        thread = threading.Thread(target=asyncio.run, args=(run(),), name="bulk-compliance", daemon=True)
+        thread.start()
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        thread.join()
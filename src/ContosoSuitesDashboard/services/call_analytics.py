@@ -0,0 +1,154 @@
+"""Single-pass Language service analysis of a call transcript.
+
+Instead of one TextAnalyticsClient and one analyze job (each with its own polling
+loop) per summary, sentiment or entity request, `analyze_call` joins the transcript
+once and submits every requested action in a single `begin_analyze_actions` job on
+a pooled client. `run_call_analysis` runs that job and the OpenAI query-based
+summary concurrently, so a full analysis of a call costs roughly one service round
+trip. Results are converted to the JSON shapes the Call Center page displays.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import get_metrics
+
+# Language actions, in the order they are submitted.
+ACTIONS = ["extractive-summary", "abstractive-summary", "sentiment", "named-entities"]
+
+_lock = threading.Lock()
+_clients = {}
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="call-analysis")
+
+
+def get_text_analytics_client(endpoint, key):
+    # Return the shared TextAnalyticsClient for this Language resource.
+    with _lock:
+        client = _clients.get((endpoint, key))
+        if client is None:
+            from azure.ai.textanalytics import TextAnalyticsClient
+            from azure.core.credentials import AzureKeyCredential
+
+            client = TextAnalyticsClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+            _clients[(endpoint, key)] = client
+    return client
+
+
+def _create_action(name):
+    from azure.ai.textanalytics import (
+        AbstractiveSummaryAction,
+        AnalyzeSentimentAction,
+        ExtractiveSummaryAction,
+        RecognizeEntitiesAction,
+    )
+
+    if name == "extractive-summary":
+        return ExtractiveSummaryAction(max_sentence_count=2)
+    if name == "abstractive-summary":
+        return AbstractiveSummaryAction(sentence_count=2)
+    if name == "sentiment":
+        return AnalyzeSentimentAction(show_opinion_mining=True)
+    if name == "named-entities":
+        return RecognizeEntitiesAction()
+    raise ValueError(f"Unknown Language action '{name}'.")
+
+
+def _scores(scores, neutral=True):
+    values = {"positive": round(scores.positive, 2)}
+    if neutral:
+        values["neutral"] = round(scores.neutral, 2)
+    values["negative"] = round(scores.negative, 2)
+    return values
+
+
+def format_extractive_summary(result):
+    return {"call-summary": " ".join(sentence.text for sentence in result.sentences)}
+
+
+def format_abstractive_summary(result):
+    return {"call-summary": " ".join(summary.text for summary in result.summaries)}
+
+
+def format_sentiment(result):
+    return {
+        "sentiment": result.sentiment,
+        "sentiment-scores": _scores(result.confidence_scores),
+        "sentences": [
+            {
+                "text": sentence.text,
+                "sentiment": sentence.sentiment,
+                "sentiment-scores": _scores(sentence.confidence_scores),
+                "mined_opinions": [
+                    {
+                        "target-text": opinion.target.text,
+                        "target-sentiment": opinion.target.sentiment,
+                        "sentiment-scores": _scores(opinion.target.confidence_scores, neutral=False),
+                        "assessments": [
+                            {
+                                "text": assessment.text,
+                                "sentiment": assessment.sentiment,
+                                "sentiment-scores": _scores(assessment.confidence_scores, neutral=False),
+                            }
+                            for assessment in opinion.assessments
+                        ],
+                    }
+                    for opinion in sentence.mined_opinions
+                ],
+            }
+            for sentence in result.sentences
+        ],
+    }
+
+
+def format_named_entities(result):
+    return [
+        {
+            "text": entity.text,
+            "category": entity.category,
+            "subcategory": entity.subcategory,
+            "length": entity.length,
+            "offset": entity.offset,
+            "confidence-score": entity.confidence_score,
+        }
+        for entity in result.entities
+    ]
+
+
+FORMATTERS = {
+    "extractive-summary": format_extractive_summary,
+    "abstractive-summary": format_abstractive_summary,
+    "sentiment": format_sentiment,
+    "named-entities": format_named_entities,
+}
+
+
+def analyze_call(client, call_contents, actions=ACTIONS, polling_interval=1):
+    # Run every requested Language action over the joined transcript in one analyze
+    # job and return {action: formatted result}. A failed action maps to {"error": ...}.
+    document = ' '.join(call_contents)
+    with get_metrics().span("language_analyze_job"):
+        poller = client.begin_analyze_actions(
+            [document],
+            actions=[_create_action(name) for name in actions],
+            polling_interval=polling_interval,
+        )
+        # One document in, so there is exactly one list of action results out.
+        action_results = next(iter(poller.result()))
+
+    results = {}
+    for name, result in zip(actions, action_results):
+        if result.is_error:
+            results[name] = {"error": f"{result.error.code}: {result.error.message}"}
+        else:
+            results[name] = FORMATTERS[name](result)
+    return results
+
+
+def run_call_analysis(client, call_contents, actions=ACTIONS, query_summary_fn=None, polling_interval=1):
+    # Run the Language job and query_summary_fn(call_contents) (the OpenAI query-based
+    # summary) at the same time. Returns {action: result}, with the OpenAI summary
+    # under "query-based-summary".
+    query_future = _executor.submit(query_summary_fn, call_contents) if query_summary_fn is not None else None
+    results = analyze_call(client, call_contents, actions, polling_interval) if actions else {}
+    if query_future is not None:
+        results["query-based-summary"] = query_future.result()
+    return results
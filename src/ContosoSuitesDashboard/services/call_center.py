@@ -0,0 +1,325 @@
+"""Call transcription and compliance checks shared by the Call Center page and the
+batch_transcribe.py command-line tool.
+"""
+import json
+import time
+
+from services.audio import RecognitionProgress, push_audio
+from services.audio_preprocessing import TimeMap, open_audio
+from services.json_stream import json_fields
+from services.long_transcripts import map_chunks, split_transcript, submit_chunks
+from services.metrics import get_metrics
+from services.streaming import completion_deltas
+from services.transcription import get_session_manager
+
+
+def create_file_transcriber(speech_key, speech_region, speech_recognition_language="en-US",
+                            samples_per_second=16000, bits_per_sample=16, channels=1):
+    # Create a conversation transcriber that reads from a push stream.
+    # Returns (transcriber, stream).
+    import azure.cognitiveservices.speech as speechsdk
+
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    speech_config.speech_recognition_language = speech_recognition_language
+
+    # Create audio configuration using the push stream
+    wave_format = speechsdk.audio.AudioStreamFormat(samples_per_second, bits_per_sample, channels)
+    stream = speechsdk.audio.PushAudioInputStream(stream_format=wave_format)
+    audio_config = speechsdk.audio.AudioConfig(stream=stream)
+    return speechsdk.transcription.ConversationTranscriber(speech_config, audio_config), stream
+
+
+def transcribe_file(audio_file, transcriber, stream, timeout=600, lead_seconds=30, frame_ms=100, preprocess=None,
+                    timings=None):
+    # Push a WAV file (path or file-like object) through the transcriber and return
+    # (results, error). error is None unless the session was cancelled or timed out.
+    # The audio is converted to the stream's 16 kHz, 16-bit mono format when it is in
+    # any other format; preprocess holds further open_audio options, such as
+    # trim_silence. With a timings list, the (start, end) of every phrase, in seconds
+    # of the original recording, is appended to it.
+    progress = RecognitionProgress()
+    transcriber.transcribing.connect(progress.update)
+    transcriber.transcribed.connect(progress.update)
+
+    # The session manager completes the session from the session_stopped/canceled
+    # callbacks, so we simply wait on it instead of polling a flag.
+    manager = get_session_manager()
+    started = time.perf_counter()
+    with open_audio(audio_file, **(preprocess or {})) as reader:
+        session = manager.start(transcriber, deadline=timeout + reader.info.duration)
+
+        # Stream the wave file to the sdk in frame_ms frames, staying at most a little
+        # ahead of the recognizer so memory use stays flat.
+        def push():
+            push_audio(stream, reader, frame_ms=frame_ms, progress=progress, max_lead_seconds=lead_seconds)
+            stream.close()
+
+        manager.feed(session, push)
+        results = session.wait()
+
+    transcriber.stop_transcribing_async()
+    if timings is not None:
+        timings.extend((getattr(reader, "time_map", None) or TimeMap.identity()).map_spans(session.timings))
+    # Real-time factor: seconds spent per second of audio (lower is faster).
+    elapsed = time.perf_counter() - started
+    metrics = get_metrics()
+    metrics.observe("speech_transcription_seconds", elapsed)
+    if reader.info.duration:
+        metrics.observe("speech_real_time_factor", elapsed / reader.info.duration)
+    if hasattr(reader, "removed_seconds"):
+        metrics.observe("speech_trimmed_seconds", reader.removed_seconds)
+    if session.error:
+        metrics.increment("speech_transcription_errors")
+    return results, session.error
+
+
+def compliance_system_prompt(include_recording_message, is_relevant_to_topic):
+    if include_recording_message:
+        include_recording_message_text = "2. Was the caller aware that the call was being recorded?"
+    else:
+        include_recording_message_text = ""
+
+    if is_relevant_to_topic:
+        is_relevant_to_topic_text = "3. Was the call relevant to the hotel and resort industry?"
+    else:
+        is_relevant_to_topic_text = ""
+
+    return f"""
+        You are an automated analysis system for Contoso Suites. Contoso Suites is a luxury hotel and resort chain with locations
+        in a variety of Caribbean nations and territories.
+
+        You are analyzing a call for relevance and compliance.
+
+        You will only answer the following questions based on the call contents:
+        1. Was there vulgarity on the call?
+        {include_recording_message_text}
+        {is_relevant_to_topic_text}
+    """
+
+
+def _complete(client, deployment_name, system, user):
+    response = client.chat.completions.create(
+        model=deployment_name,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ],
+    )
+    return response.choices[0].message.content
+
+
+def compliance_questions(include_recording_message, is_relevant_to_topic):
+    # The compliance questions to ask, by key.
+    questions = {"vulgarity": "Was there vulgarity on the call?"}
+    if include_recording_message:
+        questions["recording-notice"] = "Was the caller aware that the call was being recorded?"
+    if is_relevant_to_topic:
+        questions["relevance"] = "Was the call relevant to the hotel and resort industry?"
+    return questions
+
+
+def _chunk_system_prompt(index, count, task):
+    return f"""
+        You are an automated analysis system for Contoso Suites. Contoso Suites is a luxury hotel and resort chain with locations
+        in a variety of Caribbean nations and territories.
+
+        You are reading part {index + 1} of {count} of a call transcript that is too long to read at once.
+        {task}
+    """
+
+
+def compliance_chunk_prompt(question, index, count):
+    # The system prompt that asks one compliance question about one chunk of a long call.
+    task = f"""Answer the following question for this part of the call only, quoting the utterances your answer
+        is based on. If this part of the call does not tell, say so.
+        {question}"""
+    return _chunk_system_prompt(index, count, task)
+
+
+def compliance_reduce_prompt(include_recording_message, is_relevant_to_topic, answers):
+    # The (system, user) messages that merge the per-chunk answers into a check of the
+    # whole call. answers[index][key] answers question `key` for chunk `index`.
+    questions = compliance_questions(include_recording_message, is_relevant_to_topic)
+    findings = []
+    for index, chunk_answers in enumerate(answers):
+        lines = [f"{question} {chunk_answers[name]}" for name, question in questions.items()]
+        findings.append(f"Findings for part {index + 1} of {len(answers)}:\n" + "\n".join(lines))
+    system = compliance_system_prompt(include_recording_message, is_relevant_to_topic) + """
+        The call was too long to read at once, so you are given the findings for each part of the call instead
+        of the call itself. Answer each question for the call as a whole.
+    """
+    return system, "\n\n".join(findings)
+
+
+def _compliance_prompt(client, deployment_name, call_contents, include_recording_message, is_relevant_to_topic,
+                       max_chunk_tokens, cache):
+    # The (system, user) messages that ask the compliance questions about a transcript
+    # (a list of phrases). Transcripts longer than max_chunk_tokens are checked
+    # map-reduce style: each question is answered for each chunk in parallel (cached
+    # per chunk and question, so toggling a question only asks the new one), and the
+    # messages then ask for the findings to be merged.
+    chunks = split_transcript(call_contents, max_chunk_tokens) if max_chunk_tokens else [call_contents]
+    if len(chunks) <= 1:
+        return compliance_system_prompt(include_recording_message, is_relevant_to_topic), ' '.join(call_contents)
+
+    questions = compliance_questions(include_recording_message, is_relevant_to_topic)
+    futures = {}
+    for name, question in questions.items():
+        def answer(chunk, index, count, question=question):
+            return _complete(client, deployment_name, compliance_chunk_prompt(question, index, count), ' '.join(chunk))
+        futures[name] = submit_chunks(chunks, answer, cache, "compliance-chunk", question=name, model=deployment_name)
+
+    answers = [{name: futures[name][index].result() for name in questions} for index in range(len(chunks))]
+    return compliance_reduce_prompt(include_recording_message, is_relevant_to_topic, answers)
+
+
+def check_compliance(client, deployment_name, call_contents, include_recording_message, is_relevant_to_topic,
+                     max_chunk_tokens=None, cache=None):
+    # Ask the model the compliance questions about a transcript and return its answer
+    # as text. See _compliance_prompt for how long transcripts are handled.
+    with get_metrics().span("compliance_check"):
+        system, user = _compliance_prompt(client, deployment_name, call_contents, include_recording_message,
+                                          is_relevant_to_topic, max_chunk_tokens, cache)
+        return _complete(client, deployment_name, system, user)
+
+
+def stream_compliance(client, deployment_name, call_contents, include_recording_message, is_relevant_to_topic,
+                      max_chunk_tokens=None, cache=None):
+    # Like check_compliance, but the answer is a JSON object with one field per
+    # question (keyed as in compliance_questions), and each (key, answer) is yielded
+    # as soon as the model has finished it.
+    system, user = _compliance_prompt(client, deployment_name, call_contents, include_recording_message,
+                                      is_relevant_to_topic, max_chunk_tokens, cache)
+    questions = compliance_questions(include_recording_message, is_relevant_to_topic)
+    fields = ",\n        ".join(f'"{name}": your answer to "{question}", quoting the utterances it is based on'
+                                 for name, question in questions.items())
+    system += f"""
+        Reply with a JSON object with the following fields, in this order, and nothing else:
+        {fields}
+    """
+    yield from stream_json_completion(client, deployment_name, system, user)
+
+
+def stream_json_completion(client, deployment_name, system, user):
+    # Stream a completion in JSON response mode and yield each top-level (field, value)
+    # of the reply as soon as it is complete, in the order the model writes them.
+    # The system message must ask for JSON and say which fields to write first.
+    metrics = get_metrics()
+    started = time.perf_counter()
+    stream = client.chat.completions.create(
+        model=deployment_name,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ],
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    first = True
+    for field, value in json_fields(completion_deltas(stream)):
+        if first:
+            metrics.observe("json_first_field_seconds", time.perf_counter() - started)
+            first = False
+        yield field, value
+    metrics.observe("json_completion_seconds", time.perf_counter() - started)
+
+
+def _transcript_message(client, deployment_name, call_contents, max_chunk_tokens, cache):
+    # The user message for a prompt over a whole transcript. Transcripts longer than
+    # max_chunk_tokens are first summarized chunk by chunk in parallel (cached per
+    # chunk), and the partial summaries are sent instead.
+    chunks = split_transcript(call_contents, max_chunk_tokens) if max_chunk_tokens else [call_contents]
+    if len(chunks) <= 1:
+        return ' '.join(call_contents)
+
+    def summarize(chunk, index, count):
+        task = """Summarize this part of the call in at most five sentences. Keep the names, dates, places,
+        requests and complaints that are mentioned."""
+        return _complete(client, deployment_name, _chunk_system_prompt(index, count, task), ' '.join(chunk))
+
+    with get_metrics().span("transcript_map_reduce"):
+        summaries = map_chunks(chunks, summarize, cache, "summary-chunk", model=deployment_name)
+    return "\n\n".join(f"Summary of part {index + 1} of {len(summaries)}:\n{summary}"
+                       for index, summary in enumerate(summaries))
+
+
+def complete_over_transcript(client, deployment_name, system, call_contents, max_chunk_tokens=None, cache=None):
+    # Run a prompt that expects the whole transcript as the user message and return
+    # the answer. See _transcript_message for how long transcripts are handled.
+    user = _transcript_message(client, deployment_name, call_contents, max_chunk_tokens, cache)
+    return _complete(client, deployment_name, system, user)
+
+
+def stream_json_over_transcript(client, deployment_name, system, call_contents, max_chunk_tokens=None, cache=None):
+    # complete_over_transcript for a prompt that asks for a JSON object: yields each
+    # (field, value) as soon as it is complete.
+    user = _transcript_message(client, deployment_name, call_contents, max_chunk_tokens, cache)
+    yield from stream_json_completion(client, deployment_name, system, user)
+
+
+def live_compliance_system_prompt(check_recording_message, is_relevant_to_topic):
+    questions = ['"vulgarity": the numbers of the new utterances that contain vulgarity (an empty list if none)']
+    if check_recording_message:
+        questions.append('"recording_notice": true if any utterance tells the caller that the call is being recorded')
+    if is_relevant_to_topic:
+        questions.append('"off_topic": true if the new utterances are not relevant to the hotel and resort industry')
+    fields = ",\n        ".join(questions)
+
+    return f"""
+        You are an automated analysis system for Contoso Suites, monitoring a call while it is in progress.
+        Contoso Suites is a luxury hotel and resort chain with locations in a variety of Caribbean nations and territories.
+
+        You will be given numbered utterances from the call. Utterances marked "context" were already checked and
+        are only there to help you understand the new ones. Answer only about the new utterances.
+
+        Reply with a JSON object with the following fields and nothing else:
+        {fields}
+    """
+
+
+def _parse_json_object(text):
+    # Models sometimes wrap JSON in a code fence or a sentence; take the outermost object.
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError(f"Expected a JSON object, got: {text!r}")
+    return json.loads(text[start:end + 1])
+
+
+def check_live_compliance(client, deployment_name, context, new_utterances, start_index, state,
+                          include_recording_message=True, is_relevant_to_topic=True, recording_notice_within=6):
+    # Check a batch of newly transcribed utterances of a live call; this is the
+    # analyze_fn of services.live_analysis.LiveCallMonitor. Returns a list of alerts
+    # ({"type", "utterance", "text", "message"}). `state` carries call-level facts
+    # between batches, so the recording notice stops being asked about once it is heard.
+    check_recording_message = include_recording_message and not state.get("recording_notice")
+    lines = [f"{start_index - len(context) + i} (context): {text}" for i, text in enumerate(context)]
+    lines += [f"{start_index + i}: {text}" for i, text in enumerate(new_utterances)]
+    with get_metrics().span("live_compliance_check"):
+        response = client.chat.completions.create(
+            model=deployment_name,
+            messages=[
+                {"role": "system", "content": live_compliance_system_prompt(check_recording_message, is_relevant_to_topic)},
+                {"role": "user", "content": "\n".join(lines)}
+            ],
+            temperature=0,
+        )
+    answer = _parse_json_object(response.choices[0].message.content)
+
+    alerts = []
+    end_index = start_index + len(new_utterances)
+    for index in answer.get("vulgarity") or []:
+        if isinstance(index, int) and start_index <= index < end_index:
+            alerts.append({"type": "vulgarity", "utterance": index, "text": new_utterances[index - start_index],
+                           "message": "Vulgarity on the call."})
+    if check_recording_message:
+        if answer.get("recording_notice"):
+            state["recording_notice"] = True
+        elif end_index >= recording_notice_within and not state.get("recording_notice_alerted"):
+            state["recording_notice_alerted"] = True
+            alerts.append({"type": "recording-notice", "utterance": end_index - 1, "text": None,
+                           "message": f"The caller has not been told the call is being recorded "
+                                      f"after {end_index} utterances."})
+    if is_relevant_to_topic and answer.get("off_topic"):
+        alerts.append({"type": "off-topic", "utterance": start_index, "text": None,
+                       "message": f"Utterances {start_index}-{end_index - 1} are not about hotels and resorts."})
+    return alerts
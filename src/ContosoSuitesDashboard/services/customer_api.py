@@ -0,0 +1,179 @@
+"""HTTP transport for the ContosoSuitesWebAPI `/Customer` endpoint.
+
+CustomerApiClient keeps one pooled `requests.Session` per API base URL, with
+connect/read timeouts and bounded retries for transient failures. Responses are
+streamed, and each page is parsed into a DataFrame straight from the raw response
+stream rather than from a fully buffered copy of the body. Large result sets are
+fetched in pages with the API's optional `skip`/`take` parameters, so no single
+response has to hold all of them. AsyncCustomerApiClient offers the same lookups on
+httpx for asyncio callers; pandas parses synchronously, so it collects each page's
+body chunk by chunk into one buffer and parses that.
+"""
+import asyncio
+import io
+import threading
+
+import pandas as pd
+
+from services.metrics import get_metrics
+
+CUSTOMER_COLUMNS = ["FirstName", "LastName", "FullName", "LoyaltyTier", "YearsAsMember", "DateOfMostRecentStay", "AverageRating"]
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def read_customers(source):
+    # Parse a JSON array of customers from bytes or a binary stream (such as a raw
+    # HTTP response) without decoding it to a str first.
+    stream = io.BufferedReader(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    if not stream.peek(1):
+        return pd.DataFrame(columns=CUSTOMER_COLUMNS)
+    frame = pd.read_json(stream, orient="records", convert_dates=False)
+    if frame.empty and not len(frame.columns):
+        return pd.DataFrame(columns=CUSTOMER_COLUMNS)
+    return frame
+
+
+def _page_rows(frame, skip, take, max_rows, first_page):
+    # Return (rows to yield, whether another page may follow) for the response to a
+    # skip/take request. An older API without paging ignores skip and take and
+    # returns every match each time. That shows up as more than `take` rows, or as a
+    # later "page" identical to the first one.
+    if len(frame) > take:
+        return frame.iloc[skip:max_rows], False
+    if skip and first_page is not None and frame.equals(first_page):
+        return frame.iloc[:0], False
+    return frame, len(frame) == take
+
+
+class CustomerApiClient:
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.2,
+                 pool_maxsize=10, page_size=500):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.page_size = page_size
+        # requests and httpx are imported on first use; see services/startup.py.
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+    def _get_page(self, params):
+        with get_metrics().span("customer_api_page"):
+            with self.session.get(f"{self.base_url}/Customer/", params=params, timeout=self.timeout, stream=True) as r:
+                r.raise_for_status()
+                # Undo any Content-Encoding while pandas reads from the socket, and keep
+                # the stream open to the buffered reader until the body has been parsed.
+                r.raw.decode_content = True
+                r.raw.auto_close = False
+                return read_customers(r.raw)
+
+    def iter_customer_pages(self, search_criterion, search_value, page_size=None, max_rows=None):
+        # Yield DataFrames of at most page_size customers until the results (or max_rows) run out.
+        page_size = page_size or self.page_size
+        skip, first_page = 0, None
+        while max_rows is None or skip < max_rows:
+            take = page_size if max_rows is None else min(page_size, max_rows - skip)
+            frame = self._get_page({"searchCriterion": search_criterion, "searchValue": search_value, "skip": skip, "take": take})
+            rows, more = _page_rows(frame, skip, take, max_rows, first_page)
+            if len(rows):
+                yield rows
+            if not more:
+                return
+            if first_page is None:
+                first_page = frame
+            skip += take
+
+    def get_customers(self, search_criterion, search_value, max_rows=None):
+        # Return matching customers as one DataFrame (at most max_rows rows).
+        with get_metrics().span("customer_api_request", criterion=search_criterion):
+            pages = list(self.iter_customer_pages(search_criterion, search_value, max_rows=max_rows))
+        if not pages:
+            return pd.DataFrame(columns=CUSTOMER_COLUMNS)
+        return pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncCustomerApiClient:
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.2,
+                 max_connections=10, page_size=500):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.page_size = page_size
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Accept": "application/json"},
+        )
+
+    async def _get_page(self, params):
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.client.stream("GET", f"{self.base_url}/Customer/", params=params) as r:
+                    if r.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                        r.raise_for_status()
+                        body = io.BytesIO()
+                        async for chunk in r.aiter_bytes():
+                            body.write(chunk)
+                        body.seek(0)
+                        return read_customers(body)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def iter_customer_pages(self, search_criterion, search_value, page_size=None, max_rows=None):
+        page_size = page_size or self.page_size
+        skip, first_page = 0, None
+        while max_rows is None or skip < max_rows:
+            take = page_size if max_rows is None else min(page_size, max_rows - skip)
+            frame = await self._get_page({"searchCriterion": search_criterion, "searchValue": search_value, "skip": skip, "take": take})
+            rows, more = _page_rows(frame, skip, take, max_rows, first_page)
+            if len(rows):
+                yield rows
+            if not more:
+                return
+            if first_page is None:
+                first_page = frame
+            skip += take
+
+    async def get_customers(self, search_criterion, search_value, max_rows=None):
+        pages = [page async for page in self.iter_customer_pages(search_criterion, search_value, max_rows=max_rows)]
+        if not pages:
+            return pd.DataFrame(columns=CUSTOMER_COLUMNS)
+        return pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def get_customer_api_client(base_url, **settings):
+    # Return the process-wide client for base_url, creating it with settings on first use.
+    with _lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = CustomerApiClient(base_url, **settings)
+            _clients[base_url] = client
+    return client
@@ -0,0 +1,218 @@
+"""Materialized customer aggregates for the `customer_stats` tool.
+
+Aggregate questions ("average rating by loyalty tier", "members for 20+ years who
+have not stayed since June") are answered from compact views instead of sending
+customer rows to the model.
+
+One view is materialized at the finest grain: a cube with one cell per
+(LoyaltyTier, YearsAsMember, DateOfMostRecentStay) combination. Each cell holds
+the number of customers, the sum of their AverageRating, and a histogram of their
+ratings in 0.1 steps. All three are additive, so:
+
+- a customer added to, removed from or changed in the CustomerStore adjusts one or
+  two cells (see CustomerStore.add_listener) instead of triggering a rescan;
+- every other grouping (by tier, by years band, by stay month or year, or any
+  combination, with filters on any field) is a roll-up of the cube's cells with
+  vectorized NumPy. The number of cells is bounded by the distinct field values,
+  not by the number of customers.
+
+Counts, means and the minimum, median (the lower middle value) and maximum rating,
+to 0.1, are exact.
+"""
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from services.customer_store import get_customer_store, parse_date
+
+DIMENSIONS = ["LoyaltyTier", "YearsAsMember", "StayYear", "StayMonth"]
+TIER_ORDER = ["bronze", "silver", "gold", "platinum"]
+RATING_BINS = 51  # 0.0 to 5.0 in steps of 0.1
+EPOCH = date(1970, 1, 1)
+
+_lock = threading.Lock()
+_views = {}
+
+
+def _days(value):
+    # Days since 1970-01-01, so the values can be viewed as datetime64[D].
+    return (parse_date(value) - EPOCH).days
+
+
+def _rating_bin(rating):
+    return min(max(int(round(float(rating) * 10)), 0), RATING_BINS - 1)
+
+
+class CustomerStatsViews:
+    def __init__(self, capacity=256):
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._tier_codes = {}
+        self._tier_names = []
+        self._size = 0
+        self._tier = np.zeros(capacity, dtype=np.int32)
+        self._years = np.zeros(capacity, dtype=np.int32)
+        self._stay = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._rating_sum = np.zeros(capacity, dtype=np.float64)
+        self._histogram = np.zeros((capacity, RATING_BINS), dtype=np.int32)
+        self.version = 0
+
+    def __len__(self):
+        # Number of customers in the views.
+        with self._lock:
+            return int(self._count[:self._size].sum())
+
+    @property
+    def cells(self):
+        return self._size
+
+    def _grow(self):
+        capacity = 2 * len(self._count)
+        for name in ("_tier", "_years", "_stay", "_count", "_rating_sum", "_histogram"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _cell(self, customer):
+        tier = str(customer["LoyaltyTier"])
+        code = self._tier_codes.get(tier.lower())
+        if code is None:
+            code = self._tier_codes[tier.lower()] = len(self._tier_names)
+            self._tier_names.append(tier)
+        stay = customer.get("_stay") or customer["DateOfMostRecentStay"]
+        key = (code, int(customer["YearsAsMember"]), _days(stay))
+        row = self._cells.get(key)
+        if row is None:
+            if self._size == len(self._count):
+                self._grow()
+            row = self._cells[key] = self._size
+            self._size += 1
+            self._tier[row], self._years[row], self._stay[row] = key
+        return row
+
+    def _apply(self, customer, sign):
+        row = self._cell(customer)
+        self._count[row] += sign
+        rating = customer.get("AverageRating")
+        if rating is not None and not pd.isna(rating):
+            self._rating_sum[row] += sign * float(rating)
+            self._histogram[row, _rating_bin(rating)] += sign
+
+    def apply(self, old, new):
+        # CustomerStore listener: move a customer's contribution from old to new.
+        with self._lock:
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+            self.version += 1
+
+    def query(self, group_by=(), loyalty_tier=None, min_years=None, max_years=None, stayed_after=None,
+              stayed_before=None, years_band=5):
+        # Roll the cube up to one row per group. Stay filters are exclusive: stayed_after
+        # keeps customers whose most recent stay is after that date, stayed_before those
+        # whose most recent stay is before it. YearsAsMember is grouped in bands of
+        # years_band years.
+        unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)}. Valid dimensions are {', '.join(DIMENSIONS)}.")
+        after = _days(stayed_after) if stayed_after is not None else None
+        before = _days(stayed_before) if stayed_before is not None else None
+        with self._lock:
+            size = self._size
+            tier, years, stay, count = self._tier[:size], self._years[:size], self._stay[:size], self._count[:size]
+            mask = count > 0
+            if loyalty_tier:
+                mask &= tier == self._tier_codes.get(loyalty_tier.strip().lower(), -1)
+            if min_years is not None:
+                mask &= years >= min_years
+            if max_years is not None:
+                mask &= years <= max_years
+            if after is not None:
+                mask &= stay > after
+            if before is not None:
+                mask &= stay < before
+            # Fancy indexing copies, so only the selected cells leave the lock.
+            rows = np.flatnonzero(mask)
+            tier, years, stay, count = tier[rows], years[rows], stay[rows], count[rows]
+            rating_sum, histogram = self._rating_sum[rows], self._histogram[rows]
+            tier_names = list(self._tier_names)
+
+        stay_dates = stay.astype("datetime64[D]")
+        keys = {
+            "LoyaltyTier": tier,
+            "YearsAsMember": years // years_band * years_band,
+            "StayYear": stay_dates.astype("datetime64[Y]").astype(np.int64),
+            "StayMonth": stay_dates.astype("datetime64[M]").astype(np.int64),
+        }
+        cells = pd.DataFrame({dimension: keys[dimension] for dimension in group_by})
+        cells["count"], cells["rating_sum"], cells["stay"] = count, rating_sum, stay
+        if group_by:
+            grouped = cells.groupby(list(group_by), sort=True)
+            inverse = grouped.ngroup().to_numpy()
+        else:
+            grouped = cells.groupby(np.zeros(len(cells), dtype=np.int8))
+            inverse = np.zeros(len(cells), dtype=np.intp)
+        totals = grouped.agg(customers=("count", "sum"), rating_sum=("rating_sum", "sum"),
+                             earliest=("stay", "min"), latest=("stay", "max"))
+        groups = totals.index.to_frame(index=False) if group_by else pd.DataFrame(index=range(len(totals)))
+        group_count = len(totals)
+        customers = totals["customers"].to_numpy(dtype=np.int64)
+        sums = totals["rating_sum"].to_numpy()
+        earliest, latest = totals["earliest"].to_numpy(dtype=np.int64), totals["latest"].to_numpy(dtype=np.int64)
+        # Sum the cells' rating histograms per group as one sparse (groups x cells) product.
+        from scipy.sparse import csr_matrix
+
+        membership = csr_matrix((np.ones(len(inverse), dtype=histogram.dtype), (inverse, np.arange(len(inverse)))),
+                                shape=(group_count, len(inverse)))
+        group_histogram = np.asarray(membership @ histogram)
+
+        rated = group_histogram.sum(axis=1)
+        present = group_histogram > 0
+        cumulative = group_histogram.cumsum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.where(rated > 0, sums / rated, np.nan)
+        minimum = np.where(rated > 0, present.argmax(axis=1) / 10, np.nan)
+        maximum = np.where(rated > 0, (RATING_BINS - 1 - present[:, ::-1].argmax(axis=1)) / 10, np.nan)
+        median = np.where(rated > 0, (cumulative >= ((rated + 1) // 2)[:, None]).argmax(axis=1) / 10, np.nan)
+
+        result = pd.DataFrame(index=range(group_count))
+        for dimension in group_by:
+            values = groups[dimension].to_numpy()
+            if dimension == "LoyaltyTier":
+                result[dimension] = [tier_names[code] for code in values]
+            elif dimension == "YearsAsMember":
+                result[dimension] = [f"{v}-{v + years_band - 1}" if years_band > 1 else int(v) for v in values]
+            elif dimension == "StayYear":
+                result[dimension] = values.astype("datetime64[Y]").astype(str)
+            else:
+                result[dimension] = values.astype("datetime64[M]").astype(str)
+        result["Customers"] = customers
+        result["AverageRating"] = np.round(average, 2)
+        result["MinRating"] = minimum
+        result["MedianRating"] = median
+        result["MaxRating"] = maximum
+        result["EarliestStay"] = earliest.astype("datetime64[D]").astype(str) if group_count else []
+        result["LatestStay"] = latest.astype("datetime64[D]").astype(str) if group_count else []
+        if "LoyaltyTier" in group_by:
+            # Tiers in loyalty order rather than the order they were first seen.
+            rank = {name: i for i, name in enumerate(TIER_ORDER)}
+            order = result["LoyaltyTier"].map(lambda name: rank.get(name.lower(), len(rank)))
+            result = result.iloc[np.lexsort([order.to_numpy()])].reset_index(drop=True)
+        return result
+
+
+def get_customer_stats(path):
+    # Return the process-wide views over the customer store for path. They are built
+    # once from the store and then kept current by its change notifications.
+    with _lock:
+        views = _views.get(path)
+        if views is None:
+            views = CustomerStatsViews()
+            get_customer_store(path).add_listener(views.apply)
+            _views[path] = views
+    return views
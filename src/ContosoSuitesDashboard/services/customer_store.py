@@ -0,0 +1,230 @@
+"""In-process, indexed customer store.
+
+An alternative backend for the `get_customers` tool that answers the same three
+queries as the ContosoSuitesWebAPI `/Customer` endpoint without a network hop:
+
+- CustomerName: hash index on the lower-cased FullName, plus a sorted list of
+  names for prefix lookups.
+- LoyaltyTier: inverted index from tier to customer ids.
+- DateOfMostRecentStay: sorted (date, id) index for "stayed after" and range queries.
+
+The store is loaded from `src/data/Customers.json` (or a pickled snapshot of a
+previously built store) and can be updated in place with add/update/remove.
+Listeners registered with add_listener are told about every change, which keeps
+derived views such as services/customer_stats.py up to date without rescans.
+"""
+import bisect
+import json
+import pickle
+import threading
+from datetime import date, datetime
+
+SEARCH_CRITERIA = ["CustomerName", "LoyaltyTier", "DateOfMostRecentStay"]
+LOYALTY_TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+
+_lock = threading.Lock()
+_stores = {}
+
+
+def parse_date(value):
+    # Accept dates, datetimes and ISO-8601 strings (with or without a time part).
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        # Fall back to pandas for free-form dates such as "June 1, 2023".
+        import pandas as pd
+        return pd.to_datetime(value).date()
+
+
+class CustomerStore:
+    def __init__(self, customers=()):
+        self._customers = {}
+        self._next_id = 0
+        self._by_name = {}
+        self._names = []
+        self._by_tier = {}
+        self._by_stay = []
+        self._listeners = []
+        self._lock = threading.RLock()
+        for customer in customers:
+            self.add(customer)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_snapshot(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def save_snapshot(self, path):
+        with self._lock, open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lock", None)
+        state.pop("_listeners", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._customers)
+
+    def add_listener(self, listener):
+        # listener(old, new) is called under the store lock after every change, with
+        # None for old on add and for new on remove. It is called once per existing
+        # customer (as an add) when it is registered.
+        with self._lock:
+            self._listeners.append(listener)
+            for record in self._customers.values():
+                listener(None, record)
+
+    def _notify(self, old, new):
+        for listener in self._listeners:
+            listener(old, new)
+
+    def _index(self, customer_id, customer):
+        name = customer["FullName"].lower()
+        self._by_name.setdefault(name, []).append(customer_id)
+        if len(self._by_name[name]) == 1:
+            bisect.insort(self._names, name)
+        self._by_tier.setdefault(customer["LoyaltyTier"].lower(), set()).add(customer_id)
+        bisect.insort(self._by_stay, (customer["_stay"], customer_id))
+
+    def _unindex(self, customer_id, customer):
+        name = customer["FullName"].lower()
+        ids = self._by_name[name]
+        ids.remove(customer_id)
+        if not ids:
+            del self._by_name[name]
+            del self._names[bisect.bisect_left(self._names, name)]
+        self._by_tier[customer["LoyaltyTier"].lower()].discard(customer_id)
+        del self._by_stay[bisect.bisect_left(self._by_stay, (customer["_stay"], customer_id))]
+
+    def add(self, customer):
+        # Add a customer record and return its id.
+        record = dict(customer)
+        record["_stay"] = parse_date(record["DateOfMostRecentStay"])
+        with self._lock:
+            customer_id = self._next_id
+            self._next_id += 1
+            self._customers[customer_id] = record
+            self._index(customer_id, record)
+            self._notify(None, record)
+        return customer_id
+
+    def update(self, customer_id, changes):
+        # Apply a partial update to an existing customer and reindex it.
+        with self._lock:
+            record = self._customers[customer_id]
+            old = dict(record)
+            self._unindex(customer_id, record)
+            record.update(changes)
+            record["_stay"] = parse_date(record["DateOfMostRecentStay"])
+            self._index(customer_id, record)
+            self._notify(old, record)
+
+    def remove(self, customer_id):
+        with self._lock:
+            record = self._customers.pop(customer_id)
+            self._unindex(customer_id, record)
+            self._notify(record, None)
+
+    def _records(self, ids):
+        return [{k: v for k, v in self._customers[i].items() if k != "_stay"} for i in sorted(ids)]
+
+    def ids_by_name(self, name, case_sensitive=False):
+        ids = self._by_name.get(name.strip().lower(), [])
+        if case_sensitive:
+            ids = [i for i in ids if self._customers[i]["FullName"] == name]
+        return ids
+
+    def ids_by_name_prefix(self, prefix, limit=None):
+        prefix = prefix.strip().lower()
+        ids = []
+        position = bisect.bisect_left(self._names, prefix)
+        while position < len(self._names) and self._names[position].startswith(prefix):
+            ids.extend(self._by_name[self._names[position]])
+            if limit is not None and len(ids) >= limit:
+                return ids[:limit]
+            position += 1
+        return ids
+
+    def ids_by_tier(self, tier, case_sensitive=False):
+        # By default tiers are matched case-insensitively ("gold" finds "Gold").
+        ids = list(self._by_tier.get(tier.strip().lower(), ()))
+        if case_sensitive:
+            ids = [i for i in ids if self._customers[i]["LoyaltyTier"] == tier]
+        return ids
+
+    def ids_by_stay(self, start=None, end=None, include_start=False, include_end=True):
+        # Customers whose most recent stay falls between start and end. By default
+        # start is exclusive, matching the Web API's "stays after date" query.
+        lo, hi = 0, len(self._by_stay)
+        if start is not None:
+            start = parse_date(start)
+            if include_start:
+                lo = bisect.bisect_left(self._by_stay, (start,))
+            else:
+                lo = bisect.bisect_right(self._by_stay, (start, float("inf")))
+        if end is not None:
+            end = parse_date(end)
+            if include_end:
+                hi = bisect.bisect_right(self._by_stay, (end, float("inf")))
+            else:
+                hi = bisect.bisect_left(self._by_stay, (end,))
+        return [customer_id for _, customer_id in self._by_stay[lo:hi]]
+
+    def find_by_name(self, name, case_sensitive=False):
+        with self._lock:
+            return self._records(self.ids_by_name(name, case_sensitive))
+
+    def find_by_name_prefix(self, prefix, limit=None):
+        with self._lock:
+            return self._records(self.ids_by_name_prefix(prefix, limit))
+
+    def find_by_loyalty_tier(self, tier, case_sensitive=False):
+        with self._lock:
+            return self._records(self.ids_by_tier(tier, case_sensitive))
+
+    def find_with_stays_between(self, start=None, end=None):
+        with self._lock:
+            return self._records(self.ids_by_stay(start, end))
+
+    def search(self, search_criterion, search_value):
+        # Same semantics as the Web API's /Customer endpoint, so either backend gives
+        # the same answer: names and tiers must match exactly (case-sensitively), an
+        # unknown tier is an error, and dates select stays strictly after the date.
+        # The case-insensitive and prefix lookups above are available separately.
+        if search_criterion == "CustomerName":
+            return self.find_by_name(search_value, case_sensitive=True)
+        elif search_criterion == "LoyaltyTier":
+            if search_value not in LOYALTY_TIERS:
+                raise ValueError(f"Invalid loyalty tier. Valid tiers include {', '.join(LOYALTY_TIERS)}.")
+            return self.find_by_loyalty_tier(search_value, case_sensitive=True)
+        elif search_criterion == "DateOfMostRecentStay":
+            return self.find_with_stays_between(start=search_value)
+        raise ValueError(f"Invalid search criterion. Valid search criteria include {', '.join(SEARCH_CRITERIA)}.")
+
+
+def get_customer_store(path):
+    # Return the process-wide store for path, loading it on first use. Paths
+    # ending in .pkl are treated as snapshots, anything else as Customers.json.
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            store = CustomerStore.from_snapshot(path) if path.endswith(".pkl") else CustomerStore.from_json(path)
+            _stores[path] = store
+    return store
@@ -0,0 +1,112 @@
+"""Token-budgeted conversation window for the chat pages.
+
+`st.session_state.messages` keeps the full chat log for display, but only a window
+of it is sent to Azure OpenAI: the newest messages that fit in `token_budget`,
+preceded by a running summary of older turns. Token counts are cached on each
+message dict, and summaries are produced on a background thread so the chat turn
+never waits on them.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history")
+_encoding = None
+
+
+def count_tokens(text):
+    # Use tiktoken when it is installed, otherwise estimate ~4 characters per token.
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text or ""))
+    return (len(text or "") + 3) // 4
+
+
+def message_tokens(message):
+    # Count a message once and remember the result on the message itself.
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        message["tokens"] = tokens
+    return tokens
+
+
+class ConversationWindow:
+    def __init__(self, token_budget=3000, summarize_fn=None, summarize_after_tokens=1500):
+        # summarize_fn(previous_summary, messages) returns a new summary string.
+        # Without it, messages that fall out of the window are simply dropped.
+        self.token_budget = token_budget
+        self.summarize_fn = summarize_fn
+        self.summarize_after_tokens = summarize_after_tokens
+        self.summary = ""
+        self.summarized_upto = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def _summary_message(self):
+        return {"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}
+
+    def _summarize(self, previous_summary, messages, upto):
+        try:
+            summary = self.summarize_fn(previous_summary, messages)
+        except Exception as e:
+            print(f"Conversation summary failed: {e}")
+            summary = None
+        with self._lock:
+            if summary:
+                self.summary = summary
+                self.summarized_upto = upto
+            self._pending = None
+
+    def _maybe_summarize(self, messages, window_start):
+        # Summarize everything before the window once enough unsummarized tokens pile up.
+        if self.summarize_fn is None:
+            return
+        with self._lock:
+            if self._pending is not None or window_start <= self.summarized_upto:
+                return
+            unsummarized = [m for m in messages[self.summarized_upto:window_start] if m.get("context", True) is not False]
+            if sum(message_tokens(m) for m in unsummarized) < self.summarize_after_tokens:
+                return
+            self._pending = _executor.submit(
+                self._summarize,
+                self.summary,
+                [{"role": m["role"], "content": m["content"]} for m in unsummarized],
+                window_start,
+            )
+
+    def context(self, messages):
+        # Return the messages to send to the model, newest last, within the token budget.
+        # Messages flagged with "context": False (e.g. UI placeholders) are never sent.
+        with self._lock:
+            summary_message = self._summary_message() if self.summary else None
+            summarized_upto = self.summarized_upto
+        budget = self.token_budget - (message_tokens(summary_message) if summary_message else 0)
+
+        window = []
+        window_start = len(messages)
+        for index in range(len(messages) - 1, summarized_upto - 1, -1):
+            message = messages[index]
+            if message.get("context", True) is False:
+                window_start = index
+                continue
+            tokens = message_tokens(message)
+            # Always keep the newest message, even if it alone exceeds the budget.
+            if window and tokens > budget:
+                break
+            budget -= tokens
+            window.append({"role": message["role"], "content": message["content"]})
+            window_start = index
+        window.reverse()
+
+        self._maybe_summarize(messages, window_start)
+        return [summary_message] + window if summary_message else window
@@ -0,0 +1,152 @@
+"""Columnar facet index over the hotels, joined with their resorts.
+
+Backs the `search_hotels` tool, which answers questions such as "which Aruba
+resorts have EV charging, covered parking and at least 2 meeting rooms" exactly,
+instead of leaving them to search grounding.
+
+Hotels.txt is joined with Resorts.txt on the resort name, and each attribute is
+stored by column:
+
+- Boolean attributes (hotel features, resort flags, and one per resort amenity)
+  are bitmaps: bit-packed NumPy arrays with one bit per hotel.
+- Categorical values (nation, city, resort and hotel name) are dictionary-encoded
+  into one integer code per hotel, so an equality predicate is a single vectorized
+  comparison, however many distinct values the column has.
+- Numeric attributes are arrays sorted once at build time, together with the order
+  that sorts them. A range predicate is two binary searches that give the matching
+  hotels as a bitmap.
+
+A query ANDs the bitmaps of all of its predicates with vectorized bitwise
+operations, and only the final bitmap is unpacked into row numbers.
+"""
+import json
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def column_name(key):
+    # "EV charging available" -> "ev_charging_available"
+    return re.sub(r"[^a-z0-9]+", "_", key.lower()).strip("_")
+
+
+class HotelFacetIndex:
+    def __init__(self, hotels, resorts):
+        hotel_frame = pd.DataFrame(hotels)
+        resort_frame = pd.DataFrame(resorts)
+        hotel_frame.columns = [column_name(key) for key in hotel_frame.columns]
+        resort_frame.columns = [column_name(key) for key in resort_frame.columns]
+        resort_frame = resort_frame.drop_duplicates("resort_name")
+        self.frame = hotel_frame.merge(resort_frame, on="resort_name", how="left", suffixes=("", "_resort"))
+        # A hotel whose resort is missing would turn the resort's flags into object
+        # columns, dropping them from the index; treat its flags as not set instead.
+        for column in resort_frame.columns:
+            if pd.api.types.is_bool_dtype(resort_frame[column]) and column in self.frame:
+                self.frame[column] = self.frame[column].eq(True)
+        if "amenities" not in self.frame:
+            self.frame["amenities"] = None
+        self.frame["amenities"] = self.frame["amenities"].map(lambda values: values if isinstance(values, list) else [])
+        self.size = len(self.frame)
+
+        self.features = {}
+        self.numeric = {}
+        self.categories = {}
+        for column in self.frame.columns:
+            values = self.frame[column]
+            if column == "amenities":
+                continue
+            if pd.api.types.is_bool_dtype(values):
+                self.features[column] = self._pack(values.to_numpy(dtype=bool))
+            elif pd.api.types.is_numeric_dtype(values):
+                array = values.to_numpy(dtype=np.float64)
+                order = np.argsort(array, kind="stable")
+                self.numeric[column] = (array[order], order)
+            elif column in ("nation", "city", "resort_name", "hotel_name"):
+                codes, uniques = pd.factorize(values.fillna("").astype(str).str.lower())
+                self.categories[column] = (codes, {value: code for code, value in enumerate(uniques)})
+
+        # Amenities belong to resorts; each one becomes a bitmap over the hotels.
+        exploded = self.frame["amenities"].explode().dropna()
+        names = {amenity.lower(): amenity for amenity in exploded.unique()}
+        self.amenities = {}
+        for key, rows in exploded.groupby(exploded.str.lower()).groups.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[np.asarray(rows)] = True
+            self.amenities[key] = (names[key], self._pack(mask))
+
+    def __len__(self):
+        return self.size
+
+    def _pack(self, mask):
+        return np.packbits(mask)
+
+    def category_bitmap(self, column, value):
+        # Rows whose column equals value (case-insensitive), from the dictionary codes.
+        codes, lookup = self.categories[column]
+        code = lookup.get(value.lower())
+        if code is None:
+            return self._none()
+        return self._pack(codes == code)
+
+    @property
+    def amenity_names(self):
+        return sorted(name for name, _ in self.amenities.values())
+
+    def _all(self):
+        return self._pack(np.ones(self.size, dtype=bool))
+
+    def _none(self):
+        return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def range_bitmap(self, column, minimum=None, maximum=None):
+        # Rows with minimum <= value <= maximum, from the sorted column.
+        values, order = self.numeric[column]
+        lo = 0 if minimum is None else np.searchsorted(values, minimum, side="left")
+        hi = len(values) if maximum is None else np.searchsorted(values, maximum, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[lo:hi]] = True
+        return self._pack(mask)
+
+    def filter(self, features=(), amenities=(), categories=None, ranges=None):
+        # Row numbers matching every predicate. categories maps a categorical column to
+        # a value (case-insensitive); ranges maps a numeric column to (minimum, maximum),
+        # either of which may be None.
+        bitmap = self._all()
+        for feature in features:
+            bitmap &= self.features.get(feature, self._none())
+        for amenity in amenities:
+            bitmap &= self.amenities.get(amenity.lower(), (None, self._none()))[1]
+        for column, value in (categories or {}).items():
+            bitmap &= self.category_bitmap(column, value)
+        for column, (minimum, maximum) in (ranges or {}).items():
+            bitmap &= self.range_bitmap(column, minimum, maximum)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+    def search(self, features=(), amenities=(), categories=None, ranges=None, limit=None):
+        # Matching hotels as a DataFrame, with amenities joined into one string.
+        rows = self.filter(features, amenities, categories, ranges)
+        if limit is not None:
+            rows = rows[:limit]
+        result = self.frame.iloc[rows].copy()
+        result["amenities"] = result["amenities"].map(", ".join)
+        return result.reset_index(drop=True)
+
+
+def get_hotel_index(hotels_path, resorts_path):
+    # Return the process-wide index for these data files, building it on first use.
+    key = (hotels_path, resorts_path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            with open(hotels_path) as f:
+                hotels = json.load(f)
+            with open(resorts_path) as f:
+                resorts = json.load(f)
+            index = HotelFacetIndex(hotels, resorts)
+            _indexes[key] = index
+    return index
@@ -0,0 +1,139 @@
+"""Incremental parsing of a streamed JSON object, one top-level field at a time.
+
+With JSON response mode the model's reply is a single JSON object, but json.loads
+can only parse it after the last token has arrived. JsonFieldParser is fed the
+streamed text deltas and reports each top-level field as soon as its value is
+complete, so the page can show the first field (the call title, say) while the
+rest of the reply is still being generated.
+
+Each character is looked at once. The parser tracks only where it is in the
+top-level object, the nesting depth inside a value, and whether it is inside a
+string. Every finished key and value is handed to json.loads, so values of any
+type (strings, numbers, nested objects and arrays) come out exactly as json.loads
+would return them. Text before the opening brace (such as a code fence) and after
+the closing brace is ignored.
+"""
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class JsonFieldParser:
+    def __init__(self):
+        self.fields = {}
+        self._state = "start"
+        self._token = []
+        self._key = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self):
+        return self._state == "done"
+
+    def _emit(self, completed):
+        value = json.loads("".join(self._token))
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._token = []
+        self._state = "after_value"
+
+    def _string_char(self, char):
+        # Returns True when char closes the string.
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            return True
+        return False
+
+    def feed(self, delta):
+        # Consume a chunk of text and return the (key, value) fields it completed.
+        completed = []
+        for char in delta:
+            state = self._state
+            if state == "start":
+                if char == "{":
+                    self._state = "key"
+            elif state == "key":
+                if char == '"':
+                    self._token = ['"']
+                    self._state = "in_key"
+                elif char == "}":
+                    self._state = "done"
+                elif char not in _WHITESPACE and char != ",":
+                    raise ValueError(f"Expected a field name in the JSON object, got {char!r}.")
+            elif state == "in_key":
+                self._token.append(char)
+                if self._string_char(char):
+                    self._key = json.loads("".join(self._token))
+                    self._token = []
+                    self._state = "colon"
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value_start"
+                elif char not in _WHITESPACE:
+                    raise ValueError(f"Expected ':' after {self._key!r} in the JSON object, got {char!r}.")
+            elif state == "value_start":
+                if char in _WHITESPACE:
+                    continue
+                self._token = [char]
+                if char == '"':
+                    self._state = "string"
+                elif char in "{[":
+                    self._depth = 1
+                    self._state = "nested"
+                else:
+                    self._state = "scalar"
+            elif state == "string":
+                self._token.append(char)
+                if self._string_char(char):
+                    self._emit(completed)
+            elif state == "nested":
+                self._token.append(char)
+                if self._in_string:
+                    self._in_string = not self._string_char(char)
+                elif char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._emit(completed)
+            elif state == "scalar":
+                if char in _WHITESPACE or char in ",}":
+                    self._emit(completed)
+                    if char == "}":
+                        self._state = "done"
+                    elif char == ",":
+                        self._state = "key"
+                else:
+                    self._token.append(char)
+            elif state == "after_value":
+                if char == ",":
+                    self._state = "key"
+                elif char == "}":
+                    self._state = "done"
+                elif char not in _WHITESPACE:
+                    raise ValueError(f"Expected ',' or '}}' after {self._key!r} in the JSON object, got {char!r}.")
+        return completed
+
+    def close(self):
+        # Call once the stream has ended. Returns all fields, or raises ValueError if
+        # the object was cut off.
+        if self._state != "done":
+            raise ValueError("The JSON object ended before it was complete.")
+        return self.fields
+
+
+def json_fields(deltas):
+    # Yield (key, value) for each top-level field of the JSON object streamed as text
+    # deltas, as soon as the field is complete.
+    parser = JsonFieldParser()
+    for delta in deltas:
+        if delta:
+            yield from parser.feed(delta)
+    parser.close()
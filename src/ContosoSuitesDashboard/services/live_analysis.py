@@ -0,0 +1,144 @@
+"""Incremental analysis of a call while it is still being transcribed.
+
+Re-checking the whole transcript after every phrase makes each check cost more the
+longer the call runs. LiveCallMonitor keeps an append-only TranscriptBuffer and a
+cursor into it. A background thread hands each batch of newly finalized utterances,
+together with a bounded window of the utterances before them, to `analyze_fn`.
+Batches are debounced: analysis waits until the speaker pauses for
+`debounce_seconds`, or until `max_wait_seconds` have passed since the first
+unanalyzed utterance, or until `max_batch` utterances are waiting. The work per
+utterance is therefore bounded by `context_utterances + max_batch`, however long the
+call gets.
+
+`analyze_fn(context, new_utterances, start_index, state)` returns a list of alert
+dicts. `state` is a dict that persists across batches for call-level facts, such as
+whether the recording notice has been given. Alerts are collected on the monitor
+and can be read incrementally with `alerts_since(cursor)`.
+"""
+import threading
+import time
+
+
+class TranscriptBuffer:
+    """Append-only list of utterances; readers keep their own cursor into it."""
+
+    def __init__(self):
+        self.items = []
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    def append(self, text):
+        with self._condition:
+            self.items.append(text)
+            self._condition.notify_all()
+
+    def since(self, cursor):
+        # Return (new items, new cursor). Slicing a list that only grows is safe.
+        end = len(self.items)
+        return self.items[cursor:end], end
+
+    def wait(self, cursor, timeout):
+        # Block until there are items past cursor, or timeout. Returns True if there are.
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.items) > cursor, timeout)
+
+
+class LiveCallMonitor:
+    def __init__(self, analyze_fn, context_utterances=6, max_batch=8, debounce_seconds=5.0, max_wait_seconds=15.0,
+                 clock=time.monotonic):
+        self.analyze_fn = analyze_fn
+        self.context_utterances = context_utterances
+        self.max_batch = max_batch
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.clock = clock
+        self.transcript = TranscriptBuffer()
+        self.alerts = []
+        self.state = {}
+        self.analyzed = 0
+        self.analyses = 0
+        self.errors = []
+        self._last_added = None
+        self._first_pending = None
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-call-monitor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def add(self, text):
+        # Add a finalized utterance; connect this to the transcriber's transcribed event.
+        if not text:
+            return
+        # Under the buffer's lock, so the monitor thread never sees the utterance
+        # without its timestamps or clears _first_pending while it is being added.
+        with self.transcript._condition:
+            now = self.clock()
+            self._last_added = now
+            if self._first_pending is None:
+                self._first_pending = now
+            self.transcript.append(text)
+
+    def handle_transcribed(self, evt):
+        self.add(evt.result.text)
+
+    def stop(self, wait=True):
+        # Analyze whatever is still pending, then stop the background thread.
+        self._stopping.set()
+        with self.transcript._condition:
+            self.transcript._condition.notify_all()
+        if wait and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def alerts_since(self, cursor):
+        end = len(self.alerts)
+        return self.alerts[cursor:end], end
+
+    def _ready(self):
+        pending = len(self.transcript) - self.analyzed
+        if pending <= 0:
+            return False
+        if self._stopping.is_set() or pending >= self.max_batch:
+            return True
+        with self.transcript._condition:
+            last_added, first_pending = self._last_added, self._first_pending
+        now = self.clock()
+        # None means nothing is known to be waiting on that timer.
+        return ((last_added is not None and now - last_added >= self.debounce_seconds)
+                or (first_pending is not None and now - first_pending >= self.max_wait_seconds))
+
+    def _run(self):
+        while True:
+            if self._ready():
+                self._analyze_pending()
+                continue
+            if self._stopping.is_set():
+                return
+            if len(self.transcript) > self.analyzed:
+                # Something is pending but debouncing: check again shortly.
+                self._stopping.wait(min(self.debounce_seconds, 0.25))
+            else:
+                self.transcript.wait(self.analyzed, timeout=0.5)
+
+    def _analyze_pending(self):
+        with self.transcript._condition:
+            start = self.analyzed
+            items = self.transcript.items
+            end = min(len(items), start + self.max_batch)
+            context = items[max(0, start - self.context_utterances):start]
+            new_utterances = items[start:end]
+            self.analyzed = end
+            # Utterances left over (or added since) start a new wait from now.
+            self._first_pending = self.clock() if len(items) > end else None
+        try:
+            alerts = self.analyze_fn(context, new_utterances, start, self.state) or []
+        except Exception as e:
+            # A failed check should not end live monitoring; record it and move on.
+            self.errors.append(f"Live analysis of utterances {start}-{end - 1} failed: {e}")
+            return
+        finally:
+            self.analyses += 1
+        self.alerts.extend(alerts)
@@ -0,0 +1,238 @@
+"""In-process hybrid retrieval over the hotel, resort and FAQ documents.
+
+An alternative grounding source for "Chat with Data" that answers from a local index
+instead of Azure AI Search, which removes the search round trip from every turn.
+
+- Sources are JSON arrays of records (Hotels.txt, Resorts.txt), which become one
+  passage per record, or plain text/Markdown files (FAQs), which are split into
+  passages on blank lines. A directory source includes every such file in it; the
+  default sources include data/faq, where the FAQ documents behind the Azure AI
+  Search index can be exported.
+- Two indexes are built over the same vocabulary: BM25 term weights and
+  l2-normalized, sublinear TF-IDF vectors (scikit-learn's TfidfVectorizer). Both
+  are sparse document-term matrices stored column-major, so each column is the
+  posting list of one term. A query only reads the columns of its own terms, which
+  keeps retrieval in the low milliseconds as the corpus grows.
+- The two rankings are merged with reciprocal rank fusion.
+- The built index is pickled next to a fingerprint of its sources (path, size,
+  mtime). It is rebuilt only when a source changes.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+INDEX_VERSION = 1
+TEXT_EXTENSIONS = (".txt", ".md", ".json")
+
+_token = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me my of on or our "
+    "the their there this to was we what when where which who will with you your".split()
+)
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def analyze(text):
+    # Lower-case word tokens without stop words, with plural "s" removed. Used both to
+    # build the vocabulary and to tokenize queries.
+    tokens = []
+    for token in _token.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class Passage:
+    title: str
+    text: str
+    source: str
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+def _record_passage(record, source):
+    title = record.get("hotel name") or record.get("resort name") or record.get("title") or os.path.basename(source)
+    fields = [f"{key[0].upper()}{key[1:]}: {_format_value(value)}." for key, value in record.items()]
+    return Passage(title=str(title), text=" ".join(fields), source=source)
+
+
+def _text_passages(text, source, max_words=200):
+    # Split on blank lines, merging short paragraphs up to max_words.
+    passages, current = [], []
+    title = os.path.splitext(os.path.basename(source))[0]
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(" ".join(current).split()) + len(paragraph.split()) > max_words:
+            passages.append(Passage(title=title, text="\n".join(current), source=source))
+            current = []
+        current.append(paragraph)
+    if current:
+        passages.append(Passage(title=title, text="\n".join(current), source=source))
+    return passages
+
+
+def _source_files(sources):
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(TEXT_EXTENSIONS):
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+
+def load_passages(sources):
+    passages = []
+    for path in _source_files(sources):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError:
+            records = None
+        if isinstance(records, list) and all(isinstance(record, dict) for record in records):
+            passages.extend(_record_passage(record, path) for record in records)
+        else:
+            passages.extend(_text_passages(text, path))
+    return passages
+
+
+def fingerprint(sources):
+    # Changes whenever a source file is added, removed, resized or modified.
+    digest = hashlib.sha256(str(INDEX_VERSION).encode())
+    for path in _source_files(sources):
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _top(scores, count):
+    # Indexes of the `count` highest positive scores, best first.
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > count:
+        candidates = candidates[np.argpartition(-scores[candidates], count - 1)[:count]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class LocalSearchIndex:
+    def __init__(self, passages, k1=1.2, b=0.75, version=None):
+        # scikit-learn is only needed to build an index, not to load or query one.
+        from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+        self.passages = list(passages)
+        self.version = version
+        texts = [f"{passage.title}. {passage.text}" for passage in self.passages]
+
+        tfidf = TfidfVectorizer(analyzer=analyze, sublinear_tf=True)
+        self.tfidf = tfidf.fit_transform(texts).tocsc()
+        self.vocabulary = tfidf.vocabulary_
+        self.idf = tfidf.idf_
+
+        counts = CountVectorizer(analyzer=analyze, vocabulary=self.vocabulary).fit_transform(texts).tocsr().astype(np.float64)
+        lengths = np.asarray(counts.sum(axis=1)).ravel()
+        average_length = lengths.mean() if len(lengths) else 0.0
+        document_frequency = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        bm25_idf = np.log(1 + (len(texts) - document_frequency + 0.5) / (document_frequency + 0.5))
+        # BM25 weight of every (document, term) pair, computed once so a query is a sum of columns.
+        row_lengths = np.repeat(lengths, np.diff(counts.indptr))
+        tf = counts.data
+        counts.data = bm25_idf[counts.indices] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * row_lengths / (average_length or 1)))
+        self.bm25 = counts.tocsc()
+
+    def __len__(self):
+        return len(self.passages)
+
+    def _query_terms(self, query):
+        counts = {}
+        for token in analyze(query):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def _bm25_scores(self, columns):
+        return np.asarray(self.bm25[:, columns].sum(axis=1)).ravel()
+
+    def _tfidf_scores(self, terms):
+        # Cosine similarity with the query's TF-IDF vector, built the way the
+        # vectorizer would build it.
+        columns = list(terms)
+        weights = (1 + np.log(np.fromiter(terms.values(), dtype=np.float64))) * self.idf[columns]
+        weights /= np.linalg.norm(weights)
+        return np.asarray(self.tfidf[:, columns] @ weights).ravel()
+
+    def search(self, query, top_k=5, candidates=50, rrf_k=60):
+        # Return up to top_k (passage, score) pairs, best first.
+        terms = self._query_terms(query)
+        if not terms:
+            return []
+        fused = {}
+        for ranking in (_top(self._bm25_scores(list(terms)), candidates), _top(self._tfidf_scores(terms), candidates)):
+            for rank, document in enumerate(ranking):
+                fused[document] = fused.get(document, 0.0) + 1.0 / (rrf_k + rank + 1)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+        return [(self.passages[document], score) for document, score in best]
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def format_passages(results):
+    # Retrieved passages as numbered sources for the system prompt.
+    return "\n\n".join(f"[doc{i}] {passage.title}\n{passage.text}" for i, (passage, _) in enumerate(results, start=1))
+
+
+def get_local_search_index(sources, index_path=None):
+    # Return the process-wide index over sources. With index_path, a persisted index
+    # is loaded if its sources are unchanged, otherwise the index is rebuilt and saved.
+    key = (tuple(sources), index_path)
+    version = fingerprint(sources)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index.version == version:
+            return index
+        index = None
+        if index_path and os.path.exists(index_path):
+            try:
+                index = LocalSearchIndex.load(index_path)
+            except Exception as e:
+                print(f"Could not load the local search index from {index_path}: {e}")
+            if index is not None and index.version != version:
+                index = None
+        if index is None:
+            index = LocalSearchIndex(load_passages(sources), version=version)
+            if index_path:
+                index.save(index_path)
+        _indexes[key] = index
+    return index
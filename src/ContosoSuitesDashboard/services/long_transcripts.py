@@ -0,0 +1,78 @@
+"""Map-reduce over call transcripts that are too long for a single request.
+
+`split_transcript` cuts a transcript (a list of utterances) into chunks of at most
+`max_tokens` tokens on utterance boundaries. Only an utterance that is too long on
+its own is split further, on word boundaries. `submit_chunks` runs a prompt over
+every chunk on a shared thread pool (the map step). The caller then merges the
+partial results with a final request (the reduce step).
+
+Each chunk's result is cached in an AnalysisCache under the chunk's text, its
+position and the prompt options. Chunking is deterministic for a given transcript
+and budget, so a re-run with different options (for example, asking one more
+compliance question) only computes the chunk results that are actually new.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from services.analysis_cache import content_key
+from services.history import count_tokens
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="transcript-chunks")
+
+
+def _split_utterance(utterance, max_tokens):
+    # Cut on word boundaries into pieces of at most max_tokens (a single word longer
+    # than that becomes a piece of its own). Each word is counted once, together with
+    # the space that joins it to the previous word, so this is linear in the length
+    # of the utterance. tiktoken pre-tokenizes every " word" separately, so the
+    # counts add up exactly; the character estimate can only overcount.
+    pieces, current, used = [], [], 0
+    for word in utterance.split():
+        tokens = count_tokens(' ' + word) if current else count_tokens(word)
+        if current and used + tokens > max_tokens:
+            pieces.append(' '.join(current))
+            current, used = [], 0
+            tokens = count_tokens(word)
+        current.append(word)
+        used += tokens
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def split_transcript(call_contents, max_tokens):
+    # Return a list of chunks (lists of utterances), each within max_tokens. Utterances
+    # are joined with spaces, so each one is counted with one extra token.
+    chunks, current, used = [], [], 0
+    for utterance in call_contents:
+        pieces = [utterance]
+        if count_tokens(utterance) + 1 > max_tokens:
+            pieces = _split_utterance(utterance, max_tokens - 1)
+        for piece in pieces:
+            tokens = count_tokens(piece) + 1
+            if current and used + tokens > max_tokens:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(piece)
+            used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def submit_chunks(chunks, fn, cache=None, kind=None, **options):
+    # Start fn(chunk, index, count) for every chunk and return the futures. With a
+    # cache and kind, each result is stored under the chunk, its position and options.
+    count = len(chunks)
+
+    def run(index, chunk):
+        if cache is None or kind is None:
+            return fn(chunk, index, count)
+        key = content_key(kind, chunk, index=index, count=count, **options)
+        return cache.get_or_compute(key, lambda: fn(chunk, index, count))
+
+    return [_executor.submit(run, index, chunk) for index, chunk in enumerate(chunks)]
+
+
+def map_chunks(chunks, fn, cache=None, kind=None, **options):
+    # Run fn over every chunk in parallel and return the results in chunk order.
+    return [future.result() for future in submit_chunks(chunks, fn, cache, kind, **options)]
@@ -0,0 +1,267 @@
+"""Lightweight latency instrumentation for the dashboard's hot paths.
+
+Call sites wrap the work they want to time in a span:
+
+    with get_metrics().span("customer_api_request", criterion=criterion):
+        ...
+
+or record a value directly with `observe`. Every metric is a histogram with fixed
+buckets (for the OpenMetrics export) plus a window of recent observations (for
+live p50/p95). Names ending in `_seconds` use latency buckets; anything else
+(tokens per second, real-time factors) uses a wider logarithmic range.
+
+Instrumentation is off until `configure_metrics(enabled=True)` is called. While it
+is off, `span` returns a shared no-op object and `observe` returns immediately, so
+the call sites cost an attribute lookup and a function call. With `export_port` set,
+a background thread serves the metrics as OpenMetrics text at
+http://127.0.0.1:<port>/metrics.
+"""
+import bisect
+import functools
+import math
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+VALUE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "contoso_"
+
+
+class Histogram:
+    def __init__(self, buckets, window):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        # Quantile over the recent window (nearest rank), or None with no data.
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mark(self, event):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Times a block of work as `<name>_seconds`.
+
+    `mark(event)` records the time since the span started as `<name>_<event>_seconds`,
+    e.g. span.mark("first_token"). A span that exits with an exception also counts
+    towards `<name>_errors_total`.
+    """
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def mark(self, event):
+        self.registry.observe(f"{self.name}_{event}_seconds", time.perf_counter() - self.started, self.labels)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(f"{self.name}_seconds", time.perf_counter() - self.started, self.labels)
+        if exc_type is not None:
+            self.registry.increment(f"{self.name}_errors", labels=self.labels)
+        return False
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, labels)
+
+    def observe(self, name, value, labels=None):
+        if not self.enabled or value is None:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                buckets = LATENCY_BUCKETS if name.endswith("_seconds") else VALUE_BUCKETS
+                histogram = self._histograms[key] = Histogram(buckets, self.window)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, labels=None):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def timed(self, name, **labels):
+        # Decorator form of span().
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_stream(self, name, stats, **labels):
+        # Record a services.streaming.StreamStats: total time, time to first token
+        # and tokens per second.
+        if not self.enabled:
+            return
+        self.observe(f"{name}_seconds", stats.total_time, labels)
+        self.observe(f"{name}_first_token_seconds", stats.time_to_first_token, labels)
+        if stats.time_to_first_token is not None:
+            self.observe(f"{name}_tokens_per_second", stats.tokens_per_second, labels)
+
+    def summary(self):
+        # One row per metric and label set, with live p50/p95 over the recent window.
+        with self._lock:
+            items = sorted(self._histograms.items())
+            rows = [
+                {
+                    "metric": name + _format_labels(labels),
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for (name, labels), histogram in items
+            ]
+        return rows
+
+    def to_openmetrics(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            families = {}
+            for (name, labels), histogram in histograms:
+                families.setdefault(name, []).append((labels, histogram))
+            for name, series in families.items():
+                metric = PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                if name.endswith("_seconds"):
+                    lines.append(f"# UNIT {metric} seconds")
+                for labels, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (math.inf,), histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(labels, ('le', _format_number(bound)))} {cumulative}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+            seen = set()
+            for (name, labels), value in counters:
+                metric = PREFIX + name
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}_total{_format_labels(labels)} {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        # Serve /metrics from a background thread. Only the first call starts a server.
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            registry = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    body = registry.to_openmetrics().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-export", daemon=True).start()
+            return self._server
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Created at import time so get_metrics() needs no lock on the hot path.
+_registry = MetricsRegistry()
+_export_attempted = set()
+
+
+def get_metrics():
+    # Return the process-wide metrics registry.
+    return _registry
+
+
+def configure_metrics(enabled=False, export_port=None, window=1024):
+    # Apply the "Metrics" settings from config.json. Safe to call on every rerun.
+    _registry.window = window
+    _registry.enabled = enabled
+    if enabled and export_port and export_port not in _export_attempted:
+        _export_attempted.add(export_port)
+        try:
+            _registry.serve(export_port)
+        except OSError as e:
+            # Another process (e.g. a second Streamlit server) already owns the port.
+            print(f"Unable to serve metrics on port {export_port}: {e}")
+    return _registry
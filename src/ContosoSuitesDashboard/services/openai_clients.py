@@ -0,0 +1,141 @@
+"""Process-wide registry of pooled Azure OpenAI clients.
+
+Creating an `openai.AzureOpenAI` client also creates a new httpx connection pool,
+so building one per prompt means a fresh TCP and TLS handshake on every chat turn.
+The registry below hands out one client per (endpoint, deployment, api_version,
+base URL flavor) and keeps it alive across Streamlit reruns and sessions.
+"""
+import asyncio
+import threading
+import weakref
+
+from services.metrics import get_metrics
+
+DEFAULT_API_VERSION = "2023-12-01-preview"
+
+# Base URL flavors. "chat" is the plain deployment endpoint, "extensions" is the
+# endpoint used for chat with your own data (Azure AI Search data sources).
+BASE_URL_FLAVORS = {
+    "chat": "{endpoint}/openai/deployments/{deployment_name}/",
+    "extensions": "{endpoint}/openai/deployments/{deployment_name}/extensions/",
+}
+
+_pool_settings = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 120.0,
+    "timeout": 60.0,
+    "max_retries": 2,
+}
+
+_lock = threading.Lock()
+_clients = {}
+# Async clients are bound to the event loop they were created on, so they are
+# tracked per loop and dropped automatically once the loop is garbage collected.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def configure_pool(**settings):
+    # Update connection pool settings for clients created after this call.
+    # Accepts any of the keys in _pool_settings; typically called with the
+    # "AOAIConnectionPool" section of config.json.
+    unknown = set(settings) - set(_pool_settings)
+    if unknown:
+        raise ValueError(f"Unknown connection pool settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _pool_settings.update(settings)
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=_pool_settings["max_connections"],
+        max_keepalive_connections=_pool_settings["max_keepalive_connections"],
+        keepalive_expiry=_pool_settings["keepalive_expiry"],
+    )
+
+
+def _base_url(endpoint, deployment_name, flavor):
+    if flavor not in BASE_URL_FLAVORS:
+        raise ValueError(f"Unknown base URL flavor '{flavor}'. Valid flavors include {', '.join(BASE_URL_FLAVORS)}.")
+    return BASE_URL_FLAVORS[flavor].format(endpoint=endpoint.rstrip("/"), deployment_name=deployment_name)
+
+
+def _registry_key(endpoint, api_key, deployment_name, api_version, flavor):
+    # The API key is part of the key so that a rotated secret gets a new client
+    # instead of reusing one that will only return 401s.
+    return (endpoint.rstrip("/"), deployment_name, api_version, flavor, api_key)
+
+
+def get_openai_client(endpoint, api_key, deployment_name, api_version=DEFAULT_API_VERSION, flavor="chat"):
+    # Return the shared synchronous client for this deployment, creating it on first use.
+    key = _registry_key(endpoint, api_key, deployment_name, api_version, flavor)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # openai and httpx are imported on first use; see services/startup.py.
+            import httpx
+            import openai
+
+            with get_metrics().span("aoai_client_create", flavor=flavor):
+                client = openai.AzureOpenAI(
+                    base_url=_base_url(endpoint, deployment_name, flavor),
+                    api_key=api_key,
+                    api_version=api_version,
+                    max_retries=_pool_settings["max_retries"],
+                    http_client=httpx.Client(
+                        limits=_limits(),
+                        timeout=_pool_settings["timeout"],
+                    ),
+                )
+            _clients[key] = client
+    return client
+
+
+def get_async_openai_client(endpoint, api_key, deployment_name, api_version=DEFAULT_API_VERSION, flavor="chat"):
+    # Return the shared asynchronous client for this deployment on the running event loop.
+    loop = asyncio.get_running_loop()
+    key = _registry_key(endpoint, api_key, deployment_name, api_version, flavor)
+
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            import httpx
+            import openai
+
+            client = openai.AsyncAzureOpenAI(
+                base_url=_base_url(endpoint, deployment_name, flavor),
+                api_key=api_key,
+                api_version=api_version,
+                max_retries=_pool_settings["max_retries"],
+                http_client=httpx.AsyncClient(
+                    limits=_limits(),
+                    timeout=_pool_settings["timeout"],
+                ),
+            )
+            loop_clients[key] = client
+    return client
+
+
+def close_all():
+    # Close every pooled synchronous client.
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_all():
+    # Close every pooled asynchronous client that belongs to the running event loop.
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.close()
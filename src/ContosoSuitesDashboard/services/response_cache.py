@@ -0,0 +1,183 @@
+"""Response cache for grounded "Chat with Data" answers.
+
+Entries are keyed on the normalized tail of the conversation plus the search index
+(and optional index version) used for grounding. Lookups try an exact key match
+first and then, if an embedding function is configured, the cached question most
+similar to the latest user message, above `similarity_threshold`. Only the latest
+message is embedded, and a semantic hit also requires the rest of the tail (the
+preceding context) to match exactly. Otherwise a long shared context would
+dominate the embedding, and two different follow-ups to the same previous turn
+could be served each other's answers. Entries are evicted LRU-first when the cache
+exceeds `max_entries` or `max_bytes`, and expire after `ttl` seconds.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_whitespace = re.compile(r"\s+")
+_lock = threading.Lock()
+_caches = {}
+
+
+def normalize_text(text):
+    # Lower-case, collapse whitespace and drop trailing punctuation so trivially
+    # different phrasings of the same question share a key.
+    return _whitespace.sub(" ", (text or "").lower()).strip().rstrip("?!. ")
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, max_bytes=4 * 1024 * 1024, ttl=3600, tail_messages=3,
+                 similarity_threshold=0.95, embed_fn=None, clock=time.monotonic):
+        # embed_fn takes a string and returns a 1-D vector. Without it the cache
+        # only serves exact matches.
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.tail_messages = tail_messages
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._matrix_cache = {}
+        self._embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def conversation_key(self, messages):
+        tail = messages[-self.tail_messages:] if self.tail_messages else messages
+        return "\n".join(f"{m['role']}: {normalize_text(m['content'])}" for m in tail)
+
+    def _question_and_context(self, messages):
+        # The latest message, normalized, and a hash of the tail before it.
+        tail = messages[-self.tail_messages:] if self.tail_messages else messages
+        context = self.conversation_key(tail[:-1]) if len(tail) > 1 else ""
+        return normalize_text(tail[-1]["content"]), hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+    def _embed(self, text):
+        # Remember recent embeddings so a miss followed by put() only embeds once.
+        with self._lock:
+            vector = self._embeddings.get(text)
+        if vector is None:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+            with self._lock:
+                self._embeddings[text] = vector
+                if len(self._embeddings) > 64:
+                    self._embeddings.popitem(last=False)
+        return vector
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry["response"])
+        self._matrix_cache.pop((key[0], entry["context"]), None)
+
+    def _expire(self):
+        now = self.clock()
+        for key in [k for k, e in self._entries.items() if e["expires_at"] <= now]:
+            self._remove(key)
+
+    def _scope_matrix(self, scope, context):
+        # Stack the question embeddings of every entry in this index scope with this
+        # preceding context into one matrix, so a similarity lookup is a single
+        # matrix-vector product.
+        cached = self._matrix_cache.get((scope, context))
+        if cached is None:
+            keys = [k for k, e in self._entries.items()
+                    if k[0] == scope and e["context"] == context and e["embedding"] is not None]
+            matrix = np.stack([self._entries[k]["embedding"] for k in keys]) if keys else None
+            cached = (keys, matrix)
+            self._matrix_cache[(scope, context)] = cached
+        return cached
+
+    def get(self, messages, index_name, index_version=None):
+        # Return the cached response for this conversation, or None on a miss.
+        scope = (index_name, index_version)
+        text = self.conversation_key(messages)
+        with self._lock:
+            self._expire()
+            key = (scope, text)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return self._entries[key]["response"]
+
+        if self.embed_fn is not None:
+            question, context = self._question_and_context(messages)
+            vector = self._embed(question)
+            with self._lock:
+                keys, matrix = self._scope_matrix(scope, context)
+                if matrix is not None:
+                    scores = matrix @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity_threshold and keys[best] in self._entries:
+                        self._entries.move_to_end(keys[best])
+                        self.semantic_hits += 1
+                        return self._entries[keys[best]]["response"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, messages, index_name, response, index_version=None):
+        # Cache the response to the conversation in messages (ending with the user turn).
+        if not response or len(response) > self.max_bytes:
+            return
+        scope = (index_name, index_version)
+        text = self.conversation_key(messages)
+        question, context = self._question_and_context(messages)
+        embedding = self._embed(question) if self.embed_fn is not None else None
+        with self._lock:
+            key = (scope, text)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "response": response,
+                "embedding": embedding,
+                "context": context,
+                "expires_at": self.clock() + self.ttl,
+            }
+            self._bytes += len(response)
+            self._matrix_cache.pop((scope, context), None)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_index(self, index_name):
+        # Drop every entry grounded on index_name, e.g. after the index is rebuilt.
+        with self._lock:
+            for key in [k for k in self._entries if k[0][0] == index_name]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix_cache.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+def get_response_cache(name="chat_with_data", **settings):
+    # Return the process-wide cache with this name, creating it with settings on first use.
+    with _lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = ResponseCache(**settings)
+            _caches[name] = cache
+    return cache
@@ -0,0 +1,141 @@
+"""Cached, concurrent loader for the dashboard's Key Vault secrets.
+
+The page scripts need the same handful of secrets on every rerun. The provider
+fetches all of them in parallel once, keeps them in memory for `ttl` seconds and
+refreshes them in the background shortly before they expire, so a rerun with a
+warm cache makes no network calls at all. Secrets that cannot be read from Key
+Vault fall back to the values in config.json.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import get_metrics
+
+# Values used in config.json for settings that have not been filled in yet.
+PLACEHOLDER_VALUES = {"", "BLANK", "TODO"}
+
+_lock = threading.Lock()
+_providers = {}
+
+
+def _create_secret_client(vault_url):
+    # Imported here so the Azure SDKs are only loaded when a real vault is used.
+    from azure.identity import DefaultAzureCredential
+    from azure.keyvault.secrets import SecretClient
+
+    return SecretClient(vault_url=vault_url, credential=DefaultAzureCredential())
+
+
+class SecretsProvider:
+    def __init__(self, vault_url, secret_names, fallback=None, ttl=3600, refresh_ahead=300,
+                 max_workers=8, client=None):
+        # vault_url may be None to read everything from the fallback mapping.
+        # client can be any object with a get_secret(name) method returning an
+        # object with a .value attribute, which makes it easy to use a fake vault.
+        self.vault_url = vault_url
+        self.secret_names = list(secret_names)
+        self.fallback = dict(fallback or {})
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.max_workers = max_workers
+        self._client = client
+        self._values = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def client(self):
+        # One SecretClient (and therefore one credential and token) per provider.
+        if self._client is None and self.vault_url:
+            self._client = _create_secret_client(self.vault_url)
+        return self._client
+
+    def _fallback_value(self, name):
+        value = self.fallback.get(name)
+        if value is None or value in PLACEHOLDER_VALUES:
+            return None
+        return value
+
+    def _fetch_one(self, name):
+        try:
+            return self.client.get_secret(name).value
+        except Exception as e:
+            value = self._fallback_value(name)
+            if value is None:
+                raise RuntimeError(f"Unable to retrieve secret '{name}' from Key Vault or config.json.") from e
+            print(f"Falling back to config.json for secret '{name}': {e}")
+            return value
+
+    def _fetch_all(self):
+        if self.client is None:
+            values = {name: self._fallback_value(name) for name in self.secret_names}
+            missing = [name for name, value in values.items() if value is None]
+            if missing:
+                raise RuntimeError(f"No Key Vault configured and no config.json value for: {', '.join(missing)}.")
+            return values
+
+        workers = max(1, min(self.max_workers, len(self.secret_names)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="secrets") as executor:
+            return dict(zip(self.secret_names, executor.map(self._fetch_one, self.secret_names)))
+
+    def refresh(self):
+        # Fetch every secret now and reset the expiry clock.
+        with get_metrics().span("keyvault_fetch"):
+            values = self._fetch_all()
+        with self._lock:
+            self._values = values
+            self._expires_at = time.monotonic() + self.ttl
+        return values
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the cached values; the next call after expiry retries synchronously.
+            print(f"Background secret refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get_all(self):
+        # Return all secrets as a dict, fetching or refreshing them as needed.
+        now = time.monotonic()
+        with self._lock:
+            values = self._values
+            remaining = self._expires_at - now
+            start_refresh = values and 0 < remaining <= self.refresh_ahead and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+
+        if not values or remaining <= 0:
+            # Only one caller fetches on a cold or expired cache; the others wait for it.
+            with self._fetch_lock:
+                with self._lock:
+                    if self._values and self._expires_at > time.monotonic():
+                        return dict(self._values)
+                return dict(self.refresh())
+        if start_refresh:
+            threading.Thread(target=self._refresh_in_background, name="secrets-refresh", daemon=True).start()
+        return dict(values)
+
+    def get(self, name):
+        return self.get_all()[name]
+
+    def invalidate(self):
+        with self._lock:
+            self._values = {}
+            self._expires_at = 0.0
+
+
+def get_secrets_provider(vault_url, secret_names, fallback=None, **kwargs):
+    # Return the process-wide provider for this vault and set of secrets.
+    key = (vault_url, tuple(secret_names))
+    with _lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = SecretsProvider(vault_url, secret_names, fallback=fallback, **kwargs)
+            _providers[key] = provider
+    return provider
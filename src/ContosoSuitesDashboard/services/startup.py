@@ -0,0 +1,137 @@
+"""Process-wide configuration and background pre-warming of the heavy SDKs.
+
+Streamlit re-executes a page script on every interaction, so the pages read
+config.json through `load_config`, which parses it once per process and only
+re-reads it when the file changes. The OpenAI, Speech and Language SDKs take
+several hundred milliseconds to import, and none of them is needed to draw a page.
+The services and pages therefore import them inside the functions that use them.
+`prewarm` imports them on a background thread the first time any page runs, so
+the page paints straight away and the SDKs are usually loaded before the first
+request needs them. It also runs named warm-up tasks, such as loading a page's
+tokenizer; each module and task is warmed once per process, whichever page asks
+for it first.
+"""
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from services.metrics import get_metrics
+
+# Modules the dashboard loads lazily, in the order they are usually first needed.
+PREWARM_MODULES = [
+    "httpx",
+    "openai",
+    "requests",
+    "azure.cognitiveservices.speech",
+    "azure.ai.textanalytics",
+    "scipy.signal",
+]
+
+_lock = threading.Lock()
+_configs = {}
+_prewarmed = set()
+_import_seconds = {}
+
+
+def load_config(path="config.json"):
+    # Return the parsed config file, re-reading it only when it has changed on disk.
+    # The dict is shared by every rerun and session, so treat it as read-only.
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(path)
+    entry = _configs.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    with open(path) as f:
+        config = json.load(f)
+    with _lock:
+        _configs[key] = (version, config)
+    return config
+
+
+def merge_config(config, overrides):
+    # A copy of config with overrides applied; nested sections are merged key by key.
+    merged = dict(config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_page(path, module_name, overrides=None):
+    # Import a Streamlit page as a module, so tools without a UI (batch_transcribe.py,
+    # the benchmarks) can call its functions. The page reads config.json merged with
+    # overrides. main() is not run because __name__ is not "__main__". The working
+    # directory is changed while the page loads, so call this before starting threads.
+    with open("config.json") as f:
+        config = merge_config(json.load(f), overrides or {})
+    workdir = tempfile.mkdtemp()
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(config, f)
+    cwd = os.getcwd()
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(cwd, path))
+    module = importlib.util.module_from_spec(spec)
+    os.chdir(workdir)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return module
+
+
+def import_module(name):
+    # Import a module, recording how long the first import took.
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    with _lock:
+        if name not in _import_seconds:
+            _import_seconds[name] = elapsed
+            get_metrics().observe("module_import_seconds", elapsed, {"module": name})
+    return module
+
+
+def import_times():
+    # {module: seconds} for the modules loaded with import_module, slowest first.
+    with _lock:
+        return dict(sorted(_import_seconds.items(), key=lambda item: -item[1]))
+
+
+def prewarm(modules=None, tasks=None):
+    # Import `modules` (default PREWARM_MODULES) and run `tasks`, a dict of name ->
+    # callable, on a background thread. Each module and named task is warmed once per
+    # process, so a later call only starts a thread for what earlier calls did not ask
+    # for, and returns None when there is nothing left. A module that fails to import is
+    # skipped; the code that needs it reports the error when used.
+    with _lock:
+        modules = [name for name in (PREWARM_MODULES if modules is None else modules)
+                   if ("module", name) not in _prewarmed]
+        tasks = {name: task for name, task in (tasks or {}).items() if ("task", name) not in _prewarmed}
+        if not modules and not tasks:
+            return None
+        _prewarmed.update(("module", name) for name in modules)
+        _prewarmed.update(("task", name) for name in tasks)
+
+        def run():
+            for name in modules:
+                try:
+                    import_module(name)
+                except ImportError as e:
+                    print(f"Pre-warm: could not import {name}: {e}")
+            for name, task in tasks.items():
+                try:
+                    task()
+                except Exception as e:
+                    print(f"Pre-warm task {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name="prewarm", daemon=True)
+        thread.start()
+    return thread
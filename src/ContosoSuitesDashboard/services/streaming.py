@@ -0,0 +1,110 @@
+"""Frame-rate-limited rendering of streamed chat completions.
+
+Calling `placeholder.markdown(full_response)` for every streamed delta re-sends and
+re-renders the whole growing answer, which is quadratic in the answer length.
+StreamingRenderer collects deltas in a buffer and only pushes an update to the UI
+a few times per second (or when a large burst of text arrives), then writes the
+final text exactly once.
+"""
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class StreamStats:
+    time_to_first_token: float = None
+    total_time: float = 0.0
+    tokens: int = 0
+    characters: int = 0
+    ui_updates: int = 0
+
+    @property
+    def tokens_per_second(self):
+        if self.time_to_first_token is None:
+            return 0.0
+        generation_time = self.total_time - self.time_to_first_token
+        return self.tokens / generation_time if generation_time > 0 else float(self.tokens)
+
+    def summary(self):
+        ttft = "n/a" if self.time_to_first_token is None else f"{self.time_to_first_token:.2f}s"
+        return (f"Time to first token: {ttft} | {self.tokens_per_second:.1f} tokens/sec | "
+                f"{self.tokens} tokens in {self.total_time:.2f}s | {self.ui_updates} UI updates")
+
+
+class StreamingRenderer:
+    def __init__(self, placeholder, max_updates_per_second=10, max_pending_chars=2000, cursor="|",
+                 clock=time.perf_counter):
+        # placeholder is anything with a markdown(text) method, usually st.empty().
+        self.placeholder = placeholder
+        self.min_interval = 1.0 / max_updates_per_second if max_updates_per_second else 0.0
+        self.max_pending_chars = max_pending_chars
+        self.cursor = cursor
+        self.clock = clock
+        self.stats = StreamStats()
+        self._started = clock()
+        self._last_update = self._started
+        self._text = ""
+        self._pending = []
+        self._pending_chars = 0
+        self._finished = False
+
+    @property
+    def text(self):
+        # The full text received so far, including deltas not yet shown.
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending = []
+            self._pending_chars = 0
+        return self._text
+
+    def write(self, delta):
+        if self._finished:
+            raise RuntimeError("Cannot write to a StreamingRenderer after finish() has been called.")
+        if not delta:
+            return
+        now = self.clock()
+        if self.stats.time_to_first_token is None:
+            self.stats.time_to_first_token = now - self._started
+        self.stats.tokens += 1
+        self.stats.characters += len(delta)
+        self._pending.append(delta)
+        self._pending_chars += len(delta)
+
+        if now - self._last_update >= self.min_interval or self._pending_chars >= self.max_pending_chars:
+            self.placeholder.markdown(self.text + self.cursor)
+            self.stats.ui_updates += 1
+            self._last_update = now
+
+    def finish(self):
+        # Show the final text without the cursor. Safe to call more than once.
+        if not self._finished:
+            self._finished = True
+            self.placeholder.markdown(self.text)
+            self.stats.ui_updates += 1
+            self.stats.total_time = self.clock() - self._started
+        return self._text
+
+
+def render_stream(placeholder, deltas, **kwargs):
+    # Render an iterable of text deltas and return (full_text, stats).
+    renderer = StreamingRenderer(placeholder, **kwargs)
+    try:
+        for delta in deltas:
+            renderer.write(delta)
+    finally:
+        renderer.finish()
+    return renderer.text, renderer.stats
+
+
+def completion_deltas(stream):
+    # Yield the text content of each chunk of a streamed chat completion.
+    for chunk in stream:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+
+def text_deltas(text, chunk_chars=24):
+    # Split already-complete text into deltas, e.g. to replay a cached answer
+    # through the same rendering path as a live stream.
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
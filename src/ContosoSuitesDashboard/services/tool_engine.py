@@ -0,0 +1,132 @@
+"""Concurrent execution of model-requested tool calls.
+
+With the `tools` request format the model can ask for several tool calls in one
+response. ToolExecutor runs them concurrently on a shared, bounded thread pool,
+applies a per-tool timeout, and turns every outcome (result, validation error,
+exception or timeout) into a `tool` message so all results go back to the model
+in a single follow-up request.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+import pandas as pd
+
+from services.metrics import get_metrics
+
+_lock = threading.Lock()
+_executors = {}
+
+
+def _get_executor(max_workers):
+    # Tool threads are shared by every session in the process.
+    with _lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tools")
+            _executors[max_workers] = executor
+    return executor
+
+
+@dataclass
+class ToolCallResult:
+    id: str
+    name: str
+    arguments: dict
+    output: object = None
+    error: str = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def format_tool_output(output, max_rows=50):
+    # Convert a tool's return value into the text content of a tool message.
+    if isinstance(output, pd.DataFrame):
+        text = output.head(max_rows).to_csv(index=False)
+        if len(output) > max_rows:
+            text += f"... {len(output) - max_rows} more rows not shown.\n"
+        return text
+    if isinstance(output, str):
+        return output
+    return json.dumps(output, default=str)
+
+
+class ToolExecutor:
+    def __init__(self, functions, validate=None, max_workers=8, timeout=15.0, timeouts=None):
+        # functions maps tool names to callables. validate(name, args) returns an error
+        # message to reject a call before it runs. timeouts overrides timeout per tool.
+        self.functions = functions
+        self.validate = validate
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.executor = _get_executor(max_workers)
+
+    def _prepare(self, tool_call):
+        # Parse and validate one tool call; returns (result, function or None).
+        name = tool_call.function.name
+        result = ToolCallResult(id=tool_call.id, name=name, arguments={})
+        if name not in self.functions:
+            result.error = f"Sorry, I don't know how to call the function `{name}`."
+            return result, None
+        try:
+            result.arguments = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            result.error = f"Sorry, the arguments for `{name}` are not valid JSON."
+            return result, None
+        error = self.validate(name, result.arguments) if self.validate is not None else None
+        if error:
+            result.error = f"Sorry, I don't know how to call the function `{name}` with those arguments: {error}."
+            return result, None
+        return result, self.functions[name]
+
+    def run(self, tool_calls):
+        # Run all tool calls concurrently and return their results in request order.
+        prepared = [self._prepare(tool_call) for tool_call in tool_calls]
+        started = time.perf_counter()
+        futures = [
+            self.executor.submit(function, **result.arguments) if function is not None else None
+            for result, function in prepared
+        ]
+        for (result, _), future in zip(prepared, futures):
+            if future is None:
+                continue
+            # Each tool's deadline is measured from the moment the batch was submitted.
+            remaining = self.timeouts.get(result.name, self.timeout) - (time.perf_counter() - started)
+            try:
+                result.output = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                future.cancel()
+                result.error = f"The function `{result.name}` timed out."
+            except Exception as e:
+                result.error = f"The function `{result.name}` failed: {e}"
+            result.elapsed = time.perf_counter() - started
+            get_metrics().observe("tool_seconds", result.elapsed, {"tool": result.name, "ok": result.ok})
+        return [result for result, _ in prepared]
+
+
+def assistant_tool_call_message(message):
+    # Echo the model's tool-call message back in the follow-up request.
+    return {
+        "role": "assistant",
+        "content": message.content,
+        "tool_calls": [
+            {"id": c.id, "type": "function", "function": {"name": c.function.name, "arguments": c.function.arguments}}
+            for c in message.tool_calls
+        ],
+    }
+
+
+def tool_result_messages(results, max_rows=50):
+    return [
+        {
+            "role": "tool",
+            "tool_call_id": result.id,
+            "content": format_tool_output(result.output, max_rows) if result.ok else result.error,
+        }
+        for result in results
+    ]
@@ -0,0 +1,246 @@
+"""Declare function-calling tools once and derive everything else from them.
+
+    tools = get_tool_registry("chat_with_data")
+
+    @tools.tool(description="Get a list of customers based on some search criterion.", cache_ttl=60)
+    def get_customers(search_criterion: Literal["CustomerName", "LoyaltyTier"], search_value: str):
+        ...
+
+The JSON schema sent to the model is generated from the function signature
+(`Literal[...]` becomes an enum, `list[Literal[...]]` an array of enum values,
+`Optional[...]` or a `None` default also accepts JSON null, and parameters without
+defaults are required), and a validator for the arguments is compiled once at
+registration. Tools can opt in to a TTL cache of their results keyed on the
+validated arguments. Registries are process-wide, so cached results survive
+Streamlit reruns. The page script re-registers its tools every time it runs, but a
+tool whose code, annotations, defaults and descriptions are unchanged keeps its
+compiled schema and validator; only the function it calls is swapped for the new one.
+"""
+import inspect
+import threading
+import time
+import types
+import typing
+from collections import OrderedDict
+
+JSON_TYPES = {
+    str: ("string", (str,)),
+    int: ("integer", (int,)),
+    float: ("number", (int, float)),
+    bool: ("boolean", (bool,)),
+    list: ("array", (list,)),
+    dict: ("object", (dict,)),
+}
+
+_lock = threading.Lock()
+_registries = {}
+
+
+def _optional_type(annotation):
+    # Return X for Optional[X] or X | None, otherwise None.
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1 and len(args) < len(typing.get_args(annotation)):
+            return args[0]
+    return None
+
+
+def _parameter_spec(annotation):
+    # Return (json schema, python types, allowed values) for a parameter annotation.
+    # For list[Literal[...]] the allowed values apply to each item.
+    if _optional_type(annotation) is not None:
+        return _parameter_spec(_optional_type(annotation))
+    if typing.get_origin(annotation) is typing.Literal:
+        values = typing.get_args(annotation)
+        json_type, python_types = JSON_TYPES[type(values[0])]
+        return {"type": json_type, "enum": list(values)}, python_types, frozenset(values)
+    if typing.get_origin(annotation) is list and typing.get_args(annotation):
+        items, _, allowed = _parameter_spec(typing.get_args(annotation)[0])
+        return {"type": "array", "items": items}, (list,), allowed
+    if annotation is inspect.Parameter.empty:
+        annotation = str
+    json_type, python_types = JSON_TYPES[typing.get_origin(annotation) or annotation]
+    return {"type": json_type}, python_types, None
+
+
+def _is_allowed(value, allowed):
+    try:
+        return value in allowed
+    except TypeError:
+        # Unhashable values (lists, objects) can never be one of the allowed values.
+        return False
+
+
+def _cache_key(arguments):
+    # Lists are not hashable, so they are keyed as tuples.
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in arguments.items()))
+
+
+class _ResultCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _fingerprint(function, description, descriptions):
+    # Everything the schema and validator are built from. Code objects compare by
+    # content, so the same def compiled again on a rerun has the same fingerprint.
+    return (function.__code__, function.__defaults__, function.__kwdefaults__,
+            list(function.__annotations__.items()), description, descriptions)
+
+
+class Tool:
+    def __init__(self, function, name, description, descriptions, cache, cache_if):
+        self.function = function
+        self.name = name
+        self.cache = cache
+        self.cache_if = cache_if
+        self.fingerprint = _fingerprint(function, description, descriptions)
+
+        properties = {}
+        self._validators = {}
+        self._required = []
+        hints = typing.get_type_hints(function)
+        for param in inspect.signature(function).parameters.values():
+            annotation = hints.get(param.name, param.annotation)
+            schema, python_types, allowed = _parameter_spec(annotation)
+            if param.name in descriptions:
+                schema["description"] = descriptions[param.name]
+            properties[param.name] = schema
+            # Models often send null for an optional argument they mean to leave out.
+            nullable = param.default is None or _optional_type(annotation) is not None
+            self._validators[param.name] = (python_types, allowed, nullable)
+            if param.default is param.empty:
+                self._required.append(param.name)
+
+        self.schema = {
+            "name": name,
+            "description": description or inspect.getdoc(function) or "",
+            "parameters": {"type": "object", "properties": properties, "required": list(self._required)},
+        }
+
+    def validate(self, arguments):
+        # Return None if the arguments are valid, otherwise a short error message.
+        if not isinstance(arguments, dict):
+            return "arguments must be a JSON object"
+        for name in self._required:
+            if name not in arguments:
+                return f"missing required argument '{name}'"
+        for name, value in arguments.items():
+            validator = self._validators.get(name)
+            if validator is None:
+                return f"unexpected argument '{name}'"
+            python_types, allowed, nullable = validator
+            if value is None and nullable:
+                continue
+            # bool is a subclass of int, so it must not pass as an integer or number.
+            if not isinstance(value, python_types) or (isinstance(value, bool) and bool not in python_types):
+                return f"argument '{name}' has the wrong type"
+            if allowed is not None and not all(_is_allowed(item, allowed) for item in (value if isinstance(value, list) else [value])):
+                return f"argument '{name}' must be one of {', '.join(map(str, sorted(allowed)))}"
+        return None
+
+    def __call__(self, **arguments):
+        if self.cache is None:
+            return self.function(**arguments)
+        key = _cache_key(arguments)
+        found, value = self.cache.get(key)
+        if found:
+            return value
+        value = self.function(**arguments)
+        if self.cache_if is None or self.cache_if(value):
+            self.cache.put(key, value)
+        return value
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tool(self, name=None, description=None, descriptions=None, cache_ttl=None, cache_size=256, cache_if=None):
+        # Decorator that registers a function as a tool. With cache_ttl set, results are
+        # cached per argument set for that many seconds; cache_if(result) can veto caching.
+        def register(function):
+            tool_name = name or function.__name__
+            with self._lock:
+                existing = self._tools.get(tool_name)
+                cache = None
+                if cache_ttl:
+                    # Keep the warm cache when a rerun re-registers the same tool.
+                    if existing is not None and existing.cache is not None and existing.cache.ttl == cache_ttl:
+                        cache = existing.cache
+                    else:
+                        cache = _ResultCache(cache_ttl, cache_size)
+                if existing is not None and existing.fingerprint == _fingerprint(function, description, descriptions or {}):
+                    # Unchanged since the last run: keep the compiled schema and validator.
+                    existing.function = function
+                    existing.cache = cache
+                    existing.cache_if = cache_if
+                else:
+                    self._tools[tool_name] = Tool(function, tool_name, description, descriptions or {}, cache, cache_if)
+            return function
+        return register
+
+    def __getitem__(self, name):
+        return self._tools[name]
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def schemas(self):
+        # Function definitions for the "tools"/"functions" request parameter.
+        return [tool.schema for tool in self._tools.values()]
+
+    @property
+    def functions(self):
+        # Tool name -> callable (with caching applied), like available_functions.
+        return dict(self._tools)
+
+    def validate(self, name, arguments):
+        if name not in self._tools:
+            return f"unknown tool '{name}'"
+        return self._tools[name].validate(arguments)
+
+    def cache_stats(self):
+        return {
+            name: {"hits": tool.cache.hits, "misses": tool.cache.misses}
+            for name, tool in self._tools.items() if tool.cache is not None
+        }
+
+
+def get_tool_registry(name):
+    # Return the process-wide registry with this name.
+    with _lock:
+        registry = _registries.get(name)
+        if registry is None:
+            registry = ToolRegistry()
+            _registries[name] = registry
+    return registry
@@ -0,0 +1,192 @@
+"""Event-driven management of Speech SDK transcription sessions.
+
+A TranscriptionSession wraps a ConversationTranscriber and turns its callbacks into
+synchronization primitives: every final phrase is appended to `results` (and its
+start and end, in seconds of pushed audio, to `timings`) and put on a queue (so
+callers can iterate over partial results as they arrive), and the
+session_stopped/canceled events complete a Future instead of flipping a flag that
+someone has to poll. Each session has an optional deadline after which it is
+cancelled. The SessionManager keeps track of running sessions so several
+transcriptions can run at once and be looked up or cancelled by id.
+"""
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+_DONE = object()
+_lock = threading.Lock()
+_manager = None
+
+
+class TranscriptionTimeout(TimeoutError):
+    pass
+
+
+class TranscriptionSession:
+    def __init__(self, transcriber, session_id=None, deadline=None, on_done=None):
+        # deadline is the maximum run time in seconds (None for no limit).
+        self.id = session_id or uuid.uuid4().hex
+        self.transcriber = transcriber
+        self.deadline = deadline
+        self.results = []
+        self.timings = []
+        self.error = None
+        self.started_at = None
+        self.future = Future()
+        self._queue = queue.Queue()
+        self._timer = None
+        self._on_done = on_done
+        self._finish_lock = threading.Lock()
+
+        transcriber.transcribed.connect(self._handle_final_result)
+        transcriber.session_started.connect(lambda evt: print('SESSION STARTED: {}'.format(evt)))
+        transcriber.session_stopped.connect(lambda evt: print('SESSION STOPPED {}'.format(evt)))
+        transcriber.canceled.connect(lambda evt: print('CANCELED {}'.format(evt)))
+        # Complete the session on either session stopped or canceled events.
+        transcriber.session_stopped.connect(self._handle_stopped)
+        transcriber.canceled.connect(self._handle_canceled)
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def _handle_final_result(self, evt):
+        text = evt.result.text
+        if text:
+            # Offsets and durations are reported in 100-nanosecond ticks.
+            start = getattr(evt.result, "offset", 0) / 10_000_000
+            self.timings.append((start, start + getattr(evt.result, "duration", 0) / 10_000_000))
+            self.results.append(text)
+            self._queue.put(text)
+
+    def _handle_canceled(self, evt):
+        details = getattr(evt, "cancellation_details", None)
+        error_details = getattr(details, "error_details", None) or getattr(evt, "error_details", None)
+        if error_details:
+            self.error = error_details
+        self._finish()
+
+    def _handle_stopped(self, evt):
+        self._finish()
+
+    def _finish(self):
+        with self._finish_lock:
+            if self.future.done():
+                return
+            self.future.set_result(self.results)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._queue.put(_DONE)
+        if self._on_done is not None:
+            self._on_done(self)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        if self.deadline is not None:
+            self._timer = threading.Timer(self.deadline, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        self.transcriber.start_transcribing_async()
+        return self
+
+    def _expire(self):
+        if not self.done:
+            self.error = f"Transcription exceeded its {self.deadline} second deadline."
+            self.cancel()
+
+    def cancel(self):
+        # Stop transcribing; the session completes with whatever has been transcribed so far.
+        if not self.done:
+            self.transcriber.stop_transcribing_async()
+            self._finish()
+
+    def wait(self, timeout=None):
+        # Block until the session completes and return all results.
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TranscriptionTimeout(f"Transcription session {self.id} did not finish within {timeout} seconds.")
+
+    def stream(self, timeout=None, heartbeat=None):
+        # Yield each final phrase as soon as it is transcribed, until the session ends.
+        # timeout bounds the wait for any single phrase. With heartbeat set, None is
+        # yielded after that many idle seconds so the caller can do periodic work;
+        # heartbeats do not extend the timeout, which counts from the last phrase.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = heartbeat
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TranscriptionTimeout(
+                        f"No transcription results from session {self.id} within {timeout} seconds.")
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                if heartbeat is not None and (deadline is None or time.monotonic() < deadline):
+                    yield None
+                continue
+            if item is _DONE:
+                # Leave the marker in place so later stream() calls end immediately too.
+                self._queue.put(_DONE)
+                return
+            if deadline is not None:
+                deadline = time.monotonic() + timeout
+            yield item
+
+
+class SessionManager:
+    def __init__(self, max_feeders=4):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # Audio for file transcriptions is pushed from this shared pool instead of
+        # from the caller's thread.
+        self._feeders = ThreadPoolExecutor(max_workers=max_feeders, thread_name_prefix="speech-feed")
+
+    def start(self, transcriber, deadline=None, session_id=None):
+        session = TranscriptionSession(transcriber, session_id=session_id, deadline=deadline, on_done=self._remove)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session.start()
+
+    def feed(self, session, push_fn):
+        # Run push_fn() (which writes audio and closes the stream) on the feeder pool.
+        # If pushing fails, the session is cancelled rather than left waiting forever.
+        def run():
+            try:
+                push_fn()
+            except Exception as e:
+                session.error = f"Failed to stream audio: {e}"
+                session.cancel()
+                raise
+        return self._feeders.submit(run)
+
+    def _remove(self, session):
+        with self._lock:
+            self._sessions.pop(session.id, None)
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def cancel(self, session_id):
+        session = self.get(session_id)
+        if session is not None:
+            session.cancel()
+        return session
+
+    def active(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+
+def get_session_manager():
+    # Return the process-wide session manager.
+    global _manager
+    with _lock:
+        if _manager is None:
+            _manager = SessionManager()
+        return _manager
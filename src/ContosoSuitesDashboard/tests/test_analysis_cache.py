@@ -0,0 +1,97 @@
+import io
+import os
+import threading
+import time
+
+from services.analysis_cache import AnalysisCache, content_key, hash_audio
+
+
+def test_audio_hash_is_the_same_for_every_kind_of_source(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    path = tmp_path / "call.wav"
+    path.write_bytes(data)
+    upload = io.BytesIO(data)
+    with open(path, "rb") as f:
+        f.seek(10)
+        from_file = hash_audio(f)
+        assert f.tell() == 10
+    assert hash_audio(str(path)) == hash_audio(upload) == from_file
+
+
+def test_content_keys_cover_kind_content_and_options():
+    key = content_key("summary", ["hello"], model="gpt-4o")
+    assert key.startswith("summary-")
+    assert key == content_key("summary", ["hello"], model="gpt-4o")
+    assert key != content_key("summary", ["hello"], model="gpt-4o-mini")
+    assert key != content_key("summary", ["hello!"], model="gpt-4o")
+    assert key != content_key("compliance", ["hello"], model="gpt-4o")
+
+
+def test_entries_are_shared_through_the_directory(tmp_path):
+    first = AnalysisCache(str(tmp_path))
+    first.put("summary-abc", {"text": "fine"})
+    second = AnalysisCache(str(tmp_path))
+    assert second.get("summary-abc") == {"text": "fine"}
+    assert second.get("summary-abc") == {"text": "fine"}
+    assert second.get("summary-missing") is None
+    assert second.stats()["disk_hits"] == 1
+    assert second.stats()["memory_hits"] == 1
+    assert second.stats()["misses"] == 1
+
+
+def test_memory_only_cache_keeps_the_most_recently_used_entries():
+    cache = AnalysisCache(None, max_memory_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_disk_usage_is_bounded_by_evicting_the_least_recently_used(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_memory_entries=0, max_disk_bytes=250)
+    payload = "x" * 90
+    for index, key in enumerate(["k-01", "k-02", "k-03"]):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (1000 + index, 1000 + index))
+    assert cache.get("k-01") is None
+    assert cache.get("k-03") == payload
+    assert cache.stats()["disk_bytes"] <= 250
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = AnalysisCache(None)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_memoize_only_stores_values_accepted_by_cache_if():
+    cache = AnalysisCache(None)
+    calls = []
+
+    @cache.memoize("summary", cache_if=lambda value: not value.startswith("error"), model="m")
+    def summarize(call_contents, style):
+        calls.append(style)
+        return "error" if style == "bad" else f"{style}: {len(call_contents)}"
+
+    assert summarize(["a", "b"], "short") == "short: 2"
+    assert summarize(["a", "b"], "short") == "short: 2"
+    assert summarize.cached(["a", "b"], "short") == "short: 2"
+    assert summarize.cached(["a", "b"], "long") is None
+    summarize(["a"], "bad")
+    summarize(["a"], "bad")
+    assert calls == ["short", "bad", "bad"]
@@ -0,0 +1,122 @@
+import io
+import struct
+import threading
+import time
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+from services.audio import RecognitionProgress, WavReader, push_audio, read_wav_info
+
+
+def wav_bytes(seconds=1.0, sample_rate=16000, channels=1, extra_chunk=False):
+    frames = int(seconds * sample_rate)
+    pcm = b"".join(struct.pack("<h", i % 1000) for i in range(frames * channels))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(pcm)
+    data = buffer.getvalue()
+    if extra_chunk:
+        # Insert an odd-sized LIST chunk (with its pad byte) between fmt and data.
+        fmt_end = 12 + 8 + 16
+        data = data[:fmt_end] + b"LIST" + struct.pack("<I", 3) + b"abc\x00" + data[fmt_end:]
+    return data, pcm
+
+
+def test_header_parsing_skips_unknown_chunks():
+    data, pcm = wav_bytes(0.5, extra_chunk=True)
+    info = read_wav_info(io.BytesIO(data))
+    assert (info.channels, info.sample_rate, info.bits_per_sample) == (1, 16000, 16)
+    assert info.data_size == len(pcm)
+    assert info.duration == pytest.approx(0.5)
+
+
+def test_invalid_files_are_rejected():
+    with pytest.raises(ValueError, match="RIFF"):
+        read_wav_info(io.BytesIO(b"RIFX" + b"\0" * 40))
+    data, _ = wav_bytes(0.1)
+    with pytest.raises(ValueError, match="end of file"):
+        read_wav_info(io.BytesIO(data[:30]))
+
+
+@pytest.mark.parametrize("as_path", [False, True])
+def test_frames_cover_the_pcm_data_exactly(tmp_path, as_path):
+    data, pcm = wav_bytes(1.05, channels=2)
+    source = io.BytesIO(data)
+    if as_path:
+        source = tmp_path / "call.wav"
+        source.write_bytes(data)
+    with WavReader(source) as reader:
+        frames = list(reader.frames(frame_ms=100))
+    assert b"".join(frames) == pcm
+    assert len(frames) == 11
+    assert all(len(frame) == 16000 * 4 // 10 for frame in frames[:-1])
+
+
+def test_frames_fall_back_to_reading_unmappable_files():
+    data, pcm = wav_bytes(0.3)
+
+    class Unmappable(io.RawIOBase):
+        # A seekable stream that is neither a BytesIO nor backed by a file descriptor.
+        def __init__(self):
+            self.inner = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def seekable(self):
+            return True
+
+        def read(self, size=-1):
+            return self.inner.read(size)
+
+        def seek(self, offset, whence=0):
+            return self.inner.seek(offset, whence)
+
+        def tell(self):
+            return self.inner.tell()
+
+    reader = WavReader(Unmappable())
+    assert b"".join(reader.frames(frame_ms=50)) == pcm
+
+
+class RecordingStream:
+    def __init__(self):
+        self.written = 0
+
+    def write(self, frame):
+        self.written += len(frame)
+
+
+def recognized(seconds):
+    return SimpleNamespace(result=SimpleNamespace(offset=0, duration=int(seconds * 10_000_000)))
+
+
+def test_push_audio_waits_for_the_recognizer():
+    data, pcm = wav_bytes(3.0)
+    reader = WavReader(io.BytesIO(data))
+    progress = RecognitionProgress()
+    stream = RecordingStream()
+    worker = threading.Thread(target=push_audio, args=(stream, reader),
+                              kwargs={"progress": progress, "max_lead_seconds": 1.0})
+    worker.start()
+    time.sleep(0.3)
+    # Only about max_lead_seconds of audio (plus wall-clock time) may be ahead.
+    assert 0 < stream.written < len(pcm)
+    progress.update(recognized(3.0))
+    worker.join(5)
+    assert not worker.is_alive()
+    assert stream.written == len(pcm)
+
+
+def test_progress_only_moves_forward():
+    progress = RecognitionProgress()
+    progress.update(recognized(2.0))
+    progress.update(recognized(1.0))
+    assert progress.seconds == 2.0
+    assert progress.wait_for(2.0, timeout=0)
+    assert not progress.wait_for(2.5, timeout=0.01)
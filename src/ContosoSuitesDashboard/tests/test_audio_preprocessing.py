@@ -0,0 +1,102 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from services.audio import WAVE_FORMAT_PCM, WavReader, read_wav_info
+from services.audio_preprocessing import (
+    WAVE_FORMAT_IEEE_FLOAT,
+    TimeMap,
+    kept_spans,
+    open_audio,
+    prepare_audio,
+    read_samples,
+)
+
+
+def wav(pcm, sample_rate, channels, bits, format_tag=WAVE_FORMAT_PCM):
+    # A minimal RIFF/WAVE file around raw sample bytes.
+    block_align = channels * bits // 8
+    fmt = struct.pack("<HHIIHH", format_tag, channels, sample_rate, sample_rate * block_align, block_align, bits)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(pcm)) + pcm
+    return io.BytesIO(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+
+def samples_of(source):
+    return read_samples(source, read_wav_info(source))
+
+
+def test_every_supported_encoding_decodes_to_the_same_mono_signal():
+    expected = np.array([0.0, 0.5, -0.5, -1.0], dtype=np.float32)
+    ints16 = (expected * 32768).clip(-32768, 32767).astype("<i2")
+    np.testing.assert_allclose(samples_of(wav(ints16.tobytes(), 8000, 1, 16)), expected, atol=1e-4)
+
+    uint8 = (expected * 128 + 128).clip(0, 255).astype(np.uint8)
+    np.testing.assert_allclose(samples_of(wav(uint8.tobytes(), 8000, 1, 8)), expected, atol=1e-2)
+
+    ints24 = b"".join(struct.pack("<i", int(v * 2 ** 23) if v > -1 else -2 ** 23)[:3] for v in expected)
+    np.testing.assert_allclose(samples_of(wav(ints24, 8000, 1, 24)), expected, atol=1e-4)
+
+    floats = expected.astype("<f4")
+    np.testing.assert_allclose(samples_of(wav(floats.tobytes(), 8000, 1, 32, WAVE_FORMAT_IEEE_FLOAT)), expected)
+
+    # Stereo with the signal in the left channel and its negation in the right averages to silence.
+    stereo = np.stack([ints16, -ints16.astype(np.int32).clip(-32768, 32767).astype("<i2")], axis=1)
+    np.testing.assert_allclose(samples_of(wav(stereo.tobytes(), 8000, 2, 16))[:3], 0.0, atol=1e-4)
+
+    with pytest.raises(ValueError, match="Unsupported WAV encoding"):
+        samples_of(wav(b"\0" * 8, 8000, 1, 16, format_tag=0x0006))
+
+
+def test_kept_spans_cut_only_long_silences():
+    speech = np.array([1, 1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 1], dtype=bool)
+    starts, ends = kept_spans(speech, max_silence_frames=3, keep_silence_frames=2)
+    # The 2-frame pause is kept; the 6-frame one shrinks to one frame at each end.
+    assert list(zip(starts.tolist(), ends.tolist())) == [(0, 6), (10, 13)]
+
+    leading = np.array([0, 0, 0, 0, 0, 1], dtype=bool)
+    starts, ends = kept_spans(leading, max_silence_frames=2, keep_silence_frames=0)
+    assert list(zip(starts.tolist(), ends.tolist())) == [(5, 6)]
+
+
+def test_time_map_maps_processed_offsets_back_to_the_recording():
+    time_map = TimeMap(np.array([0.0, 1.0, 1.5]), np.array([0.0, 4.0, 10.0]))
+    np.testing.assert_allclose(time_map.to_original(np.array([0.5, 1.25, 2.0])), [0.5, 4.25, 10.5])
+    # A time on a boundary starts the later span, or ends the earlier one.
+    assert time_map.to_original(1.0) == 4.0
+    assert time_map.to_original(1.0, end=True) == 1.0
+    assert time_map.map_spans([(0.2, 1.0), (1.0, 1.6)]) == [(0.2, 1.0), (4.0, 10.1)]
+    assert TimeMap.identity().map_spans([(1.5, 2.5)]) == [(1.5, 2.5)]
+
+
+def tone_with_pause(sample_rate=16000):
+    t = np.arange(sample_rate) / sample_rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    noise = np.random.default_rng(0).normal(0, 1e-4, 3 * sample_rate).astype(np.float32)
+    return np.concatenate([tone, noise, tone])
+
+
+def test_long_silences_are_trimmed_and_mapped_back():
+    signal = tone_with_pause()
+    pcm = (signal * 32767).astype("<i2")
+    prepared = prepare_audio(wav(pcm.tobytes(), 16000, 1, 16), trim_silence=True)
+    assert prepared.info.duration < 3.0
+    assert prepared.removed_seconds > 2.0
+    # The start of the second tone comes back at 4 s in the original recording.
+    processed_start = prepared.time_map.processed_starts[-1]
+    original_start = prepared.time_map.original_starts[-1]
+    second_tone = processed_start + (4.0 - original_start)
+    assert prepared.time_map.to_original(second_tone) == pytest.approx(4.0)
+    assert b"".join(prepared.frames()) == prepared.pcm.tobytes()
+
+
+def test_recordings_are_converted_to_the_stream_format():
+    signal = tone_with_pause(44100)[:44100]
+    stereo = np.repeat((signal * 32767).astype("<i2")[:, None], 2, axis=1)
+    prepared = open_audio(wav(stereo.tobytes(), 44100, 2, 16))
+    assert (prepared.info.sample_rate, prepared.info.channels, prepared.info.bits_per_sample) == (16000, 1, 16)
+    assert prepared.info.duration == pytest.approx(1.0, abs=1e-3)
+
+    ready = wav((signal[:16000] * 32767).astype("<i2").tobytes(), 16000, 1, 16)
+    assert isinstance(open_audio(ready), WavReader)
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from batch_transcribe import JsonlWriter, ParquetWriter, find_calls
+
+
+def test_calls_come_from_a_directory_or_a_manifest(tmp_path):
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    for name in ("b.wav", "a.WAV", "notes.txt"):
+        (audio / name).write_bytes(b"")
+    assert find_calls(str(audio)) == [str(audio / "a.WAV"), str(audio / "b.wav")]
+
+    manifest = tmp_path / "calls.txt"
+    manifest.write_text("# backlog\naudio/b.wav\n\n  audio/a.WAV  # the first call\n", encoding="utf-8")
+    assert find_calls(str(manifest)) == [str(audio / "b.wav"), str(audio / "a.WAV")]
+
+
+def test_jsonl_output_resumes_after_a_torn_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text(
+        json.dumps({"file": "a.wav", "error": None}) + "\n"
+        + json.dumps({"file": "b.wav", "error": "Transcription failed"}) + "\n"
+        + '{"file": "c.wav", "err',
+        encoding="utf-8",
+    )
+    writer = JsonlWriter(str(path))
+    # Failed and torn rows are redone on resume.
+    assert writer.completed() == {"a.wav"}
+    with writer:
+        writer.write({"file": "c.wav", "error": None})
+    assert writer.completed() == {"a.wav", "c.wav"}
+    assert path.read_text(encoding="utf-8").splitlines()[-1] == json.dumps({"file": "c.wav", "error": None})
+
+
+def test_parquet_output_is_written_in_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "results"
+    writer = ParquetWriter(str(path), batch_size=2)
+    with writer:
+        assert writer.completed() == set()
+        for name, error in [("a.wav", None), ("b.wav", "boom"), ("c.wav", None)]:
+            writer.write({"file": name, "error": error})
+        assert len(writer._parts()) == 1
+    assert len(writer._parts()) == 2
+    assert ParquetWriter(str(path)).completed() == {"a.wav", "c.wav"}
@@ -0,0 +1,97 @@
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.stubs import StubOpenAI
+from services.bulk_compliance import BulkComplianceChecker, RateLimiter, TokenBucket, retry_after_seconds
+from services.long_transcripts import split_transcript
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def error_with_headers(**headers):
+    return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+def test_retry_after_prefers_milliseconds_then_seconds_then_dates():
+    assert retry_after_seconds(error_with_headers(**{"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert retry_after_seconds(error_with_headers(**{"retry-after": "2"})) == 2.0
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < retry_after_seconds(error_with_headers(**{"retry-after": when})) <= 30
+    assert retry_after_seconds(error_with_headers()) is None
+    assert retry_after_seconds(ValueError()) is None
+
+
+def test_token_bucket_allows_a_burst_then_refills_at_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock)
+    assert bucket.capacity == 60
+    asyncio.run(bucket.acquire(60))
+    assert bucket.available == 0
+    clock.now = 1
+    bucket._refill()
+    assert bucket.available == 10
+    bucket.refund(100)
+    assert bucket.available == 60
+
+
+def test_oversized_acquire_is_capped_at_the_burst_size():
+    bucket = TokenBucket(600, clock=FakeClock())
+    asyncio.run(asyncio.wait_for(bucket.acquire(10_000), timeout=1))
+    assert bucket.available == 0
+
+
+def test_rate_limiter_pause_and_reconcile():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+    limiter.pause(5)
+    limiter.pause(1)
+    assert limiter._paused_until == 5
+    asyncio.run(limiter.tokens.acquire(500))
+    limiter.reconcile(500, 200)
+    assert limiter.tokens.available == 600 - 200
+
+
+def check(stub, calls, **options):
+    checker = BulkComplianceChecker(stub.url, "test", "gpt-4", base_delay=0.01, **options)
+    return {result.call_id: result for result in checker.iter_results(calls)}
+
+
+def test_rate_limited_calls_are_retried_until_they_succeed():
+    calls = [(f"call-{i}", [f"Phrase {i}."]) for i in range(12)]
+    with StubOpenAI(latency=0, tokens_per_second=10_000, completion_tokens=5, rate_limit_ratio=0.3,
+                    retry_after=0.01, seed=3) as stub:
+        results = check(stub, calls, concurrency=4)
+    assert sorted(results) == sorted(call_id for call_id, _ in calls)
+    assert all(result.ok and result.compliance for result in results.values())
+    assert sum(result.rate_limited for result in results.values()) == stub.rate_limited > 0
+    assert sum(r.attempts - r.requests for r in results.values()) == stub.rate_limited
+
+
+def test_giving_up_is_reported_per_call():
+    with StubOpenAI(latency=0, rate_limit_ratio=1.0, retry_after=0.01) as stub:
+        results = check(stub, [("call", ["Hello."])], max_retries=2)
+    assert not results["call"].ok
+    assert results["call"].error.startswith("Gave up after 3 attempts")
+
+
+@pytest.mark.parametrize("max_chunk_tokens", [None, 50])
+def test_long_transcripts_are_checked_chunk_by_chunk(max_chunk_tokens):
+    transcript = [f"Phrase {i} of a long call about booking a resort in Aruba." for i in range(12)]
+    chunks = len(split_transcript(transcript, max_chunk_tokens)) if max_chunk_tokens else 1
+    assert chunks > 1 or max_chunk_tokens is None
+    # Three questions per chunk, then one request to merge them.
+    expected_requests = 1 if chunks == 1 else chunks * 3 + 1
+    with StubOpenAI(latency=0, tokens_per_second=10_000, completion_tokens=5) as stub:
+        results = check(stub, [("long", transcript)], max_chunk_tokens=max_chunk_tokens)
+        assert stub.requests == expected_requests
+    assert results["long"].ok and results["long"].requests == expected_requests
@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace as NS
+
+from services.call_analytics import ACTIONS, analyze_call, run_call_analysis
+
+
+def scores(positive, neutral, negative):
+    return NS(positive=positive, neutral=neutral, negative=negative)
+
+
+class FakeLanguageClient:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.jobs = []
+
+    def begin_analyze_actions(self, documents, actions, polling_interval):
+        self.jobs.append((documents, [type(action).__name__ for action in actions]))
+        results = {
+            "ExtractiveSummaryAction": NS(is_error=False, sentences=[NS(text="Guest called."), NS(text="Booked.")]),
+            "AbstractiveSummaryAction": NS(is_error=False, summaries=[NS(text="A booking call.")]),
+            "AnalyzeSentimentAction": NS(
+                is_error=False, sentiment="positive", confidence_scores=scores(0.912, 0.05, 0.038),
+                sentences=[NS(text="Great stay.", sentiment="positive", confidence_scores=scores(0.9, 0.1, 0.0),
+                              mined_opinions=[NS(target=NS(text="stay", sentiment="positive",
+                                                           confidence_scores=scores(0.99, 0, 0.01)),
+                                                 assessments=[NS(text="great", sentiment="positive",
+                                                                 confidence_scores=scores(0.98, 0, 0.02))])])],
+            ),
+            "RecognizeEntitiesAction": NS(is_error=False, entities=[
+                NS(text="Contoso", category="Organization", subcategory=None, length=7, offset=0, confidence_score=0.97),
+            ]),
+        }
+        action_results = [
+            NS(is_error=True, error=NS(code="InvalidRequest", message="Too long"))
+            if name in self.failing else results[name]
+            for name in self.jobs[-1][1]
+        ]
+        return NS(result=lambda: iter([action_results]))
+
+
+def test_all_actions_run_in_one_job_over_the_joined_transcript():
+    client = FakeLanguageClient()
+    results = analyze_call(client, ["Hello.", "Great stay."])
+    assert len(client.jobs) == 1
+    assert client.jobs[0][0] == ["Hello. Great stay."]
+    assert list(results) == ACTIONS
+    assert results["extractive-summary"] == {"call-summary": "Guest called. Booked."}
+    assert results["abstractive-summary"] == {"call-summary": "A booking call."}
+    assert results["sentiment"]["sentiment-scores"] == {"positive": 0.91, "neutral": 0.05, "negative": 0.04}
+    opinion = results["sentiment"]["sentences"][0]["mined_opinions"][0]
+    assert opinion["sentiment-scores"] == {"positive": 0.99, "negative": 0.01}
+    assert opinion["assessments"][0]["text"] == "great"
+    assert results["named-entities"][0]["category"] == "Organization"
+
+
+def test_a_failed_action_does_not_hide_the_others():
+    client = FakeLanguageClient(failing={"AnalyzeSentimentAction"})
+    results = analyze_call(client, ["Hello."], actions=["sentiment", "named-entities"])
+    assert results["sentiment"] == {"error": "InvalidRequest: Too long"}
+    assert results["named-entities"][0]["text"] == "Contoso"
+
+
+def test_query_summary_runs_alongside_the_language_job():
+    started = threading.Event()
+
+    def query_summary(call_contents):
+        started.set()
+        return {"summary": len(call_contents)}
+
+    class WaitingClient(FakeLanguageClient):
+        def begin_analyze_actions(self, documents, actions, polling_interval):
+            # The Language job only finishes once the OpenAI summary has started.
+            assert started.wait(5)
+            return super().begin_analyze_actions(documents, actions, polling_interval)
+
+    results = run_call_analysis(WaitingClient(), ["a", "b"], actions=["named-entities"], query_summary_fn=query_summary)
+    assert results["query-based-summary"] == {"summary": 2}
+    assert "named-entities" in results
+
+    only_summary = run_call_analysis(FakeLanguageClient(), ["a"], actions=[], query_summary_fn=query_summary)
+    assert only_summary == {"query-based-summary": {"summary": 1}}
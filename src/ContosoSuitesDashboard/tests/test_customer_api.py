@@ -0,0 +1,91 @@
+import asyncio
+import io
+
+import pytest
+import requests
+
+from benchmarks.stubs import StubCustomerApi, synthetic_customers
+from services.customer_api import AsyncCustomerApiClient, CustomerApiClient, read_customers
+
+
+class UnpagedCustomerApi(StubCustomerApi):
+    # An older API that ignores skip and take and returns every match.
+    def query(self, query):
+        return super().query({k: v for k, v in query.items() if k not in ("skip", "take")})
+
+
+@pytest.fixture
+def customers():
+    return synthetic_customers(250)
+
+
+def gold(customers):
+    return sorted(c["FullName"] for c in customers if c["LoyaltyTier"] == "Gold")
+
+
+def test_read_customers_handles_empty_responses():
+    assert list(read_customers(b"[]").columns)[:3] == ["FirstName", "LastName", "FullName"]
+    assert len(read_customers(b"")) == 0
+    assert len(read_customers(io.BytesIO(b' [ ] '))) == 0
+
+
+def test_pages_are_fetched_until_the_results_run_out(customers):
+    with StubCustomerApi(customers) as stub:
+        client = CustomerApiClient(stub.url, page_size=10)
+        pages = list(client.iter_customer_pages("LoyaltyTier", "Gold"))
+        assert all(len(page) <= 10 for page in pages)
+        frame = client.get_customers("LoyaltyTier", "Gold")
+        assert sorted(frame["FullName"]) == gold(customers)
+        assert len(client.get_customers("LoyaltyTier", "Gold", max_rows=25)) == 25
+        client.close()
+
+
+def test_pages_are_parsed_from_the_response_stream(customers, monkeypatch):
+    def buffered(response):
+        raise AssertionError("the whole response body was buffered")
+
+    monkeypatch.setattr(requests.Response, "content", property(buffered))
+    with StubCustomerApi(customers) as stub:
+        client = CustomerApiClient(stub.url, page_size=1000)
+        assert sorted(client.get_customers("LoyaltyTier", "Gold")["FullName"]) == gold(customers)
+        assert len(client.get_customers("CustomerName", "Nobody")) == 0
+        client.close()
+
+
+@pytest.mark.parametrize("max_rows", [None, 5, 25, 1000])
+def test_unpaged_api_honours_max_rows(customers, max_rows):
+    expected = len(gold(customers)) if max_rows is None else min(max_rows, len(gold(customers)))
+    with UnpagedCustomerApi(customers) as stub:
+        client = CustomerApiClient(stub.url, page_size=10)
+        frame = client.get_customers("LoyaltyTier", "Gold", max_rows=max_rows)
+        assert len(frame) == expected
+        assert frame["FullName"].is_unique
+        client.close()
+
+
+def test_unpaged_api_returning_exactly_one_page_is_not_repeated(customers):
+    count = len(gold(customers))
+    with UnpagedCustomerApi(customers) as stub:
+        client = CustomerApiClient(stub.url, page_size=count)
+        assert len(client.get_customers("LoyaltyTier", "Gold")) == count
+        assert stub.requests == 2
+        client.close()
+
+
+def test_async_client_pages_like_the_sync_client(customers):
+    async def fetch(url):
+        client = AsyncCustomerApiClient(url, page_size=10)
+        try:
+            paged = await client.get_customers("LoyaltyTier", "Gold", max_rows=25)
+            everything = await client.get_customers("LoyaltyTier", "Gold")
+        finally:
+            await client.close()
+        return paged, everything
+
+    with StubCustomerApi(customers) as stub:
+        paged, everything = asyncio.run(fetch(stub.url))
+    assert len(paged) == 25
+    assert sorted(everything["FullName"]) == gold(customers)
+    with UnpagedCustomerApi(customers) as stub:
+        paged, everything = asyncio.run(fetch(stub.url))
+    assert len(paged) == 25 and len(everything) == len(gold(customers))
@@ -0,0 +1,97 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.customer_stats import CustomerStatsViews
+
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+
+
+def make_customers(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "LoyaltyTier": rng.choice(TIERS),
+            "YearsAsMember": rng.randint(0, 30),
+            "DateOfMostRecentStay": (date(2022, 1, 1) + timedelta(days=rng.randint(0, 900))).isoformat(),
+            "AverageRating": round(rng.uniform(1, 5), 1),
+        }
+        for _ in range(count)
+    ]
+
+
+def build(customers):
+    views = CustomerStatsViews(capacity=4)
+    for customer in customers:
+        views.apply(None, customer)
+    return views
+
+
+def expected(customers, keys):
+    # The same roll-up computed directly over the customer rows.
+    frame = pd.DataFrame(customers)
+    frame["Band"] = frame["YearsAsMember"] // 5 * 5
+    grouped = frame.groupby(keys, sort=True)["AverageRating"]
+    return pd.DataFrame({
+        "Customers": grouped.size(),
+        "AverageRating": grouped.mean().round(2),
+        "MinRating": grouped.min(),
+        "MedianRating": grouped.apply(lambda ratings: sorted(ratings)[(len(ratings) - 1) // 2]),
+        "MaxRating": grouped.max(),
+    }).reset_index()
+
+
+def test_roll_ups_match_a_direct_aggregation():
+    customers = make_customers(500)
+    views = build(customers)
+    assert len(views) == 500
+
+    by_tier = views.query(group_by=["LoyaltyTier"])
+    assert list(by_tier["LoyaltyTier"]) == TIERS
+    direct = expected(customers, ["LoyaltyTier"]).set_index("LoyaltyTier").loc[TIERS].reset_index()
+    for column in ("Customers", "AverageRating", "MinRating", "MedianRating", "MaxRating"):
+        np.testing.assert_allclose(by_tier[column], direct[column])
+
+    by_band = views.query(group_by=["YearsAsMember"])
+    direct = expected(customers, ["Band"])
+    assert list(by_band["YearsAsMember"]) == [f"{band}-{band + 4}" for band in direct["Band"]]
+    np.testing.assert_array_equal(by_band["Customers"], direct["Customers"])
+    np.testing.assert_allclose(by_band["MedianRating"], direct["MedianRating"])
+
+
+def test_filters_are_applied_before_rolling_up():
+    customers = make_customers(300, seed=3)
+    views = build(customers)
+    total = views.query(loyalty_tier=" gold ", min_years=20, stayed_before="2023-06-01")
+    matching = [c for c in customers if c["LoyaltyTier"] == "Gold" and c["YearsAsMember"] >= 20
+                and c["DateOfMostRecentStay"] < "2023-06-01"]
+    assert total.loc[0, "Customers"] == len(matching)
+    assert total.loc[0, "LatestStay"] == max(c["DateOfMostRecentStay"] for c in matching)
+
+    by_month = views.query(group_by=["StayMonth"], stayed_after="2024-05-31")
+    assert all(month >= "2024-06" for month in by_month["StayMonth"])
+    assert by_month["Customers"].sum() == sum(c["DateOfMostRecentStay"] > "2024-05-31" for c in customers)
+
+
+def test_changes_adjust_the_cells_in_place():
+    customer = {"LoyaltyTier": "Silver", "YearsAsMember": 3, "DateOfMostRecentStay": "2024-02-01", "AverageRating": 4.0}
+    views = build([customer, dict(customer, AverageRating=2.0)])
+    assert views.cells == 1
+    moved = dict(customer, LoyaltyTier="Gold", AverageRating=5.0)
+    views.apply(customer, moved)
+    by_tier = views.query(group_by=["LoyaltyTier"])
+    assert list(by_tier["LoyaltyTier"]) == ["Silver", "Gold"]
+    assert list(by_tier["AverageRating"]) == [2.0, 5.0]
+    views.apply(moved, None)
+    assert list(views.query(group_by=["LoyaltyTier"])["LoyaltyTier"]) == ["Silver"]
+    assert len(views) == 1
+
+
+def test_unknown_dimensions_and_empty_results():
+    views = build(make_customers(10))
+    with pytest.raises(ValueError, match="Cannot group by Nation"):
+        views.query(group_by=["Nation"])
+    assert views.query(group_by=["LoyaltyTier"], loyalty_tier="Diamond").empty
@@ -0,0 +1,70 @@
+import pytest
+
+from services.customer_store import CustomerStore, parse_date
+
+
+def customer(full_name, tier="Gold", stay="2023-06-01"):
+    first, last = full_name.split(" ", 1)
+    return {"FirstName": first, "LastName": last, "FullName": full_name, "LoyaltyTier": tier,
+            "YearsAsMember": 3, "DateOfMostRecentStay": stay, "AverageRating": 4.5}
+
+
+@pytest.fixture
+def store():
+    return CustomerStore([
+        customer("Ana Silva", "Gold", "2023-01-10"),
+        customer("Ana Silvestre", "Silver", "2023-03-01"),
+        customer("Ben Ode", "Platinum", "2023-06-01"),
+        customer("ana silva", "Bronze", "2023-06-02"),
+    ])
+
+
+def names(records):
+    return [r["FullName"] for r in records]
+
+
+def test_parse_date_accepts_several_formats():
+    assert parse_date("2023-06-01T10:00:00Z").isoformat() == "2023-06-01"
+    assert parse_date("June 1, 2023").isoformat() == "2023-06-01"
+
+
+def test_search_matches_the_web_api_exactly(store):
+    assert names(store.search("CustomerName", "Ana Silva")) == ["Ana Silva"]
+    assert store.search("CustomerName", "ana") == []
+    assert names(store.search("LoyaltyTier", "Silver")) == ["Ana Silvestre"]
+    with pytest.raises(ValueError):
+        store.search("LoyaltyTier", "gold")
+    assert names(store.search("DateOfMostRecentStay", "2023-06-01")) == ["ana silva"]
+    with pytest.raises(ValueError):
+        store.search("Email", "x")
+
+
+def test_lenient_lookups_are_available_separately(store):
+    assert sorted(names(store.find_by_name("ANA SILVA"))) == ["Ana Silva", "ana silva"]
+    assert names(store.find_by_name_prefix("ana silv")) == ["Ana Silva", "Ana Silvestre", "ana silva"]
+    assert len(store.find_by_name_prefix("ana", limit=1)) == 1
+    assert names(store.find_by_loyalty_tier("gold")) == ["Ana Silva"]
+    assert names(store.find_with_stays_between("2023-01-10", "2023-06-01")) == ["Ana Silvestre", "Ben Ode"]
+
+
+def test_updates_and_removals_are_reindexed_and_reported(store):
+    changes = []
+    store.add_listener(lambda old, new: changes.append((old and old["FullName"], new and new["FullName"])))
+    assert len(changes) == 4
+    changes.clear()
+    customer_id = store.add(customer("Cy Young", "Bronze"))
+    store.update(customer_id, {"LoyaltyTier": "Gold", "DateOfMostRecentStay": "2024-01-01"})
+    assert names(store.search("LoyaltyTier", "Gold")) == ["Ana Silva", "Cy Young"]
+    assert names(store.search("DateOfMostRecentStay", "2023-12-31")) == ["Cy Young"]
+    store.remove(customer_id)
+    assert store.search("CustomerName", "Cy Young") == []
+    assert changes == [(None, "Cy Young"), ("Cy Young", "Cy Young"), ("Cy Young", None)]
+
+
+def test_snapshot_round_trip(store, tmp_path):
+    path = str(tmp_path / "customers.pkl")
+    store.save_snapshot(path)
+    loaded = CustomerStore.from_snapshot(path)
+    assert len(loaded) == len(store)
+    assert loaded.search("CustomerName", "Ben Ode") == store.search("CustomerName", "Ben Ode")
+    assert "_stay" not in loaded.search("CustomerName", "Ben Ode")[0]
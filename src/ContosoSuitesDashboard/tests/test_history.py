@@ -0,0 +1,85 @@
+import threading
+
+from services.history import ConversationWindow, count_tokens, message_tokens, MESSAGE_OVERHEAD_TOKENS
+
+
+def wait_for_summary(window):
+    pending = window._pending
+    if pending is not None:
+        pending.result(5)
+
+
+def make_messages(count, words=20):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "word " * words}
+            for i in range(count)]
+
+
+def test_message_tokens_are_counted_once_and_cached_on_the_message():
+    message = {"role": "user", "content": "hello there"}
+    assert message_tokens(message) == count_tokens("hello there") + MESSAGE_OVERHEAD_TOKENS
+    message["content"] = "changed " * 100
+    assert message_tokens(message) == count_tokens("hello there") + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_context_keeps_the_newest_messages_within_the_budget():
+    messages = make_messages(20)
+    per_message = message_tokens(messages[-1])
+    window = ConversationWindow(token_budget=per_message * 5 + 1)
+    context = window.context(messages)
+    assert [m["content"] for m in context] == [m["content"] for m in messages[-5:]]
+    assert all("tokens" not in m for m in context)
+
+
+def test_the_newest_message_is_kept_even_over_budget():
+    messages = make_messages(3) + [{"role": "user", "content": "long " * 500}]
+    context = ConversationWindow(token_budget=10).context(messages)
+    assert context == [{"role": "user", "content": "long " * 500}]
+
+
+def test_messages_flagged_out_of_context_are_skipped():
+    messages = make_messages(4)
+    messages[2]["context"] = False
+    context = ConversationWindow(token_budget=10_000).context(messages)
+    assert [m["content"] for m in context] == [messages[i]["content"] for i in (0, 1, 3)]
+
+
+def test_older_messages_are_summarized_in_the_background():
+    done = threading.Event()
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append((previous, len(messages)))
+        done.set()
+        return "the earlier turns"
+
+    messages = make_messages(20)
+    per_message = message_tokens(messages[-1])
+    window = ConversationWindow(token_budget=per_message * 4 + 1, summarize_fn=summarize,
+                                summarize_after_tokens=per_message * 3)
+    first = window.context(messages)
+    assert len(first) == 4
+    assert done.wait(5)
+    wait_for_summary(window)
+    assert calls == [("", 16)]
+    assert window.summarized_upto == 16
+
+    # The summary takes part of the budget, so fewer raw messages fit next to it.
+    second = window.context(messages)
+    assert second[0]["role"] == "system"
+    assert "the earlier turns" in second[0]["content"]
+    assert len(second) - 1 < 4
+    assert second[-1]["content"] == messages[-1]["content"]
+
+
+def test_a_failed_summary_keeps_the_previous_state():
+    def summarize(previous, messages):
+        raise RuntimeError("boom")
+
+    messages = make_messages(10)
+    per_message = message_tokens(messages[-1])
+    window = ConversationWindow(token_budget=per_message * 2 + 1, summarize_fn=summarize, summarize_after_tokens=1)
+    window.context(messages)
+    wait_for_summary(window)
+    assert window.summary == ""
+    assert window.summarized_upto == 0
+    assert window._pending is None
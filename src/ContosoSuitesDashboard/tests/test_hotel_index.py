@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from services.hotel_index import HotelFacetIndex, column_name
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+HOTELS = [
+    {"hotel name": "Oceanview Inn", "resort name": "Aruba Noord", "covered parking": True, "meeting rooms": 2},
+    {"hotel name": "Palm Court", "resort name": "Aruba Noord", "covered parking": False, "meeting rooms": 4},
+    {"hotel name": "Summit House", "resort name": "Aspen Peak", "covered parking": True, "meeting rooms": 0},
+    {"hotel name": "Lonely Motel", "resort name": "Nowhere", "covered parking": True, "meeting rooms": 1},
+]
+RESORTS = [
+    {"resort name": "Aruba Noord", "nation": "Aruba", "city": "Noord", "beachfront": True, "amenities": ["Spa", "Pool"]},
+    {"resort name": "Aspen Peak", "nation": "USA", "city": "Aspen", "beachfront": False, "amenities": ["Ski", "spa"]},
+]
+
+
+@pytest.fixture
+def index():
+    return HotelFacetIndex(HOTELS, RESORTS)
+
+
+def test_column_names_are_normalized():
+    assert column_name("EV charging available") == "ev_charging_available"
+    assert column_name("self-parking") == "self_parking"
+
+
+def test_columns_are_classified_by_type(index):
+    assert len(index) == 4
+    assert set(index.features) == {"covered_parking", "beachfront"}
+    assert set(index.numeric) == {"meeting_rooms"}
+    assert [name.lower() for name in index.amenity_names] == ["pool", "ski", "spa"]
+
+
+def test_predicates_are_combined(index):
+    def names(**predicates):
+        return list(index.search(**predicates)["hotel_name"])
+
+    assert names(features=["covered_parking"]) == ["Oceanview Inn", "Summit House", "Lonely Motel"]
+    assert names(features=["beachfront"]) == ["Oceanview Inn", "Palm Court"]
+    assert names(amenities=["SPA"]) == ["Oceanview Inn", "Palm Court", "Summit House"]
+    assert names(categories={"nation": "aruba"}, ranges={"meeting_rooms": (3, None)}) == ["Palm Court"]
+    assert names(ranges={"meeting_rooms": (None, 1)}) == ["Summit House", "Lonely Motel"]
+    assert names(features=["covered_parking"], amenities=["spa"], limit=1) == ["Oceanview Inn"]
+    # Unknown features, amenities and category values match nothing.
+    assert names(features=["helipad"]) == []
+    assert names(amenities=["Casino"]) == []
+    assert names(categories={"city": "Paris"}) == []
+
+
+def test_results_join_amenities_into_one_string(index):
+    result = index.search(categories={"hotel_name": "summit house"})
+    assert result.loc[0, "amenities"] == "Ski, spa"
+    assert index.search(categories={"hotel_name": "lonely motel"}).loc[0, "amenities"] == ""
+
+
+def test_search_matches_a_plain_dataframe_filter_on_the_sample_data():
+    with open(os.path.join(DATA, "Hotels.txt")) as f:
+        hotels = json.load(f)
+    with open(os.path.join(DATA, "Resorts.txt")) as f:
+        resorts = json.load(f)
+    index = HotelFacetIndex(hotels, resorts)
+    frame = index.frame
+    expected = frame[
+        frame["ev_charging_available"].astype(bool)
+        & frame["covered_parking"].astype(bool)
+        & (frame["meeting_rooms"] >= 2)
+        & frame["amenities"].map(lambda values: "pool" in [v.lower() for v in values])
+    ]
+    result = index.search(features=["ev_charging_available", "covered_parking"], amenities=["Pool"],
+                          ranges={"meeting_rooms": (2, None)})
+    assert list(result["hotel_name"]) == list(expected["hotel_name"])
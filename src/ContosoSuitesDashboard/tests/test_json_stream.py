@@ -0,0 +1,78 @@
+import json
+import random
+
+import pytest
+
+from services.analysis_cache import AnalysisCache
+from services.json_stream import JsonFieldParser, json_fields
+
+DOCUMENT = {
+    "call-title": "Booking a \"sea view\" room",
+    "call-reason": "Reservation {change} [urgent] \\ path",
+    "customer-sentiment": 0.75,
+    "resolved": True,
+    "follow-up": None,
+    "negative": -12e-1,
+    "topics": ["booking", {"nested": ["}", "]", "\\\""]}],
+    "details": {"nights": 3, "notes": "unicode é 🏖"},
+}
+
+
+def chunks(text, seed):
+    # Split text into random pieces, like streamed deltas.
+    rng = random.Random(seed)
+    pieces, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        pieces.append(text[position:position + size])
+        position += size
+    return pieces
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("indent", [None, 2])
+def test_fields_match_json_loads_however_the_text_is_split(seed, indent):
+    text = "```json\n" + json.dumps(DOCUMENT, indent=indent, ensure_ascii=seed % 2 == 0) + "\n```"
+    assert list(json_fields(chunks(text, seed))) == list(json.loads(json.dumps(DOCUMENT)).items())
+
+
+def test_each_field_is_reported_as_soon_as_it_is_complete():
+    parser = JsonFieldParser()
+    assert parser.feed('{"title": "Late check') == []
+    assert parser.feed('out", "count": 4') == [("title", "Late checkout")]
+    # A number is only complete once the next character shows it has ended.
+    assert parser.feed("2") == []
+    assert parser.feed("}") == [("count", 42)]
+    assert parser.done
+    assert parser.close() == {"title": "Late checkout", "count": 42}
+
+
+def test_cut_off_and_malformed_objects_are_errors():
+    with pytest.raises(ValueError, match="ended before it was complete"):
+        list(json_fields(['{"title": "Late', ' checkout"']))
+    with pytest.raises(ValueError, match="Expected a field name"):
+        JsonFieldParser().feed("{title: 1}")
+    with pytest.raises(ValueError, match="Expected ':'"):
+        JsonFieldParser().feed('{"title" 1}')
+    with pytest.raises(ValueError, match="Expected ','"):
+        JsonFieldParser().feed('{"a": "x" "b": 2}')
+
+
+def test_memoized_fields_are_replayed_and_only_complete_answers_are_cached():
+    cache = AnalysisCache(None)
+    calls = []
+
+    @cache.memoize_fields("call-fields", model="m")
+    def stream_fields(call_contents, cut_off):
+        calls.append(cut_off)
+        deltas = ['{"title": "Hi", ', '"summary": "A call"}']
+        yield from json_fields(deltas[:1] if cut_off else deltas)
+
+    with pytest.raises(ValueError):
+        list(stream_fields(["hello"], True))
+    assert stream_fields.cached(["hello"], True) is None
+
+    assert list(stream_fields(["hello"], False)) == [("title", "Hi"), ("summary", "A call")]
+    assert list(stream_fields(["hello"], False)) == [("title", "Hi"), ("summary", "A call")]
+    assert stream_fields.cached(["hello"], False) == {"title": "Hi", "summary": "A call"}
+    assert calls == [True, False]
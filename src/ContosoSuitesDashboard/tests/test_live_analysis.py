@@ -0,0 +1,116 @@
+import threading
+
+from services.live_analysis import LiveCallMonitor, TranscriptBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def record_batches():
+    batches = []
+
+    def analyze(context, new_utterances, start, state):
+        batches.append((list(context), list(new_utterances), start))
+        return [{"start": start}]
+
+    return batches, analyze
+
+
+def test_transcript_buffer_since_returns_new_items_and_cursor():
+    buffer = TranscriptBuffer()
+    buffer.append("a")
+    buffer.append("b")
+    items, cursor = buffer.since(0)
+    assert items == ["a", "b"] and cursor == 2
+    buffer.append("c")
+    assert buffer.since(cursor) == (["c"], 3)
+
+
+def test_waits_for_the_debounce_then_analyzes_with_context():
+    clock = FakeClock()
+    batches, analyze = record_batches()
+    monitor = LiveCallMonitor(analyze, context_utterances=1, max_batch=8, debounce_seconds=5,
+                              max_wait_seconds=15, clock=clock)
+    monitor.add("one")
+    monitor.add("two")
+    assert not monitor._ready()
+    clock.now = 5
+    assert monitor._ready()
+    monitor._analyze_pending()
+    monitor.add("three")
+    clock.now = 10
+    monitor._analyze_pending()
+    assert batches == [([], ["one", "two"], 0), (["two"], ["three"], 2)]
+    assert monitor.alerts_since(0) == ([{"start": 0}, {"start": 2}], 2)
+
+
+def test_max_wait_analyzes_a_caller_who_never_pauses():
+    clock = FakeClock()
+    batches, analyze = record_batches()
+    monitor = LiveCallMonitor(analyze, max_batch=100, debounce_seconds=5, max_wait_seconds=15, clock=clock)
+    for second in range(16):
+        clock.now = second
+        monitor.add(f"utterance {second}")
+    assert monitor._ready()
+
+
+def test_full_batch_is_ready_at_once_and_leftovers_keep_waiting():
+    clock = FakeClock()
+    batches, analyze = record_batches()
+    monitor = LiveCallMonitor(analyze, max_batch=2, debounce_seconds=5, max_wait_seconds=15, clock=clock)
+    for text in ("a", "b", "c"):
+        monitor.add(text)
+    assert monitor._ready()
+    monitor._analyze_pending()
+    assert batches[0][1] == ["a", "b"]
+    assert monitor._first_pending == clock.now
+
+
+def test_pending_utterance_without_timestamps_does_not_break_ready():
+    # The state an utterance appended during _analyze_pending used to leave behind.
+    monitor = LiveCallMonitor(lambda *args: [], clock=FakeClock())
+    monitor.transcript.append("late")
+    assert monitor._first_pending is None and monitor._last_added is None
+    assert monitor._ready() is False
+
+
+def test_failed_analysis_is_recorded_and_monitoring_continues():
+    def analyze(context, new_utterances, start, state):
+        raise RuntimeError("boom")
+
+    monitor = LiveCallMonitor(analyze, clock=FakeClock())
+    monitor.add("hello")
+    monitor._analyze_pending()
+    assert monitor.errors == ["Live analysis of utterances 0-0 failed: boom"]
+    assert monitor.analyzed == 1 and monitor.analyses == 1
+
+
+def test_concurrent_adds_are_all_analyzed_once():
+    seen = []
+    lock = threading.Lock()
+
+    def analyze(context, new_utterances, start, state):
+        with lock:
+            seen.extend(new_utterances)
+        return []
+
+    monitor = LiveCallMonitor(analyze, max_batch=3, debounce_seconds=0.001, max_wait_seconds=0.002).start()
+
+    def speak(speaker):
+        for i in range(200):
+            monitor.add(f"{speaker}-{i}")
+
+    speakers = [threading.Thread(target=speak, args=(name,)) for name in ("agent", "caller")]
+    for thread in speakers:
+        thread.start()
+    for thread in speakers:
+        thread.join()
+    monitor.stop()
+    assert not monitor.errors
+    assert sorted(seen) == sorted(monitor.transcript.items)
+    assert len(seen) == 400
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from services import local_search
+from services.local_search import LocalSearchIndex, analyze, format_passages, get_local_search_index, load_passages
+
+HOTELS = [
+    {"hotel name": "Harbor View", "city": "Seattle", "amenities": ["pool", "spa"], "pet friendly": True},
+    {"hotel name": "Desert Rose", "city": "Phoenix", "amenities": ["golf"], "pet friendly": False},
+    {"hotel name": "Pine Lodge", "city": "Denver", "amenities": ["ski storage", "fireplace"], "pet friendly": True},
+]
+FAQ = "Check-in starts at 3 PM.\n\nCheck-out is at 11 AM.\n\nParking costs $20 per night at every hotel."
+
+
+@pytest.fixture
+def sources(tmp_path):
+    (tmp_path / "Hotels.txt").write_text(json.dumps(HOTELS), encoding="utf-8")
+    faqs = tmp_path / "faqs"
+    faqs.mkdir()
+    (faqs / "policies.md").write_text(FAQ, encoding="utf-8")
+    (faqs / "ignored.csv").write_text("not,indexed", encoding="utf-8")
+    return [str(tmp_path / "Hotels.txt"), str(faqs)]
+
+
+def test_analyzer_drops_stop_words_and_plurals():
+    assert analyze("What are the Pools and Spas in Seattle?") == ["pool", "spa", "seattle"]
+    assert analyze("glass bus") == ["glass", "bus"]
+
+
+def test_records_and_text_files_become_passages(sources):
+    passages = load_passages(sources)
+    assert [p.title for p in passages] == ["Harbor View", "Desert Rose", "Pine Lodge", "policies"]
+    assert "Amenities: pool, spa." in passages[0].text
+    assert "Pet friendly: yes." in passages[0].text
+    assert passages[3].text == FAQ.replace("\n\n", "\n")
+
+
+def test_search_ranks_the_matching_passages_first(sources):
+    index = LocalSearchIndex(load_passages(sources))
+    results = index.search("Which hotels have a spa?", top_k=2)
+    assert results[0][0].title == "Harbor View"
+    assert index.search("parking price")[0][0].title == "policies"
+    assert index.search("the and of") == []
+    assert format_passages(results[:1]).startswith("[doc1] Harbor View\n")
+
+
+def test_the_persisted_index_is_reused_until_a_source_changes(sources, tmp_path, monkeypatch):
+    monkeypatch.setattr(local_search, "_indexes", {})
+    index_path = str(tmp_path / "index" / "local.pkl")
+    first = get_local_search_index(sources, index_path)
+    assert os.path.exists(index_path)
+
+    monkeypatch.setattr(local_search, "_indexes", {})
+    loaded = get_local_search_index(sources, index_path)
+    assert loaded is not first and loaded.version == first.version
+    assert get_local_search_index(sources, index_path) is loaded
+
+    faq = os.path.join(sources[1], "policies.md")
+    with open(faq, "a", encoding="utf-8") as f:
+        f.write("\n\nLate check-out is available for Platinum members.")
+    rebuilt = get_local_search_index(sources, index_path)
+    assert rebuilt.version != loaded.version
+    assert rebuilt.search("late checkout platinum")[0][0].title == "policies"
+
+
+def test_the_default_sources_include_the_faq_directory(monkeypatch):
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(app_dir, "config.json")) as f:
+        sources = json.load(f)["LocalSearch"]["Sources"]
+    monkeypatch.chdir(app_dir)
+    assert "../data/faq" in sources
+    passages = load_passages(sources)
+    assert {passage.source for passage in passages} >= {"../data/Hotels.txt", "../data/Resorts.txt"}
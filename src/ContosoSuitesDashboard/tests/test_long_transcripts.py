@@ -0,0 +1,58 @@
+import random
+import time
+
+from services.analysis_cache import AnalysisCache
+from services.history import count_tokens
+from services.long_transcripts import _split_utterance, map_chunks, split_transcript
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(["room", "booking", "Caribbean", "a", "spa,", "Barbados.", "12", "reservation?"])
+            for _ in range(count)]
+
+
+def test_split_utterance_respects_the_budget_and_keeps_every_word():
+    words = random_words(500)
+    pieces = _split_utterance(" ".join(words), 40)
+    assert all(count_tokens(piece) <= 40 for piece in pieces)
+    assert " ".join(pieces).split() == words
+    # Pieces are filled up, give or take the estimate's rounding.
+    assert all(count_tokens(piece) > 40 // 2 for piece in pieces[:-1])
+
+
+def test_a_word_longer_than_the_budget_is_its_own_piece():
+    assert _split_utterance("hi " + "x" * 100 + " there", 5) == ["hi", "x" * 100, "there"]
+
+
+def test_split_utterance_is_linear_in_length():
+    utterance = " ".join(random_words(50_000))
+    started = time.perf_counter()
+    pieces = _split_utterance(utterance, 200)
+    assert time.perf_counter() - started < 2
+    assert len(pieces) > 100
+
+
+def test_split_transcript_keeps_utterances_whole_when_they_fit():
+    transcript = ["Hello, thanks for calling Contoso Suites."] * 30 + [" ".join(random_words(300))]
+    chunks = split_transcript(transcript, 60)
+    assert all(sum(count_tokens(u) + 1 for u in chunk) <= 60 for chunk in chunks)
+    assert [u for chunk in chunks for u in chunk][:30] == transcript[:30]
+    assert " ".join(u for chunk in chunks for u in chunk) == " ".join(transcript)
+    assert split_transcript(["short"], 60) == [["short"]]
+
+
+def test_map_chunks_returns_results_in_order_and_caches_each_chunk():
+    cache = AnalysisCache(None)
+    calls = []
+
+    def summarize(chunk, index, count):
+        calls.append(index)
+        return f"{index + 1}/{count}: {len(chunk)}"
+
+    chunks = [["a"], ["b", "c"], ["d"]]
+    assert map_chunks(chunks, summarize, cache, "summary", model="m") == ["1/3: 1", "2/3: 2", "3/3: 1"]
+    assert map_chunks(chunks, summarize, cache, "summary", model="m") == ["1/3: 1", "2/3: 2", "3/3: 1"]
+    assert sorted(calls) == [0, 1, 2]
+    map_chunks(chunks, summarize, cache, "summary", model="other")
+    assert len(calls) == 6
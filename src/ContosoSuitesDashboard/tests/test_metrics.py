@@ -0,0 +1,77 @@
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from services.metrics import CONTENT_TYPE, Histogram, LATENCY_BUCKETS, MetricsRegistry
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    with registry.span("work") as span:
+        span.mark("first_token")
+    registry.observe("work_seconds", 1.0)
+    registry.increment("work_errors")
+    assert registry.summary() == []
+    assert registry.to_openmetrics() == "# EOF\n"
+
+
+def test_quantiles_use_the_recent_window():
+    histogram = Histogram(LATENCY_BUCKETS, window=4)
+    assert histogram.quantile(0.5) is None
+    for value in (100, 1, 2, 3, 4):
+        histogram.observe(value)
+    assert histogram.count == 5
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(0.95) == 4
+
+
+def test_spans_time_work_marks_and_errors():
+    registry = MetricsRegistry(enabled=True)
+    with registry.span("query", kind="chat") as span:
+        span.mark("first_token")
+    with pytest.raises(RuntimeError):
+        with registry.span("query", kind="chat"):
+            raise RuntimeError("boom")
+    rows = {row["metric"]: row["count"] for row in registry.summary()}
+    assert rows == {'query_first_token_seconds{kind="chat"}': 1, 'query_seconds{kind="chat"}': 2}
+    assert 'contoso_query_errors_total{kind="chat"} 1' in registry.to_openmetrics()
+
+
+def test_stream_stats_are_recorded_without_a_missing_first_token():
+    registry = MetricsRegistry(enabled=True)
+    registry.record_stream("chat", SimpleNamespace(total_time=1.5, time_to_first_token=None, tokens_per_second=None))
+    assert [row["metric"] for row in registry.summary()] == ["chat_seconds"]
+
+
+def test_openmetrics_export_has_cumulative_buckets_and_escaped_labels():
+    registry = MetricsRegistry(enabled=True)
+    registry.observe("tool_seconds", 0.02, {"tool": 'say "hi"'})
+    registry.observe("tool_seconds", 0.2, {"tool": 'say "hi"'})
+    registry.observe("realtime_factor", 3.0)
+    text = registry.to_openmetrics()
+    lines = text.splitlines()
+    assert "# TYPE contoso_tool_seconds histogram" in lines
+    assert "# UNIT contoso_tool_seconds seconds" in lines
+    assert 'contoso_tool_seconds_bucket{tool="say \\"hi\\"",le="0.01"} 0' in lines
+    assert 'contoso_tool_seconds_bucket{tool="say \\"hi\\"",le="0.025"} 1' in lines
+    assert 'contoso_tool_seconds_bucket{tool="say \\"hi\\"",le="+Inf"} 2' in lines
+    assert 'contoso_tool_seconds_count{tool="say \\"hi\\""} 2' in lines
+    assert 'contoso_realtime_factor_bucket{le="5.0"} 1' in lines
+    assert "# UNIT contoso_realtime_factor seconds" not in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_metrics_are_served_over_http():
+    registry = MetricsRegistry(enabled=True)
+    registry.observe("request_seconds", 0.1)
+    server = registry.serve(0)
+    try:
+        assert registry.serve(0) is server
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert b"contoso_request_seconds_count 1" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.stubs import StubOpenAI
+from services import openai_clients
+from services.openai_clients import (
+    aclose_all,
+    close_all,
+    configure_pool,
+    get_async_openai_client,
+    get_openai_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    settings = dict(openai_clients._pool_settings)
+    yield
+    close_all()
+    openai_clients._pool_settings.update(settings)
+
+
+def test_clients_are_shared_per_deployment_and_key():
+    client = get_openai_client("https://aoai.invalid/", "key", "gpt-4")
+    assert get_openai_client("https://aoai.invalid", "key", "gpt-4") is client
+    assert get_openai_client("https://aoai.invalid", "rotated", "gpt-4") is not client
+    assert get_openai_client("https://aoai.invalid", "key", "gpt-35") is not client
+
+
+def test_flavors_use_their_own_base_urls():
+    chat = get_openai_client("https://aoai.invalid", "key", "gpt-4")
+    extensions = get_openai_client("https://aoai.invalid", "key", "gpt-4", flavor="extensions")
+    assert str(chat.base_url) == "https://aoai.invalid/openai/deployments/gpt-4/"
+    assert str(extensions.base_url) == "https://aoai.invalid/openai/deployments/gpt-4/extensions/"
+    with pytest.raises(ValueError):
+        get_openai_client("https://aoai.invalid", "key", "gpt-4", flavor="other")
+
+
+def test_concurrent_first_use_creates_one_client():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: get_openai_client("https://aoai.invalid", "key", "race"), range(32)))
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_configure_pool_applies_to_new_clients_and_rejects_unknown_settings():
+    configure_pool(max_retries=5)
+    assert get_openai_client("https://aoai.invalid", "key", "retries").max_retries == 5
+    with pytest.raises(ValueError):
+        configure_pool(max_conections=10)
+
+
+def test_async_clients_are_per_event_loop():
+    async def get_twice():
+        first = get_async_openai_client("https://aoai.invalid", "key", "gpt-4")
+        second = get_async_openai_client("https://aoai.invalid", "key", "gpt-4")
+        await aclose_all()
+        return first, second
+
+    first, second = asyncio.run(get_twice())
+    assert first is second
+    other, _ = asyncio.run(get_twice())
+    assert other is not first
+
+
+def test_pooled_client_talks_to_the_deployment():
+    with StubOpenAI(latency=0, tokens_per_second=10_000, content="Hello there") as stub:
+        client = get_openai_client(stub.url, "key", "gpt-4")
+        for _ in range(3):
+            response = client.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "Hi"}])
+            assert response.choices[0].message.content == "Hello there"
+        assert stub.requests == 3
@@ -0,0 +1,85 @@
+import zlib
+
+import numpy as np
+
+from services.response_cache import ResponseCache, normalize_text
+
+
+def bag_of_words(text):
+    # A deterministic stand-in for an embedding model: hashed word counts.
+    vector = np.zeros(256)
+    for word in text.split():
+        vector[zlib.crc32(word.encode("utf-8")) % 256] += 1
+    return vector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def conversation(*turns):
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": text} for i, text in enumerate(turns)]
+
+
+previous_answer = " ".join(["Our resorts in Aruba, Barbados and Jamaica all have spas and pools."] * 20)
+
+
+def test_normalize_text():
+    assert normalize_text("  Which  Hotels\nhave a SPA?? ") == "which hotels have a spa"
+
+
+def test_exact_hit_ignores_case_whitespace_and_punctuation():
+    cache = ResponseCache()
+    cache.put(conversation("Which hotels have a spa?"), "hotels", "Three do.")
+    assert cache.get(conversation("which hotels  have a spa"), "hotels") == "Three do."
+    assert cache.get(conversation("Which hotels have a spa?"), "resorts") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_distinct_follow_ups_after_the_same_turn_do_not_share_answers():
+    cache = ResponseCache(embed_fn=bag_of_words)
+    first = conversation("Which resorts have a spa?", previous_answer, "How much does the spa cost in Aruba?")
+    second = conversation("Which resorts have a spa?", previous_answer, "Is the Jamaica pool heated?")
+    cache.put(first, "hotels", "The Aruba spa costs $200.")
+    assert cache.get(second, "hotels") is None
+    assert cache.stats()["semantic_hits"] == 0
+
+
+def test_similar_follow_up_hits_only_with_the_same_context():
+    cache = ResponseCache(embed_fn=bag_of_words, similarity_threshold=0.9)
+    cache.put(conversation("Which resorts have a spa?", previous_answer,
+                           "how much does the spa cost in aruba per day"), "hotels", "$200.")
+    rephrased = conversation("Which resorts have a spa?", previous_answer,
+                             "how much does the spa cost per day in aruba")
+    assert cache.get(rephrased, "hotels") == "$200."
+    other_context = conversation("Which resorts have a gym?", "Only Aruba.",
+                                 "how much does the spa cost per day in aruba")
+    assert cache.get(other_context, "hotels") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_entries_expire_and_are_evicted_lru_first():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl=10, clock=clock)
+    cache.put(conversation("a"), "hotels", "A")
+    cache.put(conversation("b"), "hotels", "B")
+    cache.get(conversation("a"), "hotels")
+    cache.put(conversation("c"), "hotels", "C")
+    assert cache.get(conversation("b"), "hotels") is None
+    assert cache.get(conversation("a"), "hotels") == "A"
+    clock.now = 11
+    assert cache.get(conversation("a"), "hotels") is None
+
+
+def test_invalidate_index_drops_only_that_index():
+    cache = ResponseCache(embed_fn=bag_of_words)
+    cache.put(conversation("spa"), "hotels", "A")
+    cache.put(conversation("spa"), "resorts", "B")
+    cache.invalidate_index("hotels")
+    assert cache.get(conversation("spa"), "hotels") is None
+    assert cache.get(conversation("spa"), "resorts") == "B"
@@ -0,0 +1,89 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.secrets_provider import SecretsProvider
+
+
+class FakeVault:
+    def __init__(self, secrets, delay=0.0, missing=()):
+        self.secrets = dict(secrets)
+        self.delay = delay
+        self.missing = set(missing)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_secret(self, name):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if name in self.missing:
+            raise KeyError(name)
+        return SimpleNamespace(value=self.secrets[name])
+
+
+NAMES = ["AOAIKey", "SearchKey", "SpeechKey", "LanguageKey"]
+
+
+def test_secrets_are_fetched_in_parallel_and_cached():
+    vault = FakeVault({name: f"{name}-value" for name in NAMES}, delay=0.1)
+    provider = SecretsProvider("https://vault.invalid", NAMES, client=vault)
+    started = time.perf_counter()
+    assert provider.get("SearchKey") == "SearchKey-value"
+    assert time.perf_counter() - started < 0.3
+    provider.get_all()
+    assert vault.calls == len(NAMES)
+
+
+def test_concurrent_cold_reads_fetch_once():
+    vault = FakeVault({name: "v" for name in NAMES}, delay=0.05)
+    provider = SecretsProvider("https://vault.invalid", NAMES, client=vault)
+    threads = [threading.Thread(target=provider.get_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert vault.calls == len(NAMES)
+
+
+def test_missing_secrets_fall_back_to_config_values():
+    vault = FakeVault({"AOAIKey": "from-vault"}, missing={"SearchKey", "SpeechKey"})
+    provider = SecretsProvider("https://vault.invalid", ["AOAIKey", "SearchKey"], client=vault,
+                               fallback={"SearchKey": "from-config"})
+    assert provider.get_all() == {"AOAIKey": "from-vault", "SearchKey": "from-config"}
+    failing = SecretsProvider("https://vault.invalid", ["SpeechKey"], client=vault, fallback={"SpeechKey": "TODO"})
+    with pytest.raises(RuntimeError, match="SpeechKey"):
+        failing.get_all()
+
+
+def test_without_a_vault_every_secret_comes_from_config():
+    provider = SecretsProvider(None, ["AOAIKey", "SearchKey"], fallback={"AOAIKey": "a", "SearchKey": ""})
+    with pytest.raises(RuntimeError, match="SearchKey"):
+        provider.get_all()
+    provider.fallback["SearchKey"] = "s"
+    assert provider.get_all() == {"AOAIKey": "a", "SearchKey": "s"}
+
+
+def test_values_are_refreshed_in_the_background_before_they_expire():
+    vault = FakeVault({"AOAIKey": "old"})
+    provider = SecretsProvider("https://vault.invalid", ["AOAIKey"], client=vault, ttl=0.2, refresh_ahead=0.15)
+    assert provider.get("AOAIKey") == "old"
+    vault.secrets["AOAIKey"] = "new"
+    time.sleep(0.1)
+    # Inside the refresh window: the cached value is served while a refresh starts.
+    assert provider.get("AOAIKey") == "old"
+    deadline = time.monotonic() + 2
+    while provider.get("AOAIKey") != "new" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider.get("AOAIKey") == "new"
+
+
+def test_invalidate_forces_a_fetch():
+    vault = FakeVault({"AOAIKey": "v"})
+    provider = SecretsProvider("https://vault.invalid", ["AOAIKey"], client=vault)
+    provider.get_all()
+    provider.invalidate()
+    provider.get_all()
+    assert vault.calls == 2
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from services import startup
+
+
+def test_config_is_parsed_once_and_reread_when_it_changes(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"AOAIDeploymentName": "gpt-4o"}))
+    first = startup.load_config(str(path))
+    assert startup.load_config(str(path)) is first
+
+    path.write_text(json.dumps({"AOAIDeploymentName": "gpt-4o-mini"}))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert startup.load_config(str(path)) == {"AOAIDeploymentName": "gpt-4o-mini"}
+
+
+def test_first_import_times_are_recorded():
+    startup.import_module("json")
+    recorded = startup.import_times()["json"]
+    startup.import_module("json")
+    assert startup.import_times()["json"] == recorded
+
+
+@pytest.fixture
+def fresh_prewarm(monkeypatch):
+    monkeypatch.setattr(startup, "_prewarmed", set())
+
+
+def test_prewarm_runs_each_task_once_and_survives_failures(fresh_prewarm):
+    ran = []
+
+    def failing_task():
+        raise RuntimeError("offline")
+
+    thread = startup.prewarm(["json", "no_such_module_for_prewarm"], tasks={"failing": failing_task, "first": lambda: ran.append(1)})
+    thread.join(5)
+    assert "no_such_module_for_prewarm" not in startup.import_times()
+    assert startup.prewarm(["json"], tasks={"first": lambda: ran.append(2)}) is None
+
+    # A page that prewarms after another one still gets its own tasks run.
+    thread = startup.prewarm(["json"], tasks={"first": lambda: ran.append(2), "second": lambda: ran.append(3)})
+    thread.join(5)
+    assert ran == [1, 3]
+
+
+def test_pages_load_with_config_overrides(tmp_path, monkeypatch):
+    (tmp_path / "config.json").write_text(json.dumps({"AOAIEndpoint": "https://real", "Cache": {"Size": 1, "Ttl": 5}}))
+    (tmp_path / "page.py").write_text(
+        "from services.startup import load_config\n"
+        "config = load_config()\n"
+        "if __name__ == '__main__':\n"
+        "    raise SystemExit('main must not run')\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    page = startup.load_page("page.py", "test_page", {"AOAIEndpoint": "http://stub", "Cache": {"Size": 2}})
+    assert page.config == {"AOAIEndpoint": "http://stub", "Cache": {"Size": 2, "Ttl": 5}}
+    assert os.getcwd() == str(tmp_path)
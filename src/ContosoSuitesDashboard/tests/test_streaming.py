@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.streaming import StreamingRenderer, completion_deltas, render_stream, text_deltas
+
+
+class Placeholder:
+    def __init__(self):
+        self.updates = []
+
+    def markdown(self, text):
+        self.updates.append(text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_rate_limited_and_the_final_text_is_written_once():
+    clock, placeholder = FakeClock(), Placeholder()
+    renderer = StreamingRenderer(placeholder, max_updates_per_second=10, clock=clock)
+    for i in range(10):
+        clock.now = 0.01 * (i + 1)
+        renderer.write(f"w{i} ")
+    assert placeholder.updates == ["w0 w1 w2 w3 w4 w5 w6 w7 w8 w9 |"]
+    clock.now = 0.5
+    assert renderer.finish() == "w0 w1 w2 w3 w4 w5 w6 w7 w8 w9 "
+    assert placeholder.updates[-1] == "w0 w1 w2 w3 w4 w5 w6 w7 w8 w9 "
+    assert renderer.finish() == renderer.text
+    assert renderer.stats.ui_updates == 2
+
+
+def test_a_large_burst_is_shown_before_the_interval_passes():
+    placeholder = Placeholder()
+    renderer = StreamingRenderer(placeholder, max_pending_chars=10, clock=FakeClock())
+    renderer.write("0123456789")
+    assert placeholder.updates == ["0123456789|"]
+
+
+def test_stats_report_time_to_first_token_and_tokens_per_second():
+    clock = FakeClock()
+    renderer = StreamingRenderer(Placeholder(), clock=clock)
+    clock.now = 0.5
+    renderer.write("a")
+    renderer.write("")
+    clock.now = 1.5
+    renderer.write("b")
+    renderer.finish()
+    assert renderer.stats.time_to_first_token == 0.5
+    assert renderer.stats.tokens == 2
+    assert renderer.stats.tokens_per_second == 2.0
+    assert renderer.stats.summary().startswith("Time to first token: 0.50s | 2.0 tokens/sec")
+
+
+def test_write_after_finish_raises():
+    renderer = StreamingRenderer(Placeholder())
+    renderer.finish()
+    with pytest.raises(RuntimeError):
+        renderer.write("late")
+
+
+def test_render_stream_finishes_even_when_the_stream_fails():
+    placeholder = Placeholder()
+
+    def deltas():
+        yield "partial"
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        render_stream(placeholder, deltas())
+    assert placeholder.updates[-1] == "partial"
+
+
+def test_completion_deltas_skips_chunks_without_choices():
+    def chunk(content):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+    stream = [SimpleNamespace(choices=[]), chunk("Hel"), chunk(None), chunk("lo")]
+    assert list(completion_deltas(stream)) == ["Hel", "", "lo"]
+
+
+def test_text_deltas_round_trips():
+    text = "x" * 50
+    assert [len(d) for d in text_deltas(text, chunk_chars=24)] == [24, 24, 2]
+    assert "".join(text_deltas(text)) == text
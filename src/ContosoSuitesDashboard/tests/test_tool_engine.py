@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from services.tool_engine import ToolExecutor, format_tool_output, tool_result_messages
+
+
+def tool_call(id, name, arguments):
+    return SimpleNamespace(id=id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def test_tool_calls_run_concurrently_and_keep_request_order():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow(value):
+        # Every call waits for the other two, so this only finishes if they overlap.
+        barrier.wait()
+        return value * 2
+
+    executor = ToolExecutor({"slow": slow}, max_workers=4)
+    calls = [tool_call(f"call-{i}", "slow", {"value": i}) for i in range(3)]
+    results = executor.run(calls)
+    assert [r.id for r in results] == ["call-0", "call-1", "call-2"]
+    assert [r.output for r in results] == [0, 2, 4]
+    assert all(r.ok for r in results)
+
+
+def test_every_failure_becomes_an_error_result():
+    def broken():
+        raise ValueError("no data")
+
+    executor = ToolExecutor({"broken": broken, "echo": lambda text: text},
+                            validate=lambda name, args: "text is required" if name == "echo" and not args else None)
+    bad_json = SimpleNamespace(id="c3", function=SimpleNamespace(name="echo", arguments="{not json"))
+    results = executor.run([
+        tool_call("c1", "missing", {}),
+        tool_call("c2", "broken", {}),
+        bad_json,
+        tool_call("c4", "echo", {}),
+        tool_call("c5", "echo", {"text": "hi"}),
+    ])
+    assert "don't know how to call the function `missing`" in results[0].error
+    assert results[1].error == "The function `broken` failed: no data"
+    assert "not valid JSON" in results[2].error
+    assert "text is required" in results[3].error
+    assert results[4].output == "hi"
+
+
+def test_timeouts_are_measured_from_submission():
+    release = threading.Event()
+
+    def stuck():
+        release.wait(5)
+        return "late"
+
+    executor = ToolExecutor({"stuck": stuck, "fast": lambda: "ok"}, timeout=5.0, timeouts={"stuck": 0.1})
+    started = time.perf_counter()
+    try:
+        results = executor.run([tool_call("a", "stuck", {}), tool_call("b", "fast", {})])
+    finally:
+        release.set()
+    assert time.perf_counter() - started < 2
+    assert results[0].error == "The function `stuck` timed out."
+    assert results[1].output == "ok"
+
+
+def test_outputs_are_formatted_for_tool_messages():
+    frame = pd.DataFrame({"id": range(5)})
+    assert format_tool_output(frame, max_rows=2) == "id\n0\n1\n... 3 more rows not shown.\n"
+    assert format_tool_output("text") == "text"
+    assert format_tool_output({"a": 1}) == '{"a": 1}'
+
+    executor = ToolExecutor({"echo": lambda text: text}, validate=None)
+    results = executor.run([tool_call("x", "echo", {"text": "hi"}), tool_call("y", "nope", {})])
+    messages = tool_result_messages(results)
+    assert messages[0] == {"role": "tool", "tool_call_id": "x", "content": "hi"}
+    assert messages[1]["tool_call_id"] == "y"
+    assert "nope" in messages[1]["content"]
@@ -0,0 +1,77 @@
+from typing import Literal, Optional
+
+from services.tool_registry import ToolRegistry
+
+TOOL_SOURCE = '''
+def lookup(criterion: Literal["CustomerName", "LoyaltyTier"], value: str, limit: int = 10,
+           tiers: list[Literal["Gold", "Silver"]] = None, note: Optional[str] = None):
+    """Look customers up."""
+    return CALLS.append((criterion, value)) or len(CALLS)
+'''
+
+
+def register(registry, source=TOOL_SOURCE, calls=None, **options):
+    # Compile and register the tool the way a Streamlit rerun does: fresh code each time.
+    namespace = {"Literal": Literal, "Optional": Optional, "CALLS": calls if calls is not None else []}
+    exec(compile(source, "page.py", "exec"), namespace)
+    registry.tool(**options)(namespace["lookup"])
+    return registry["lookup"]
+
+
+def test_schema_is_generated_from_the_signature():
+    schema = register(ToolRegistry(), descriptions={"value": "What to look for."}).schema
+    assert schema["description"] == "Look customers up."
+    assert schema["parameters"]["required"] == ["criterion", "value"]
+    properties = schema["parameters"]["properties"]
+    assert properties["criterion"] == {"type": "string", "enum": ["CustomerName", "LoyaltyTier"]}
+    assert properties["value"] == {"type": "string", "description": "What to look for."}
+    assert properties["limit"] == {"type": "integer"}
+    assert properties["tiers"] == {"type": "array", "items": {"type": "string", "enum": ["Gold", "Silver"]}}
+    assert properties["note"] == {"type": "string"}
+
+
+def test_validation_errors():
+    tool = register(ToolRegistry())
+    assert tool.validate({"criterion": "LoyaltyTier", "value": "Gold"}) is None
+    assert tool.validate([]) == "arguments must be a JSON object"
+    assert tool.validate({"criterion": "LoyaltyTier"}) == "missing required argument 'value'"
+    assert tool.validate({"criterion": "LoyaltyTier", "value": "Gold", "x": 1}) == "unexpected argument 'x'"
+    assert tool.validate({"criterion": "Email", "value": "a"}) == \
+        "argument 'criterion' must be one of CustomerName, LoyaltyTier"
+    assert tool.validate({"criterion": "LoyaltyTier", "value": "Gold", "limit": True}) == \
+        "argument 'limit' has the wrong type"
+    assert tool.validate({"criterion": "LoyaltyTier", "value": "Gold", "tiers": ["Gold", "Bronze"]}) == \
+        "argument 'tiers' must be one of Gold, Silver"
+
+
+def test_null_is_accepted_for_optional_arguments_only():
+    tool = register(ToolRegistry())
+    valid = {"criterion": "LoyaltyTier", "value": "Gold"}
+    assert tool.validate(dict(valid, note=None)) is None
+    assert tool.validate(dict(valid, tiers=None)) is None
+    assert tool.validate(dict(valid, limit=None)) == "argument 'limit' has the wrong type"
+    assert tool.validate(dict(valid, value=None)) == "argument 'value' has the wrong type"
+
+
+def test_rerun_with_unchanged_code_reuses_the_compiled_tool_and_its_cache():
+    registry = ToolRegistry()
+    first_calls, second_calls = [], []
+    first = register(registry, calls=first_calls, cache_ttl=60)
+    first(criterion="LoyaltyTier", value="Gold")
+    second = register(registry, calls=second_calls, cache_ttl=60)
+    assert second is first
+    # The new function (with the new page's globals) is the one that gets called.
+    second(criterion="LoyaltyTier", value="Silver")
+    second(criterion="LoyaltyTier", value="Gold")
+    assert first_calls == [("LoyaltyTier", "Gold")] and second_calls == [("LoyaltyTier", "Silver")]
+    assert registry.cache_stats() == {"lookup": {"hits": 1, "misses": 2}}
+
+
+def test_changed_code_or_description_recompiles_the_tool():
+    registry = ToolRegistry()
+    first = register(registry)
+    described = register(registry, description="Different.")
+    assert described is not first
+    changed = register(registry, source=TOOL_SOURCE.replace("limit: int = 10", "limit: int = 20"))
+    assert changed is not described
+    assert registry.schemas() == [changed.schema]
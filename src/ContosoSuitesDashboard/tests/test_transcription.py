@@ -0,0 +1,111 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.transcription import SessionManager, TranscriptionSession, TranscriptionTimeout
+
+
+class Signal:
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def fire(self, evt=None):
+        for callback in self.callbacks:
+            callback(evt)
+
+
+class Transcriber:
+    def __init__(self):
+        for name in ("transcribed", "session_started", "session_stopped", "canceled"):
+            setattr(self, name, Signal())
+        self.stopped = False
+
+    def start_transcribing_async(self):
+        pass
+
+    def stop_transcribing_async(self):
+        self.stopped = True
+
+    def say(self, text, offset_seconds=0.0, duration_seconds=1.0):
+        self.transcribed.fire(SimpleNamespace(result=SimpleNamespace(
+            text=text, offset=int(offset_seconds * 10_000_000), duration=int(duration_seconds * 10_000_000))))
+
+
+def test_results_stream_in_order_and_the_session_completes():
+    transcriber = Transcriber()
+    session = TranscriptionSession(transcriber).start()
+    transcriber.say("Hello.", 1.0, 0.5)
+    transcriber.say("")
+    transcriber.say("Bye.", 2.0)
+    transcriber.session_stopped.fire()
+    assert list(session.stream(timeout=1)) == ["Hello.", "Bye."]
+    assert list(session.stream(timeout=1)) == []
+    assert session.wait(timeout=1) == ["Hello.", "Bye."]
+    assert session.timings == [(1.0, 1.5), (2.0, 3.0)]
+
+
+def test_stream_times_out_without_results():
+    session = TranscriptionSession(Transcriber()).start()
+    with pytest.raises(TranscriptionTimeout):
+        next(session.stream(timeout=0.05))
+
+
+def test_heartbeats_do_not_extend_the_timeout():
+    session = TranscriptionSession(Transcriber()).start()
+    started = time.monotonic()
+    heartbeats = 0
+    with pytest.raises(TranscriptionTimeout):
+        for item in session.stream(timeout=0.2, heartbeat=0.02):
+            assert item is None
+            heartbeats += 1
+    assert heartbeats >= 3
+    assert time.monotonic() - started < 1
+
+
+def test_timeout_counts_from_the_last_phrase():
+    transcriber = Transcriber()
+    session = TranscriptionSession(transcriber).start()
+
+    def speak():
+        for text in ("one", "two", "three"):
+            time.sleep(0.1)
+            transcriber.say(text)
+        transcriber.session_stopped.fire()
+
+    threading.Thread(target=speak).start()
+    # Each phrase arrives within the timeout, although all of them together do not.
+    assert [item for item in session.stream(timeout=0.25, heartbeat=0.05) if item] == ["one", "two", "three"]
+
+
+def test_deadline_cancels_the_session_with_an_error():
+    transcriber = Transcriber()
+    session = TranscriptionSession(transcriber, deadline=0.05).start()
+    assert session.wait(timeout=1) == []
+    assert transcriber.stopped
+    assert "deadline" in session.error
+
+
+def test_canceled_event_records_the_error_details():
+    transcriber = Transcriber()
+    session = TranscriptionSession(transcriber).start()
+    transcriber.canceled.fire(SimpleNamespace(cancellation_details=SimpleNamespace(error_details="Bad key")))
+    assert session.done and session.error == "Bad key"
+
+
+def test_manager_tracks_sessions_and_cancels_when_feeding_fails():
+    manager = SessionManager(max_feeders=1)
+    session = manager.start(Transcriber())
+    assert manager.get(session.id) is session and manager.active() == [session]
+
+    def push():
+        raise OSError("disk gone")
+
+    with pytest.raises(OSError):
+        manager.feed(session, push).result()
+    assert session.done and session.error == "Failed to stream audio: disk gone"
+    assert manager.get(session.id) is None
@@ -8,6 +8,10 @@ public enum LoyaltyTier
 
 public class Customer
 {
+    // The Cosmos DB document id, used as a paging tie-breaker. It is not part of the
+    // API's responses.
+    [System.Text.Json.Serialization.JsonIgnore]
+    public string id { get; set; }
     public string FirstName { get; set; }
     public string LastName { get; set; }
     public string FullName { get; set; }
@@ -30,16 +30,16 @@ if (app.Environment.IsDevelopment())
 
 app.UseHttpsRedirection();
 
-app.MapGet("/Customer", async (string searchCriterion, string searchValue) => 
+app.MapGet("/Customer", async (string searchCriterion, string searchValue, int? skip, int? take) => 
 {
     switch (searchCriterion)
     {
         case "CustomerName":
-            return await app.Services.GetService<ICosmosService>()!.GetCustomersByName(searchValue);
+            return await app.Services.GetService<ICosmosService>()!.GetCustomersByName(searchValue, skip, take);
         case "LoyaltyTier":
-            return await app.Services.GetService<ICosmosService>()!.GetCustomersByLoyaltyTier(searchValue);
+            return await app.Services.GetService<ICosmosService>()!.GetCustomersByLoyaltyTier(searchValue, skip, take);
         case "DateOfMostRecentStay":
-            return await app.Services.GetService<ICosmosService>()!.GetCustomersWithStaysAfterDate(DateTime.Parse(searchValue));
+            return await app.Services.GetService<ICosmosService>()!.GetCustomersWithStaysAfterDate(DateTime.Parse(searchValue), skip, take);
         default:
             throw new Exception("Invalid search criterion. Valid search criteria include 'CustomerName', 'LoyaltyTier', and 'DateOfMostRecentStay'.");
     }
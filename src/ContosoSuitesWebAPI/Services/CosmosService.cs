@@ -19,34 +19,48 @@ public class CosmosService : ICosmosService
         );
     }
 
-    public async Task<IEnumerable<Customer>> GetCustomersByName(string name)
+    public async Task<IEnumerable<Customer>> GetCustomersByName(string name, int? skip = null, int? take = null)
     {
-        var queryable = container.GetItemLinqQueryable<Customer>();
-        using FeedIterator<Customer> feed = queryable
-            .Where(c => c.FullName == name)
+        var queryable = container.GetItemLinqQueryable<Customer>()
+            .Where(c => c.FullName == name);
+        using FeedIterator<Customer> feed = Page(queryable, skip, take)
             .ToFeedIterator<Customer>();
         return await ExecuteQuery(feed);
     }
 
-    public async Task<IEnumerable<Customer>> GetCustomersByLoyaltyTier(string loyaltyTier)
+    public async Task<IEnumerable<Customer>> GetCustomersByLoyaltyTier(string loyaltyTier, int? skip = null, int? take = null)
     {
         LoyaltyTier lt = Enum.Parse<LoyaltyTier>(loyaltyTier);
-        var queryable = container.GetItemLinqQueryable<Customer>();
-        using FeedIterator<Customer> feed = queryable
-            .Where(c => c.LoyaltyTier.ToString() == loyaltyTier)
+        var queryable = container.GetItemLinqQueryable<Customer>()
+            .Where(c => c.LoyaltyTier.ToString() == loyaltyTier);
+        using FeedIterator<Customer> feed = Page(queryable, skip, take)
             .ToFeedIterator<Customer>();
         return await ExecuteQuery(feed);
     }
 
-    public async Task<IEnumerable<Customer>> GetCustomersWithStaysAfterDate(DateTime dt)
+    public async Task<IEnumerable<Customer>> GetCustomersWithStaysAfterDate(DateTime dt, int? skip = null, int? take = null)
     {
-        var queryable = container.GetItemLinqQueryable<Customer>();
-        using FeedIterator<Customer> feed = queryable
-            .Where(c => c.DateOfMostRecentStay > dt)
+        var queryable = container.GetItemLinqQueryable<Customer>()
+            .Where(c => c.DateOfMostRecentStay > dt);
+        using FeedIterator<Customer> feed = Page(queryable, skip, take)
             .ToFeedIterator<Customer>();
         return await ExecuteQuery(feed);
     }
 
+    // Apply OFFSET/LIMIT paging when the caller asks for it. Results are ordered by
+    // FullName, then by document id so that customers who share a name have a stable
+    // order and consecutive pages neither overlap nor skip anyone. Ordering on two
+    // properties needs a (FullName ASC, id ASC) composite index on the container.
+    private static IQueryable<Customer> Page(IQueryable<Customer> queryable, int? skip, int? take)
+    {
+        if (skip is null && take is null)
+        {
+            return queryable;
+        }
+        queryable = queryable.OrderBy(c => c.FullName).ThenBy(c => c.id).Skip(skip ?? 0);
+        return take is null ? queryable : queryable.Take(take.Value);
+    }
+
     private async Task<IEnumerable<Customer>> ExecuteQuery(FeedIterator<Customer> feed)
     {
         List<Customer> results = new();
@@ -2,7 +2,7 @@ namespace ContosoSuitesWebAPI.Services;
 
 public interface ICosmosService
 {
-    Task<IEnumerable<Customer>> GetCustomersByName(string name);
-    Task<IEnumerable<Customer>> GetCustomersByLoyaltyTier(string loyaltyTier);
-    Task<IEnumerable<Customer>> GetCustomersWithStaysAfterDate(DateTime dt);
+    Task<IEnumerable<Customer>> GetCustomersByName(string name, int? skip = null, int? take = null);
+    Task<IEnumerable<Customer>> GetCustomersByLoyaltyTier(string loyaltyTier, int? skip = null, int? take = null);
+    Task<IEnumerable<Customer>> GetCustomersWithStaysAfterDate(DateTime dt, int? skip = null, int? take = null);
 }
\ No newline at end of file